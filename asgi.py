@@ -0,0 +1,31 @@
+"""
+ASGI config for Afra Tabs project.
+"""
+
+import os
+import threading
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+# Each request's sync code runs on a new thread here, so persistent
+# connections would only pile up (see CONN_MAX_AGE in settings.py)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+application = get_asgi_application()
+
+# Load the autocomplete and facet indexes before the first search/listing
+# request arrives. Some servers import this module inside their event loop,
+# where the ORM won't run, so they are built on a thread of their own.
+from django.db import connections  # noqa: E402
+from tabs.facets import facet_index  # noqa: E402
+from tabs.search_index import autocomplete_index  # noqa: E402
+
+
+def _warm_indexes():
+    try:
+        autocomplete_index.warm()
+        facet_index.warm()
+    finally:
+        connections.close_all()
+
+
+threading.Thread(target=_warm_indexes, name='index-warm', daemon=True).start()
@@ -3,6 +3,7 @@ Django settings for Afra Tabs project.
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,6 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'tabs.query_stats.QueryStatsMiddleware',
 ]
 
 ROOT_URLCONF = 'urls'
@@ -56,15 +58,102 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'wsgi.application'
+ASGI_APPLICATION = 'asgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PRAGMAs run on every new SQLite connection. WAL lets readers carry on while
+# the admin writes; synchronous=normal is safe with WAL (it only skips fsyncs
+# between checkpoints). SQLITE_PRAGMAS in the environment ("name=value,...")
+# overrides any of them.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,  # ms a writer waits for the lock before failing
+    'cache_size': -65536,  # KiB (64 MB) of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+SQLITE_PRAGMAS.update(
+    item.split('=', 1) for item in os.environ.get('SQLITE_PRAGMAS', '').split(',') if item
+)
+
+# Seconds to keep a connection open between requests. asgi.py sets this to 0:
+# under ASGI every request runs on a thread of its own, so a kept connection
+# would never be reused.
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
+
+def sqlite_databases(path):
+    """
+    'default' takes writes; 'replica', a query_only connection to the same
+    file, takes public reads (tabs/routers.py). Writes begin IMMEDIATE, so
+    they queue on busy_timeout instead of failing when a read transaction
+    tries to start writing.
+    """
+    def alias(*init_commands):
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': ';'.join(
+                    [f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()]
+                    + list(init_commands)
+                ),
+            },
+        }
+
+    default = alias()
+    default['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    return {
+        'default': default,
+        'replica': {**alias('PRAGMA query_only=ON'), 'TEST': {'MIRROR': 'default'}},
     }
+
+
+DATABASES = sqlite_databases(BASE_DIR / 'db.sqlite3')
+DATABASE_ROUTERS = ['tabs.routers.ReadWriteRouter']
+
+# Caches
+# 'pages' holds rendered detail pages and their generation keys (tabs/page_cache.py).
+# Every worker process must share it for invalidations to reach them all, so it
+# lives on disk; point PAGE_CACHE_DIR at storage all workers can see.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'afra-tabs-pages')
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Rendered listing cards (tabs/card_cache.py), per process
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'afra-tabs-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
 }
 
+# Serve detail pages and the search index document from the 'pages' cache
+# (tabs/page_cache.py). The query checks and benchmarks turn it off so every
+# request runs its view.
+CACHE_PAGES = True
+
+# Count song page views for the "Most Popular" sort (tabs/popularity.py). The
+# query checks, benchmarks, export_static and the tests turn it off, so their
+# requests aren't counted as readers.
+RECORD_SONG_VIEWS = True
+
+# Check every request's queries against its view's @query_budget
+# (tabs/query_stats.py). Always on with DEBUG; set this to also run the
+# check in production.
+QUERY_STATS = False
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,10 +1,145 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.html import format_html
 from .models import Artist, Album, Song, SongChangeLog, Tabber
+from . import bulk_edit, fulltext
+
+
+class FullTextSearchMixin:
+    """
+    Answer the changelist search box from the FTS5 tables instead of
+    icontains over search_fields (which remain the fallback).
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and fulltext.is_available():
+            return fulltext.filter_queryset(queryset, self.search_kind, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+# -------------------------------
+# BULK ACTIONS (see tabs/bulk_edit.py)
+# -------------------------------
+
+class BulkEditForm(forms.Form):
+    """One Song field's new value, entered the way the song form takes it."""
+
+    def __init__(self, field_name, admin_site, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model_field = Song._meta.get_field(field_name)
+        if self.model_field.is_relation:
+            # Looked up as you type, rather than a <select> of every album
+            self.fields["value"] = self.model_field.formfield(
+                widget=AutocompleteSelect(self.model_field, admin_site), required=True
+            )
+        else:
+            self.fields["value"] = self.model_field.formfield()
+
+    def clean_value(self):
+        value = self.cleaned_data["value"]
+        if value is not None and not self.model_field.is_relation:
+            try:
+                self.model_field.run_validators(value)
+            except ValidationError as exc:
+                raise forms.ValidationError(exc.messages) from exc
+        return value
+
+
+def _songs(queryset):
+    """The songs an action applies to: the selection itself, or the selected albums' songs."""
+    if queryset.model is Song:
+        return queryset
+    return Song.objects.filter(album__in=queryset)
+
+
+def _report(modeladmin, request, changed):
+    modeladmin.message_user(request, f"Updated {changed} song{'s' if changed != 1 else ''}.")
+
+
+def _bulk_set(modeladmin, request, queryset, field, value):
+    _report(modeladmin, request, bulk_edit.set_field(_songs(queryset), field, value))
+
+
+def _bulk_edit_form(modeladmin, request, queryset, field, description, apply):
+    """
+    Ask for the new value of ``field``, then call ``apply(songs, value)``.
+    The form posts back to the changelist as the same action, carrying
+    the selection with it.
+    """
+    form = BulkEditForm(field, modeladmin.admin_site, request.POST if "apply" in request.POST else None)
+    if form.is_bound and form.is_valid():
+        try:
+            changed = apply(_songs(queryset), form.cleaned_data["value"])
+        except ValueError as exc:
+            modeladmin.message_user(request, str(exc), level="error")
+            return None
+        _report(modeladmin, request, changed)
+        return None
+
+    select_across = request.POST.get("select_across") == "1"
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        "title": description,
+        "opts": modeladmin.model._meta,
+        "form": form,
+        "media": modeladmin.media + form.media,
+        "action": request.POST["action"],
+        "select_across": int(select_across),
+        "selected": [] if select_across else request.POST.getlist(ACTION_CHECKBOX_NAME),
+        "action_checkbox_name": ACTION_CHECKBOX_NAME,
+        "count": queryset.count(),
+    }
+    return TemplateResponse(request, "admin/tabs/bulk_edit.html", context)
+
+
+@admin.action(description="Mark songs as artist verified", permissions=["change"])
+def mark_artist_verified(modeladmin, request, queryset):
+    _bulk_set(modeladmin, request, queryset, "artist_verified", True)
+
+
+@admin.action(description="Mark songs as not artist verified", permissions=["change"])
+def unmark_artist_verified(modeladmin, request, queryset):
+    _bulk_set(modeladmin, request, queryset, "artist_verified", False)
+
+
+@admin.action(description="Change the songs' tuning", permissions=["change"])
+def change_tuning(modeladmin, request, queryset):
+    return _bulk_edit_form(
+        modeladmin, request, queryset, "tuning", "Change the songs' tuning",
+        lambda songs, value: bulk_edit.set_field(songs, "tuning", value),
+    )
+
+
+@admin.action(description="Change the songs' difficulty", permissions=["change"])
+def change_difficulty(modeladmin, request, queryset):
+    return _bulk_edit_form(
+        modeladmin, request, queryset, "difficulty", "Change the songs' difficulty",
+        lambda songs, value: bulk_edit.set_field(songs, "difficulty", value),
+    )
+
+
+@admin.action(description="Move songs to another album", permissions=["change"])
+def move_to_album(modeladmin, request, queryset):
+    return _bulk_edit_form(
+        modeladmin, request, queryset, "album", "Move songs to another album", bulk_edit.move_to_album
+    )
+
+
+def _songs_link(obj, lookup):
+    url = reverse("admin:tabs_song_changelist") + f"?{lookup}={obj.pk}"
+    return format_html('<a href="{}">{}</a>', url, obj.num_tabs)
 
 
 @admin.register(Artist)
-class ArtistAdmin(admin.ModelAdmin):
-    list_display = ("name", "num_tabs")
+class ArtistAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = "artist"
+    list_display = ("name", "songs")
     search_fields = ("name",)
     readonly_fields = ("name_cleaned", "path", "artist_img", "num_tabs")
     fieldsets = (
@@ -22,6 +157,10 @@ class ArtistAdmin(admin.ModelAdmin):
         ),
     )
 
+    @admin.display(description="Tabs", ordering="num_tabs")
+    def songs(self, obj):
+        return _songs_link(obj, "artist__id__exact")
+
 
 class SongInline(admin.TabularInline):
     model = Song
@@ -42,13 +181,20 @@ class SongInline(admin.TabularInline):
     )
     filter_horizontal = ("tabber",)
 
+    def get_queryset(self, request):
+        # Each row's str() reads the artist, and its tabber widget the credits
+        return super().get_queryset(request).select_related("artist", "album").prefetch_related("tabber")
 
 
 @admin.register(Album)
-class AlbumAdmin(admin.ModelAdmin):
-    list_display = ("title", "artist", "release_year", "is_complete", "num_tabs", "has_filler")
+class AlbumAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = "album"
+    list_display = ("title", "artist", "release_year", "is_complete", "songs", "has_filler")
     list_filter = ("is_complete", "has_filler", "release_year")
+    list_select_related = ("artist",)
     search_fields = ("title", "artist__name")
+    autocomplete_fields = ("artist",)
+    actions = [mark_artist_verified, unmark_artist_verified, change_tuning, change_difficulty]
     readonly_fields = ("title_cleaned", "album_img", "path", "num_tabs")
     inlines = [SongInline]
 
@@ -71,9 +217,14 @@ class AlbumAdmin(admin.ModelAdmin):
         ),
     )
 
+    @admin.display(description="Tabs", ordering="num_tabs")
+    def songs(self, obj):
+        return _songs_link(obj, "album__id__exact")
+
 
 @admin.register(Song)
-class SongAdmin(admin.ModelAdmin):
+class SongAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = "song"
     list_display = (
         "title",
         "album",
@@ -86,22 +237,27 @@ class SongAdmin(admin.ModelAdmin):
         "was_request",
         "artist_verified",
     )
+    # Filter by artist or album from the tab counts on their changelists;
+    # as list filters they would list every artist and album on every page
     list_filter = (
-        "artist",
-        "album",
         "difficulty",
         "was_request",
         "artist_verified",
         "is_filler",
     )
+    list_select_related = ("artist", "album")
     search_fields = ("title", "album__title", "artist__name")
+    autocomplete_fields = ("artist", "album")
     filter_horizontal = ("tabber",)
+    actions = [mark_artist_verified, unmark_artist_verified, change_tuning, change_difficulty, move_to_album]
     readonly_fields = (
         "title_cleaned",
         "path",
         "tab_files",
         "date_added",
         "date_last_edited",
+        "view_count",
+        "popularity",
     )
 
     fieldsets = (
@@ -136,6 +292,10 @@ class SongAdmin(admin.ModelAdmin):
             "Timestamps",
             {"fields": ("date_added", "date_last_edited")},
         ),
+        (
+            "Stats",
+            {"fields": ("view_count", "popularity")},
+        ),
     )
 
 
@@ -143,6 +303,8 @@ class SongAdmin(admin.ModelAdmin):
 class SongChangeLogAdmin(admin.ModelAdmin):
     list_display = ("song", "change_date", "change_summary")
     list_filter = ("change_date",)
+    list_select_related = ("song__artist",)
+    autocomplete_fields = ("song",)
     search_fields = ("song__title", "change_summary")
     date_hierarchy = "change_date"
 
@@ -0,0 +1,128 @@
+"""
+Set-based song edits for the admin's bulk actions.
+
+Saving a selection one song at a time re-derives every row and runs each
+of the Song receivers in tabs/signals.py (stats, tab counts, indexes,
+page cache) per row. These functions change the whole selection with one
+UPDATE instead, skip songs that already have the new value, and then do
+once, for the songs that changed, what the receivers would have done:
+CatalogStats, a tab count reconcile, this process's facet and
+autocomplete indexes, the FTS tables, the page cache, and one
+SongChangeLog row per song, written with a single bulk insert.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from . import changelog, fulltext, page_cache, tab_counts
+from .facets import facet_index
+from .models import CatalogStats, Song, SongChangeLog
+from .search_index import autocomplete_index
+
+# Fields set_field() can change: none of them feed a derived field
+EDITABLE_FIELDS = ("artist_verified", "tuning", "difficulty")
+
+
+def set_field(songs, field, value):
+    """Set ``field`` to ``value`` on ``songs``; returns how many songs changed."""
+    if field not in EDITABLE_FIELDS:
+        raise ValueError(f"{field} can't be edited in bulk.")
+    with transaction.atomic():
+        rows = list(
+            songs.exclude(**{field: value}).order_by()
+            .values("pk", "album__path", "is_filler", field)
+        )
+        if not rows:
+            return 0
+        pks = [row["pk"] for row in rows]
+        Song.objects.filter(pk__in=pks).update(**{field: value, "date_last_edited": timezone.now()})
+
+        if field == "artist_verified":
+            listed = sum(not row["is_filler"] for row in rows)
+            CatalogStats.record({"verified_tabs": listed if value else -listed})
+        _log(rows, lambda row: changelog.describe(field, row[field], value))
+        _reindex(pks)
+        _invalidate_pages(row["album__path"] for row in rows)
+    return len(rows)
+
+
+def move_to_album(songs, album):
+    """
+    Move ``songs`` to ``album`` (and its artist), rebuilding their path
+    and tab_files. Raises ValueError, changing nothing, if a song would
+    share its slug with another song on the album. Returns how many
+    songs moved.
+    """
+    artist = album.artist
+    with transaction.atomic():
+        rows = list(
+            songs.exclude(album=album).order_by()
+            .values("pk", "title_cleaned", "album_id", "artist_id", "album__title", "album__path")
+        )
+        if not rows:
+            return 0
+        slugs = Counter(row["title_cleaned"] for row in rows)
+        slugs.update(album.songs.filter(title_cleaned__in=slugs).values_list("title_cleaned", flat=True))
+        clashes = sorted(slug for slug, count in slugs.items() if count > 1)
+        if clashes:
+            raise ValueError(f"{album.title} would have more than one song at: {', '.join(clashes)}")
+
+        # What Song.set_derived_fields() computes, for every row at once
+        prefix = f"{artist.name_cleaned.lower()}/{album.title_cleaned.lower()}/"
+        pks = [row["pk"] for row in rows]
+        Song.objects.filter(pk__in=pks).update(
+            album=album,
+            artist=artist,
+            path=Case(
+                When(is_filler=True, then=Value("")),
+                default=Concat(Value(f"/tabs/{prefix}"), F("title_cleaned")),
+                output_field=CharField(),
+            ),
+            tab_files=Case(
+                When(is_filler=True, then=Value(None)),
+                default=Concat(Value(f"{Song.TAB_FILES_ROOT}{prefix}"), F("title_cleaned")),
+                output_field=CharField(),
+            ),
+            date_last_edited=timezone.now(),
+        )
+
+        tab_counts.reconcile(
+            {album.pk} | {row["album_id"] for row in rows},
+            {artist.pk} | {row["artist_id"] for row in rows},
+        )
+        _log(rows, lambda row: f"Moved from {row['album__title']} to {album.title}")
+        _reindex(pks, text=True)
+        _invalidate_pages([album.path, *(row["album__path"] for row in rows)])
+    return len(rows)
+
+
+def _log(rows, summary):
+    SongChangeLog.objects.bulk_create(
+        SongChangeLog(song_id=row["pk"], change_summary=summary(row)) for row in rows
+    )
+
+
+def _reindex(pks, text=False):
+    """
+    What the Song post_save receivers do for each song's indexes (the
+    in-memory ones on commit); ``text`` for the FTS tables.
+    """
+    text = text and fulltext.is_available()
+    if not (facet_index.is_built or autocomplete_index.is_built or text):
+        return
+    songs = list(Song.objects.filter(pk__in=pks).select_related("artist", "album"))
+    for song in songs:
+        facet_index.update_on_commit(song)
+        autocomplete_index.update_on_commit(song)
+    if text:
+        fulltext.index_songs(songs)
+
+
+def _invalidate_pages(album_paths):
+    """The album pages (and their songs') the edited songs appear on, and their artists' pages."""
+    for path in set(album_paths):
+        page_cache.invalidate_tree(path)
+        page_cache.invalidate_page(path.rsplit("/", 1)[0] if path else "")
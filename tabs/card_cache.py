@@ -0,0 +1,93 @@
+"""
+Rendered-fragment cache for the per-row cards on listing and artist pages.
+
+Each card is cached on its own under a key made of the card type, the
+row's pk, and the values the card shows that can change without a new
+pk: edit timestamps of the row and the rows it shows fields of, plus any
+counts. An edit moves a timestamp, so a stale card is never looked up
+again rather than invalidated; the template's own source and the image
+store's version are part of the key too, so a template change or an
+image build takes effect without a flush. A page of
+cards costs one get_many, and only the misses are rendered.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Callable
+
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from . import images
+
+CACHE_ALIAS = "fragments"
+
+# Cards outlive the edits that replace them by at most a day
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class Card:
+    template: str
+    # Template variable the row is rendered as
+    name: str
+    # Everything the card shows that can change while the pk stays the same
+    version: Callable
+
+
+CARDS = {
+    "song": Card(
+        "tabs/partials/song_card.html", "song",
+        lambda song: (song.date_last_edited, song.artist.date_last_edited, song.album.date_last_edited),
+    ),
+    "album": Card(
+        "tabs/partials/album_card.html", "album",
+        lambda album: (album.date_last_edited, album.artist.date_last_edited, album.song_count),
+    ),
+    "artist": Card(
+        "tabs/partials/artist_card.html", "artist",
+        lambda artist: (artist.date_last_edited, artist.num_tabs),
+    ),
+    # The artist page's own tiles: the artist is the page's, not the row's
+    "artist_page_album": Card(
+        "tabs/partials/artist_page_album_card.html", "album",
+        lambda album: (album.date_last_edited, album.artist.date_last_edited, album.song_count),
+    ),
+    "artist_page_song": Card(
+        "tabs/partials/artist_page_song_card.html", "song",
+        lambda song: (song.date_last_edited, song.artist.date_last_edited, song.album.date_last_edited),
+    ),
+}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _digest(text):
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+def _key(kind, template_digest, card, row):
+    return f"card:{kind}:{row.pk}:" + _digest(
+        "|".join(map(str, (template_digest, *card.version(row))))
+    )
+
+
+def render_cards(rows, kind):
+    """The concatenated HTML of a ``kind`` card (see CARDS) for each of ``rows``."""
+    card = CARDS[kind]
+    template = get_template(card.template)
+    # Cards link image variants, which a new image build can replace
+    template_digest = _digest(template.template.source + images.version())
+    rows = list(rows)
+    keys = [_key(kind, template_digest, card, row) for row in rows]
+    cached = _cache().get_many(keys)
+
+    rendered = {}
+    for key, row in zip(keys, rows):
+        if key not in cached and key not in rendered:
+            rendered[key] = template.render({card.name: row})
+    if rendered:
+        _cache().set_many(rendered, CARD_TIMEOUT)
+    return mark_safe("".join(cached[key] if key in cached else rendered[key] for key in keys))
@@ -0,0 +1,149 @@
+"""
+Incremental change feed for mirrors and API clients.
+
+Every artist, album and song is in the feed at its (date_last_edited, id)
+position, and every deletion at its Tombstone's (date_deleted, id). A
+sync streams everything after the positions in the client's cursor, in
+that order, walking the matching indexes with iterator() so memory stays
+flat however much there is to send, and ends with the cursor to resume
+from. A client that is up to date pays four index seeks that find
+nothing.
+
+Rows edited in the last SETTLE_TIME are held back for the next sync: a
+timestamp is taken before its transaction commits, so a just-committed
+row can carry an earlier timestamp than one a client already saw.
+
+Counts (num_tabs) and tabber links change without moving a row's
+date_last_edited, so they are not in the feed; clients derive counts
+from the songs they hold.
+"""
+import json
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Album, Artist, Song, Tombstone
+from .pagination import CursorPaginator
+
+CURSOR_SALT = "tabs.change_feed.cursor"
+
+# Rows newer than this wait for the next sync (see the module docstring)
+SETTLE_TIME = timedelta(seconds=5)
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 1000
+
+# Parents first, so a client can apply each row as it arrives
+FEEDS = {
+    "artists": (
+        Artist, "date_last_edited",
+        ("id", "name", "name_cleaned", "artist_img", "path", "date_last_edited"),
+    ),
+    "albums": (
+        Album, "date_last_edited",
+        (
+            "id", "artist_id", "title", "title_cleaned", "release_year", "album_img", "tuning",
+            "is_complete", "has_filler", "cover_playlist", "path", "date_last_edited",
+        ),
+    ),
+    "songs": (
+        Song, "date_last_edited",
+        (
+            "id", "artist_id", "album_id", "title", "title_cleaned", "duration", "track_num",
+            "tuning", "difficulty", "riffs", "artist_verified", "cover_video", "was_request",
+            "is_filler", "date_added", "date_last_edited", "tab_files", "tab_description", "path",
+        ),
+    ),
+    "deleted": (Tombstone, "date_deleted", ("kind", "object_id", "date_deleted")),
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(positions):
+    """Sign {feed: (timestamp, id) or None} into an opaque cursor."""
+    values = {
+        name: [position[0].isoformat(), position[1]] if position else None
+        for name, position in positions.items()
+    }
+    return signing.dumps(values, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    """The positions in ``cursor``; raises InvalidCursor if it was tampered with."""
+    try:
+        raw = signing.loads(cursor, salt=CURSOR_SALT)
+        return {
+            name: (datetime.fromisoformat(raw[name][0]), int(raw[name][1])) if raw[name] else None
+            for name in FEEDS
+        }
+    except (signing.BadSignature, KeyError, IndexError, TypeError, ValueError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+
+
+def cursor_at(moment):
+    """A cursor that syncs everything changed after ``moment``."""
+    return encode_cursor({name: (moment, 0) for name in FEEDS})
+
+
+def _latest(model, field):
+    return model.objects.order_by(f"-{field}", "-pk").values_list(field, "pk").first()
+
+
+def stream(cursor=None, limit=None):
+    """
+    Yield the JSON response body, in pieces, for a sync from ``cursor``
+    (None for a full sync). At most ``limit`` rows are sent; "has_more"
+    tells the client to come straight back with the new cursor.
+    """
+    positions = decode_cursor(cursor) if cursor else dict.fromkeys(FEEDS)
+    if cursor is None:
+        # A full sync has nothing to delete: start the tombstones at the end
+        positions["deleted"] = _latest(Tombstone, "date_deleted")
+    horizon = timezone.now() - SETTLE_TIME
+    remaining = limit
+    has_more = False
+
+    parts = ["{"]
+    for index, (name, (model, field, columns)) in enumerate(FEEDS.items()):
+        parts.append(f'{", " if index else ""}"{name}": [')
+        if remaining == 0:
+            has_more = True
+            parts.append("]")
+            continue
+        paginator = CursorPaginator(model.objects.filter(**{f"{field}__lt": horizon}), (field,), CHUNK_SIZE)
+        rows = paginator.rows_after(positions[name]) if positions[name] else paginator.queryset
+        sent = 0
+        for row in rows.values(*columns, "pk").iterator(chunk_size=CHUNK_SIZE):
+            positions[name] = (row[field], row.pop("pk"))
+            parts.append(("," if sent else "") + json.dumps(row, cls=DjangoJSONEncoder))
+            sent += 1
+            if len(parts) >= CHUNK_SIZE:
+                # One write per chunk of rows, not per row
+                yield "".join(parts)
+                parts = []
+            if remaining is not None and sent == remaining:
+                has_more = True
+                break
+        if remaining is not None:
+            remaining -= sent
+        parts.append("]")
+    parts.append(f', "next_cursor": {json.dumps(encode_cursor(positions))}, "has_more": {json.dumps(has_more)}}}')
+    yield "".join(parts)
+
+
+async def astream(cursor=None, limit=None):
+    """
+    stream() for ASGI servers, which buffer a synchronous iterator whole.
+    Each piece is produced on the request's sync thread, where the
+    database cursor lives.
+    """
+    pieces = stream(cursor, limit)
+    next_piece = sync_to_async(next)
+    while (piece := await next_piece(pieces, None)) is not None:
+        yield piece
@@ -0,0 +1,74 @@
+"""
+Automatic SongChangeLog entries for editorial edits.
+
+A song's CHANGELOG_FIELDS are part of the snapshot Song.from_db() takes,
+so the post_save receiver in tabs/signals.py finds what an edit changed
+without a query, and a save that changes none of them costs nothing.
+Tabber credits are diffed by the m2m_changed receiver. Each change is
+described in a few words (describe()) and collected per song in a
+per-transaction buffer; on commit every song edited in the transaction
+gets one row, its parts joined, and all the rows go in with a single
+bulk insert. An admin save of an album and its inline songs is one
+INSERT, however many songs it touched.
+"""
+from django.db import transaction
+from django.utils.text import Truncator
+
+from . import page_cache
+from .commit_buffer import CommitBuffer
+from .models import Song, SongChangeLog
+
+# Described as changed rather than quoted: too long for a one-line summary
+SUMMARIZED_FIELDS = ("tab_description", "cover_video")
+
+SUMMARY_LENGTH = SongChangeLog._meta.get_field("change_summary").max_length
+
+
+def display(value):
+    if value is None or value == "":
+        return "none"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+def describe(field, before, after):
+    """A few words on Song ``field`` changing from ``before`` to ``after``."""
+    label = Song._meta.get_field(field).verbose_name.capitalize()
+    if field in SUMMARIZED_FIELDS:
+        if not before:
+            return f"{label} added"
+        return f"{label} removed" if not after else f"{label} updated"
+    return f"{label}: {display(before)} → {display(after)}"
+
+
+def _flush(pending):
+    entries = [(pk, entry) for pk, entry in pending.items() if entry["parts"]]
+    if not entries:
+        return
+    # One transaction, so the panels' cache generations move only once
+    # the rows they will show are committed
+    with transaction.atomic():
+        SongChangeLog.objects.bulk_create(
+            SongChangeLog(song_id=pk, change_summary=Truncator("; ".join(entry["parts"])).chars(SUMMARY_LENGTH))
+            for pk, entry in entries
+        )
+        for pk, entry in entries:
+            page_cache.invalidate_page(page_cache.song_panel_path(entry["path"], "changelog"))
+
+
+_pending = CommitBuffer("changelog", dict, _flush)
+
+
+def record(song_id, path, parts, using=None):
+    """Add ``parts`` (describe() strings) to the song's entry for this transaction."""
+    with _pending.collect(using) as pending:
+        entry = pending.setdefault(song_id, {"path": path, "parts": []})
+        entry["path"] = path
+        entry["parts"].extend(parts)
+
+
+def discard(song_id, using=None):
+    """Drop a song's pending entries, e.g. because the song is being deleted."""
+    for pending in _pending.pending(using):
+        pending.pop(song_id, None)
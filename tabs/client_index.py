@@ -0,0 +1,134 @@
+"""
+Downloadable search index for the header dropdown.
+
+Every song, album and artist title goes into one JSON document that the
+browser downloads once and searches locally (see base.html), instead of
+calling search_api on every keystroke. Rows are arrays, and songs and
+albums refer to their artist and album by position, so shared names and
+slugs are sent once; URLs and subtitles are rebuilt in the browser from
+the URL templates sent along. The document is small and repetitive, so
+it gzips well.
+
+The document is versioned by the page cache's catalog-wide token, which
+every edit moves. Each version lives at its own URL, so browsers and
+proxies can cache it forever. It is built and gzipped once per version,
+by whichever request first finds it missing, and kept in the shared
+"pages" cache; requests arriving during the build get the previous
+version, which search_index_document marks as only briefly cacheable.
+"""
+import gzip
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse
+
+from . import page_cache
+from .models import Album, Artist, Song
+
+# Old versions are never requested again once the catalog moves on
+DOCUMENT_TIMEOUT = 60 * 60 * 24
+# The last version built, served while the next one is being built
+LATEST_KEY = "search-index:latest"
+# Seconds a build may hold its lock; also the longest a request waits for one
+BUILD_TIMEOUT = 30
+BUILD_POLL_INTERVAL = 0.1
+
+_claiming = threading.Lock()
+
+# Stand-ins for the slugs in the URL templates; base.html fills them in
+PLACEHOLDERS = {"artist_slug": "__artist__", "album_slug": "__album__", "song_slug": "__song__"}
+
+
+def _cache():
+    return caches[page_cache.CACHE_ALIAS]
+
+
+def current_version():
+    return page_cache.catalog_version()
+
+
+def document():
+    """
+    The version of the index to serve, and that index gzipped: the current
+    version, or while another request is building that, the last one built.
+    """
+    version = current_version()
+    # Off for the query checks and benchmarks, like the page cache
+    if not settings.CACHE_PAGES:
+        return version, _compress(build(version))
+    cache = _cache()
+    body = cache.get(f"search-index:{version}")
+    if body is not None:
+        return version, body
+    # One request builds each version; the others serve the previous one
+    # meanwhile, or wait for the first build if there is none. The file
+    # cache's add() checks, then writes, so threads also take turns here
+    with _claiming:
+        claimed = cache.add(f"search-index-build:{version}", True, BUILD_TIMEOUT)
+    if claimed:
+        try:
+            body = _compress(build(version))
+            cache.set_many({f"search-index:{version}": body, LATEST_KEY: (version, body)}, DOCUMENT_TIMEOUT)
+        finally:
+            cache.delete(f"search-index-build:{version}")
+        return version, body
+    latest = cache.get(LATEST_KEY)
+    if latest is not None:
+        return latest
+    deadline = time.monotonic() + BUILD_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(BUILD_POLL_INTERVAL)
+        body = cache.get(f"search-index:{version}")
+        if body is not None:
+            return version, body
+    return version, _compress(build(version))
+
+
+def _compress(index):
+    return gzip.compress(json.dumps(index, separators=(",", ":")).encode(), 9)
+
+
+def build(version):
+    """
+    The index as a dict of row arrays:
+    artists [name, slug, num_tabs], albums [artist, title, slug,
+    release_year], songs [artist, album, title, slug, verified], where
+    artist and album are positions in the artists and albums arrays.
+    """
+    artists, artist_at = [], {}
+    for pk, name, slug, num_tabs in Artist.objects.order_by("pk").values_list(
+        "pk", "name", "name_cleaned", "num_tabs"
+    ).iterator():
+        artist_at[pk] = len(artists)
+        artists.append([name, slug, num_tabs])
+
+    albums, album_at = [], {}
+    for pk, artist_id, title, slug, release_year in Album.objects.order_by("pk").values_list(
+        "pk", "artist_id", "title", "title_cleaned", "release_year"
+    ).iterator():
+        album_at[pk] = len(albums)
+        albums.append([artist_at[artist_id], title, slug, release_year])
+
+    songs = [
+        [artist_at[artist_id], album_at[album_id], title, slug, int(verified)]
+        for artist_id, album_id, title, slug, verified in Song.objects.filter(is_filler=False)
+        .order_by("pk").values_list("artist_id", "album_id", "title", "title_cleaned", "artist_verified")
+        .iterator()
+    ]
+
+    return {
+        "version": version,
+        "urls": {
+            "song": reverse("tabs:song_detail", kwargs=PLACEHOLDERS),
+            "album": reverse("tabs:album_detail", kwargs={
+                name: PLACEHOLDERS[name] for name in ("artist_slug", "album_slug")
+            }),
+            "artist": reverse("tabs:artist_detail", kwargs={"artist_slug": PLACEHOLDERS["artist_slug"]}),
+        },
+        "artists": artists,
+        "albums": albums,
+        "songs": songs,
+    }
@@ -0,0 +1,67 @@
+"""
+Per-transaction buffers for work that should happen once, on commit.
+
+Signal receivers collect into the buffer for the current transaction
+(a dict, Counter, list, ...) and the buffer's flush function gets the
+collected value exactly once, from transaction.on_commit. Outside an
+atomic block on_commit runs straight away, so each collect() flushes
+on its own. A rolled-back transaction throws its buffer away with its
+on_commit callbacks. Each savepoint (nested atomic block) collects into
+a buffer of its own, so rolling one back drops just what it collected;
+a transaction's buffers are flushed in the order they were started.
+"""
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+
+
+class CommitBuffer:
+    def __init__(self, name, new, flush):
+        self.attr = f"_commit_buffer_{name}"
+        self.new = new
+        self.flush = flush
+
+    @contextmanager
+    def collect(self, using=None):
+        """Yield this transaction's (or savepoint's) buffer, scheduling its flush on first use."""
+        conn = transaction.get_connection(using)
+        # savepoint ids of the enclosing atomic blocks -> buffer
+        states = getattr(conn, self.attr, None)
+        if states is None:
+            states = {}
+            setattr(conn, self.attr, states)
+        # atomic(savepoint=False) blocks (Model.delete() runs in one) can't
+        # be rolled back on their own, so they share their parent's buffer
+        level = tuple(sid for sid in conn.savepoint_ids if sid is not None)
+        state = states.get(level)
+        created = state is None or not self._scheduled(conn, state)
+        if created:
+            # Buffers of rolled-back blocks are never flushed; drop them here
+            for key, other in list(states.items()):
+                if not self._scheduled(conn, other):
+                    del states[key]
+            state = {"value": self.new(), "callback": None}
+            states[level] = state
+        yield state["value"]
+        if created:
+            state["callback"] = partial(self._run, conn, level, state)
+            transaction.on_commit(state["callback"], using=using)
+
+    def pending(self, using=None):
+        """The values of every buffer this transaction's savepoints have started."""
+        conn = transaction.get_connection(using)
+        states = getattr(conn, self.attr, None) or {}
+        return [state["value"] for state in states.values() if self._scheduled(conn, state)]
+
+    def _run(self, conn, level, state):
+        states = getattr(conn, self.attr)
+        if states.get(level) is state:
+            del states[level]
+        self.flush(state["value"])
+
+    @staticmethod
+    def _scheduled(conn, state):
+        # on_commit callbacks are dropped on rollback; a buffer whose flush
+        # is no longer queued belongs to a transaction that is gone
+        return any(entry[1] is state["callback"] for entry in conn.run_on_commit)
@@ -0,0 +1,444 @@
+"""
+Process-local facet index for the tabs listing.
+
+Every listed (non-filler) song's tuning, difficulty, artist_verified and
+was_request are kept as one bitmap per value: a Python int with the bit
+of each song's pk set. A filter is then a few ORs and ANDs of bitmaps,
+its size a bit_count(), and the per-option counts for the tuning
+dropdown and difficulty slider one AND each, all without a query.
+
+Pages come from arrays of song pks pre-sorted by each listing sort key,
+scanned in order for members of the filter, so tabs_list only fetches
+the rows it shows. Each array keeps the songs' sort keys alongside, so
+a keyset cursor's (value, pk) is found by bisection and a "load more"
+page costs the same at any depth. The index is built once per process
+(on first use) and the receivers in tabs/signals.py keep the bitmaps
+and the sorted arrays current as songs change, moving just the changed
+song in each array. Popularity, which tabs/popularity.py writes without
+signals, has its order reloaded with one index-only query every few
+minutes.
+
+Signals only fire in the process that saved, so the index also records
+the page cache's catalog token (page_cache.catalog_version()) it was
+built at, and ensure_built() rebuilds once that token has moved: after
+an edit in another worker, a shell or import_catalog. This process's
+own edits hand their new token straight to the index (catalog_moved),
+as the receivers have already applied them. Receivers schedule their
+updates for the commit (update_on_commit()), so a rolled-back edit never
+reaches the bitmaps.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from django.db import DatabaseError
+
+from . import page_cache
+from .commit_buffer import CommitBuffer
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("tuning", "difficulty", "artist_verified", "was_request")
+
+# Sort keys the pre-sorted pk arrays exist for; ties are broken by pk, as in CursorPaginator.
+# Each maps a field value to the key stored alongside the pks; numeric keys
+# are packed into an array("d"). Timestamps keep microseconds distinct.
+ORDER_FIELDS = ("title", "date_added", "popularity")
+ORDER_KEYS = {
+    "title": str,
+    "date_added": lambda value: value.timestamp(),
+    "popularity": float,
+}
+
+# Popularity changes without signals, in every process: its order is reloaded this often (seconds)
+ORDER_MAX_AGE = {"popularity": 300}
+
+
+def bitmap(pks):
+    """The bitmap with the bit of each of ``pks`` set."""
+    pks = list(pks)
+    if not pks:
+        return 0
+    buffer = bytearray((max(pks) >> 3) + 1)
+    for pk in pks:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class SortedOrder:
+    """
+    Listed song pks sorted by (``field``, pk), with each one's sort key
+    alongside. Never changed in place, as a Results may be scanning it:
+    moved() and without() return a new order.
+    """
+
+    def __init__(self, field, keys, pks):
+        self.field = field
+        self.keys = keys
+        self.pks = pks
+        self._key = ORDER_KEYS[field]
+
+    @classmethod
+    def from_rows(cls, field, rows):
+        """An order from (value, pk) rows, already sorted."""
+        key = ORDER_KEYS[field]
+        keys = [] if field == "title" else array("d")
+        pks = array("q")
+        for value, pk in rows:
+            keys.append(key(value))
+            pks.append(pk)
+        return cls(field, keys, pks)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def seek(self, value, pk, after=False):
+        """
+        The position of the row with sort value ``value`` and ``pk``, or
+        where it would go; with ``after``, the position just past it.
+        """
+        search = bisect_right if after else bisect_left
+        return search(range(len(self.pks)), (self._key(value), pk), key=self._entry)
+
+    def _entry(self, position):
+        return self.keys[position], self.pks[position]
+
+    def _position(self, pk, value=None):
+        # ``value`` is where ``pk`` should be; if it has changed since,
+        # fall back to looking for the pk
+        if value is not None:
+            position = self.seek(value, pk)
+            if position < len(self.pks) and self.pks[position] == pk:
+                return position
+        try:
+            return self.pks.index(pk)
+        except ValueError:
+            return None
+
+    def without(self, pk, value=None):
+        """This order without ``pk`` (expected at sort value ``value``, if given)."""
+        position = self._position(pk, value)
+        if position is None:
+            return self
+        keys, pks = self.keys[:], self.pks[:]
+        del keys[position], pks[position]
+        return SortedOrder(self.field, keys, pks)
+
+    def moved(self, pk, value, present=True):
+        """
+        This order with ``pk`` (re)placed at sort value ``value``;
+        ``present`` False promises it isn't in the order yet.
+        """
+        order = self.without(pk, value) if present else self
+        position = order.seek(value, pk)
+        return SortedOrder(
+            self.field,
+            _inserted(order.keys, position, self._key(value)),
+            _inserted(order.pks, position, pk),
+        )
+
+
+def _inserted(sequence, position, item):
+    """A copy of ``sequence`` (a list or an array) with ``item`` inserted at ``position``."""
+    copy = sequence[:]
+    copy.insert(position, item)
+    return copy
+
+
+class Results:
+    """
+    The pks matching a filter, in the order of ``order`` (a SortedOrder,
+    or an array of pks in an explicit order; reversed if ``descending``).
+    Sliceable and sized like a list, so it can be handed to a Paginator;
+    slicing scans the order from the start.
+    """
+
+    def __init__(self, order, mask, count, descending=False, everything=False):
+        self.sorted_order = order if isinstance(order, SortedOrder) else None
+        self.order = order.pks if self.sorted_order else order
+        self.count = count
+        self.descending = descending
+        # With no filter every pk in the order matches, and slices needn't scan
+        self.everything = everything
+        self._bits = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or (key.step or 1) != 1:
+            raise TypeError("Results only support contiguous slices")
+        start, stop = key.start or 0, key.stop if key.stop is not None else self.count
+        return list(islice(self._scan(), start, stop))
+
+    def after(self, value, pk):
+        """
+        Matching pks after the row with sort value ``value`` and ``pk`` (a
+        keyset cursor's), found by bisection; the row needn't still be
+        listed. Raises ValueError for results in an explicit order.
+        """
+        if self.sorted_order is None:
+            raise ValueError("Results in an explicit order can't be resumed from a cursor")
+        if self.descending:
+            return self._scan(len(self.order) - self.sorted_order.seek(value, pk))
+        return self._scan(self.sorted_order.seek(value, pk, after=True))
+
+    def _scan(self, start=0):
+        order = self.order
+        if self.descending:
+            positions = range(len(order) - 1 - start, -1, -1)
+        else:
+            positions = range(start, len(order))
+        if self.everything:
+            for position in positions:
+                yield order[position]
+            return
+        bits = self._bits
+        size = len(bits)
+        for position in positions:
+            pk = order[position]
+            byte = pk >> 3
+            if byte < size and bits[byte] >> (pk & 7) & 1:
+                yield pk
+
+
+def _apply_pending(pending):
+    for pk, song in pending.items():
+        # A song saved and then deleted (in a later savepoint) has lost its pk
+        if song is None or song.pk is None:
+            facet_index.remove(pk)
+        else:
+            facet_index.update_song(song)
+
+
+# pk -> saved song, or None if deleted
+_pending = CommitBuffer("facets", dict, _apply_pending)
+
+
+class FacetIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the thread rebuilding a stale index; the rest keep using it
+        self._rebuilding = threading.Lock()
+        self._built = False
+        self._version = None  # page_cache.catalog_version() when built
+        self._all = 0
+        self._postings = {facet: {} for facet in FACETS}  # facet -> value -> bitmap
+        self._orders = {}  # field -> SortedOrder
+        self._loaded = {}  # field -> time.monotonic() its order was read
+        # Moved by every change, so an order loaded across one isn't kept
+        self._generation = 0
+
+    @property
+    def is_built(self):
+        return self._built
+
+    # -------------------------------
+    # BUILDING
+    # -------------------------------
+
+    def build(self):
+        """(Re)load every listed song's facet values from the database."""
+        from .models import Song  # avoid import cycle with models
+
+        # Read first: an edit committed while loading moves it past this
+        version = page_cache.catalog_version()
+        members = {facet: {} for facet in FACETS}
+        listed = []
+        for pk, *values in Song.objects.filter(is_filler=False).values_list("pk", *FACETS).iterator():
+            listed.append(pk)
+            for facet, value in zip(FACETS, values):
+                members[facet].setdefault(value, []).append(pk)
+        orders = {field: self._load_order(field) for field in ORDER_FIELDS}
+        loaded = time.monotonic()
+
+        with self._lock:
+            self._all = bitmap(listed)
+            self._postings = {
+                facet: {value: bitmap(pks) for value, pks in values.items()}
+                for facet, values in members.items()
+            }
+            self._orders = orders
+            self._loaded = dict.fromkeys(orders, loaded)
+            self._generation += 1
+            self._version = version
+            self._built = True
+
+    def warm(self):
+        """Build at process start-up, tolerating a database that isn't ready yet."""
+        try:
+            self.build()
+        except DatabaseError:
+            logger.warning("Facet index not built; will retry on first listing", exc_info=True)
+
+    def ensure_built(self):
+        """Build on first use, and rebuild if the catalog changed outside this process."""
+        if self._built and self._version == page_cache.catalog_version():
+            return
+        # Only the first build makes callers wait; a stale index keeps
+        # answering while one thread rebuilds it
+        if not self._rebuilding.acquire(blocking=not self._built):
+            return
+        try:
+            if not self._built or self._version != page_cache.catalog_version():
+                self.build()
+        finally:
+            self._rebuilding.release()
+
+    def follow(self, previous, version):
+        """This process moved the catalog token from ``previous`` to ``version`` (see catalog_moved)."""
+        with self._lock:
+            if self._built and self._version == previous:
+                self._version = version
+
+    # -------------------------------
+    # UPDATES (called from tabs/signals.py)
+    # -------------------------------
+
+    def update_song(self, song):
+        if not self._built:
+            return
+        if song.is_filler:
+            self.remove(song.pk)
+            return
+        bit = 1 << song.pk
+        with self._lock:
+            listed = bool(self._all & bit)
+            self._all |= bit
+            for facet in FACETS:
+                self._move(facet, bit, getattr(song, facet))
+            # The song may have been added or retitled: move it in each order
+            self._orders = {
+                field: order.moved(song.pk, getattr(song, field), present=listed)
+                for field, order in self._orders.items()
+            }
+            self._generation += 1
+
+    def remove(self, pk):
+        if not self._built:
+            return
+        bit = 1 << pk
+        with self._lock:
+            if not self._all & bit:
+                return
+            self._all &= ~bit
+            for facet in FACETS:
+                self._move(facet, bit, None, add=False)
+            self._orders = {field: order.without(pk) for field, order in self._orders.items()}
+            self._generation += 1
+
+    def update_on_commit(self, song, using=None):
+        """update_song() once the transaction commits; not at all if it rolls back."""
+        if self._built:
+            with _pending.collect(using) as pending:
+                pending[song.pk] = song
+
+    def remove_on_commit(self, pk, using=None):
+        """remove() once the transaction commits."""
+        if self._built:
+            with _pending.collect(using) as pending:
+                pending[pk] = None
+
+    def invalidate_order(self, field):
+        """Reload the order by ``field`` on next use, e.g. after popularity is written."""
+        with self._lock:
+            self._orders.pop(field, None)
+
+    def _move(self, facet, bit, value, add=True):
+        postings = self._postings[facet]
+        for other, members in list(postings.items()):
+            if members & bit and (other != value or not add):
+                members &= ~bit
+                if members:
+                    postings[other] = members
+                else:
+                    del postings[other]
+        if add:
+            postings[value] = postings.get(value, 0) | bit
+
+    # -------------------------------
+    # QUERYING
+    # -------------------------------
+
+    def mask(self, filters, within=None):
+        """
+        The bitmap of listed songs passing every filter. ``filters`` maps
+        facets to predicates on their values; ``within``, if given, is a
+        bitmap (e.g. of search matches) to restrict to.
+        """
+        with self._lock:
+            mask = self._all if within is None else self._all & within
+            for facet, accepts in filters.items():
+                mask &= self._values_mask(facet, accepts)
+            return mask
+
+    def counts(self, filters, within=None):
+        """
+        {facet: {value: songs}}, each facet counted under ``filters`` on the
+        other facets, so every option shows what picking it would give.
+        """
+        with self._lock:
+            base = self._all if within is None else self._all & within
+            masks = {facet: self._values_mask(facet, accepts) for facet, accepts in filters.items()}
+            counts = {}
+            for facet in FACETS:
+                mask = base
+                for other, other_mask in masks.items():
+                    if other != facet:
+                        mask &= other_mask
+                counts[facet] = {
+                    value: (mask & members).bit_count()
+                    for value, members in self._postings[facet].items()
+                }
+            return counts
+
+    def results(self, mask, ordering, filtered=True):
+        """
+        Results for ``mask`` in ``ordering``: a field of ORDER_FIELDS,
+        '-'-prefixed for descending, or an explicit sequence of pks (e.g.
+        search matches by relevance). ``filtered`` False promises that the
+        mask holds every listed song, so pages needn't scan.
+        """
+        count = mask.bit_count()
+        if not isinstance(ordering, str):
+            return Results(array("q", ordering), mask, count)
+        field = ordering.lstrip("-")
+        return Results(
+            self._order(field), mask, count,
+            descending=ordering.startswith("-"), everything=not filtered,
+        )
+
+    def _values_mask(self, facet, accepts):
+        mask = 0
+        for value, members in self._postings[facet].items():
+            if accepts(value):
+                mask |= members
+        return mask
+
+    def _order(self, field):
+        order = self._orders.get(field)
+        max_age = ORDER_MAX_AGE.get(field)
+        if order is None or max_age is not None and time.monotonic() - self._loaded[field] > max_age:
+            if field not in ORDER_FIELDS:
+                raise ValueError(f"no pre-sorted order for {field!r}")
+            generation = self._generation
+            order = self._load_order(field)
+            with self._lock:
+                if generation == self._generation:
+                    self._orders[field] = order
+                    self._loaded[field] = time.monotonic()
+        return order
+
+    @staticmethod
+    def _load_order(field):
+        from .models import Song  # avoid import cycle with models
+
+        return SortedOrder.from_rows(field, Song.objects.filter(is_filler=False).order_by(
+            field, "pk"
+        ).values_list(field, "pk").iterator())
+
+
+facet_index = FacetIndex()
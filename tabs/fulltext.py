@@ -0,0 +1,261 @@
+"""
+SQLite FTS5 full-text search for songs, albums and artists.
+
+Each model gets its own FTS5 table whose rowid is the model's primary key,
+so searches return ids ranked by bm25() and the signal receivers in
+tabs/signals.py can update rows (including a renamed album or artist fanned
+out to its songs) by rowid. On databases without FTS5 every helper falls
+back to the old icontains filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+# kind -> (FTS table, indexed columns, bm25 column weights)
+TABLES = {
+    "song": ("tabs_song_fts", ("title", "artist", "album"), (10.0, 3.0, 2.0)),
+    "album": ("tabs_album_fts", ("title", "artist"), (10.0, 3.0)),
+    "artist": ("tabs_artist_fts", ("name",), (10.0,)),
+}
+
+# Fields each model's FTS rows are built from (is_filler songs have none);
+# a save that changes none of them leaves the rows alone
+SONG_SOURCE_FIELDS = ("title", "artist_id", "album_id", "is_filler")
+ALBUM_SOURCE_FIELDS = ("title", "artist_id")
+ARTIST_SOURCE_FIELDS = ("name",)
+
+# icontains lookups used when FTS5 isn't available
+FALLBACK_FIELDS = {
+    "song": ("title", "artist__name", "album__title"),
+    "album": ("title", "artist__name"),
+    "artist": ("name",),
+}
+
+# Relevance-ordered listings rank at most this many matches
+MAX_RANKED_RESULTS = 500
+
+TOKEN_RE = re.compile(r"\w+")
+
+_available = {}
+
+
+def is_available(using=None):
+    """True when the FTS5 tables exist on the current database."""
+    conn = connection if using is None else using
+    if conn.alias not in _available:
+        if conn.vendor != "sqlite":
+            _available[conn.alias] = False
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [TABLES["song"][0]],
+                )
+                _available[conn.alias] = cursor.fetchone()[0] > 0
+    return _available[conn.alias]
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    Quoting each token keeps user input from being read as FTS5 syntax.
+    """
+    tokens = TOKEN_RE.findall(query or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+# -------------------------------
+# QUERYING
+# -------------------------------
+
+def filter_queryset(queryset, kind, query):
+    """Restrict ``queryset`` to rows matching ``query`` (unordered)."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset
+    if not is_available():
+        return _fallback_filter(queryset, kind, query)
+    table = TABLES[kind][0]
+    return queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression])
+    )
+
+
+def ranked_ids(kind, query, limit=MAX_RANKED_RESULTS):
+    """Primary keys of the best ``limit`` matches, most relevant first."""
+    expression = match_expression(query)
+    if not expression or not is_available():
+        return []
+    table, columns, weights = TABLES[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s "
+            f"ORDER BY bm25({table}, {', '.join(map(str, weights))}) LIMIT %s",
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def rank_queryset(queryset, kind, query):
+    """
+    Restrict ``queryset`` to the best matches for ``query`` and order them by
+    relevance. Without FTS5 the filtered queryset keeps its own ordering.
+    """
+    if not match_expression(query):
+        return queryset
+    if not is_available():
+        return _fallback_filter(queryset, kind, query)
+    ids = ranked_ids(kind, query)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    ).order_by("search_rank")
+
+
+def _fallback_filter(queryset, kind, query):
+    condition = Q()
+    for field in FALLBACK_FIELDS[kind]:
+        condition |= Q(**{f"{field}__icontains": query})
+    return queryset.filter(condition)
+
+
+# -------------------------------
+# INDEX MAINTENANCE
+# -------------------------------
+
+def index_song(song):
+    if not is_available():
+        return
+    if song.is_filler:
+        remove("song", song.pk)
+        return
+    _upsert("song", song.pk, (song.title, song.artist.name, song.album.title))
+
+
+def index_songs(songs):
+    """index_song() for many songs (with artist and album loaded), in two statements."""
+    if not is_available():
+        return
+    songs = list(songs)
+    table, columns, _ = TABLES["song"]
+    with connection.cursor() as cursor:
+        if songs:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE rowid IN ({', '.join(['%s'] * len(songs))})",
+                [song.pk for song in songs],
+            )
+        cursor.executemany(
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(columns))})",
+            [
+                (song.pk, song.title, song.artist.name, song.album.title)
+                for song in songs if not song.is_filler
+            ],
+        )
+
+
+def index_album(album):
+    """Index an album and refresh the album title stored on its songs."""
+    if not is_available():
+        return
+    _upsert("album", album.pk, (album.title, album.artist.name))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE tabs_song_fts SET album = %s "
+            "WHERE rowid IN (SELECT id FROM tabs_song WHERE album_id = %s) AND album != %s",
+            [album.title, album.pk, album.title],
+        )
+
+
+def index_artist(artist):
+    """Index an artist and refresh the name stored on its albums and songs."""
+    if not is_available():
+        return
+    _upsert("artist", artist.pk, (artist.name,))
+    with connection.cursor() as cursor:
+        for kind, model_table in (("song", "tabs_song"), ("album", "tabs_album")):
+            table = TABLES[kind][0]
+            cursor.execute(
+                f"UPDATE {table} SET artist = %s "
+                f"WHERE rowid IN (SELECT id FROM {model_table} WHERE artist_id = %s) AND artist != %s",
+                [artist.name, artist.pk, artist.name],
+            )
+
+
+def remove(kind, pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLES[kind][0]} WHERE rowid = %s", [pk])
+
+
+def _upsert(kind, pk, values):
+    table, columns, _ = TABLES[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [pk])
+        cursor.execute(
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(columns))})",
+            [pk, *values],
+        )
+
+
+# -------------------------------
+# SCHEMA
+# -------------------------------
+
+# Queries producing each FTS table's rows from the catalog tables
+POPULATE_SQL = {
+    "song": (
+        'SELECT s.id, s."songTitle", ar."artistName", al."albumTitle" FROM tabs_song s '
+        "JOIN tabs_artist ar ON ar.id = s.artist_id JOIN tabs_album al ON al.id = s.album_id "
+        "WHERE NOT s.is_filler"
+    ),
+    "album": (
+        'SELECT al.id, al."albumTitle", ar."artistName" FROM tabs_album al '
+        "JOIN tabs_artist ar ON ar.id = al.artist_id"
+    ),
+    "artist": 'SELECT id, "artistName" FROM tabs_artist',
+}
+
+
+def fts5_supported(conn):
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_tables(conn):
+    with conn.cursor() as cursor:
+        for table, columns, _ in TABLES.values():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"{', '.join(columns)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+    _available.pop(conn.alias, None)
+
+
+def drop_tables(conn):
+    with conn.cursor() as cursor:
+        for table, _, _ in TABLES.values():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    _available.pop(conn.alias, None)
+
+
+def rebuild(conn=None):
+    """Repopulate every FTS table from the catalog tables."""
+    conn = connection if conn is None else conn
+    with conn.cursor() as cursor:
+        for kind, (table, columns, _) in TABLES.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {table} (rowid, {', '.join(columns)}) {POPULATE_SQL[kind]}"
+            )
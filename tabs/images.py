@@ -0,0 +1,259 @@
+"""
+Local, resized copies of the artist, album and tabber images.
+
+The models point artist_img, album_img and tabber_img at full-size JPEGs
+on remote storage, and every card used to download the original.
+``manage.py build_images`` fetches each source once and, in a process
+pool, writes WebP and JPEG copies at each of WIDTHS (none wider than the
+original) plus a tiny WebP placeholder. The copies go into a
+content-addressed store under MEDIA_ROOT, at images/<ab>/<digest>/, where
+digest is (a prefix of) the SHA-256 of the source bytes. Identical images are stored
+once, and a file's URL never changes what it serves, so it can be cached
+forever.
+
+MANIFEST_NAME maps every source URL to its digest and the HTTP
+validators it was fetched with, and every digest to its size, widths and
+placeholder. Reruns send those validators, so an unchanged source costs a
+304 and is never decoded again. Changed bytes get a new digest, and
+digests no source uses any more are deleted.
+
+The {% responsive_img %} tag renders from the manifest, re-reading it when
+a build replaces it. Each image becomes a <picture> with srcset, width
+and height, lazy loading, and the placeholder shown until it arrives.
+Sources the store doesn't have yet fall back to the remote original.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .models import Album, Artist, Tabber
+
+# Under MEDIA_ROOT (and MEDIA_URL)
+STORE = "images"
+MANIFEST_NAME = "manifest.json"
+
+WIDTHS = (160, 320, 640, 960)
+# The src browsers without srcset support load
+DEFAULT_WIDTH = 320
+FORMATS = {
+    "webp": ("WEBP", {"quality": 78, "method": 6}),
+    "jpg": ("JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+}
+PLACEHOLDER_WIDTH = 16
+
+# Hex digits of the SHA-256 kept in paths: plenty to tell images apart, and
+# every srcset repeats them
+DIGEST_LENGTH = 24
+
+FETCH_TIMEOUT = 30  # seconds
+
+# How often a serving process looks for a new manifest (seconds)
+RELOAD_INTERVAL = 30
+
+# The width each layout shows an image at, for the sizes attribute
+SIZES = {
+    # Listing grids: a 280px sidebar, then 2 to 5 columns
+    "grid": "(min-width: 1024px) 200px, (min-width: 768px) 25vw, (min-width: 640px) 33vw, 50vw",
+    # The artist page's album and song tiles: 1 or 2 columns
+    "tile": "(min-width: 768px) 600px, 100vw",
+    # Detail page headers
+    "header": "(min-width: 768px) 280px, 100vw",
+}
+
+SOURCE_FIELDS = ((Artist, "artist_img"), (Album, "album_img"), (Tabber, "tabber_img"))
+
+
+def store_dir():
+    return Path(settings.MEDIA_ROOT) / STORE
+
+
+def image_path(digest):
+    """The store directory, relative to the store, of the image with ``digest``."""
+    return f"{digest[:2]}/{digest}"
+
+
+def sources():
+    """Every image URL the catalog points at."""
+    urls = set()
+    for model, field in SOURCE_FIELDS:
+        urls.update(model.objects.exclude(**{field: ""}).order_by().values_list(field, flat=True).distinct())
+    return sorted(urls)
+
+
+# -------------------------------
+# BUILDING (run in the pool)
+# -------------------------------
+
+def process(url, previous, store, force=False):
+    """
+    Fetch ``url`` and write its variants into ``store`` if they aren't
+    there already. ``previous`` is the url's manifest entry from the last
+    run, or None. Returns (status, source entry, image entry), status
+    being "unchanged" (the server answered 304), "stored" (the bytes were
+    already in the store), "written" or "failed: <reason>".
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": "afra-tabs build_images"})
+    current = previous and (Path(store) / image_path(previous["digest"])).is_dir()
+    if current and not force:
+        if previous.get("etag"):
+            request.add_header("If-None-Match", previous["etag"])
+        if previous.get("last_modified"):
+            request.add_header("If-Modified-Since", previous["last_modified"])
+    try:
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            data = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and current:
+            return "unchanged", previous, None
+        return f"failed: HTTP {exc.code}", None, None
+    except (urllib.error.URLError, OSError) as exc:
+        return f"failed: {exc}", None, None
+
+    source = {
+        "digest": hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH],
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+    directory = Path(store) / image_path(source["digest"])
+    if (directory / "image.json").is_file() and not force:
+        return "stored", source, json.loads((directory / "image.json").read_text())
+    try:
+        image = write_variants(data, directory)
+    except (OSError, ValueError) as exc:
+        # Pillow raises these for files that aren't images it can read
+        return f"failed: {exc}", None, None
+    return "written", source, image
+
+
+def write_variants(data, directory):
+    """Write the variants of image ``data`` into ``directory``; returns its manifest entry."""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    widths = [width for width in WIDTHS if width < image.width]
+    if image.width <= WIDTHS[-1]:
+        widths.append(image.width)
+
+    # Written aside and moved into place whole, so a reader (or another
+    # worker storing the same bytes) never sees a partial directory
+    tmp = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    for width in widths:
+        resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        for extension, (kind, options) in FORMATS.items():
+            resized.save(tmp / f"{width}.{extension}", kind, **options)
+
+    placeholder = io.BytesIO()
+    image.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))), Image.BILINEAR
+    ).save(placeholder, "WEBP", quality=30)
+    entry = {
+        "width": widths[-1],
+        "height": round(image.height * widths[-1] / image.width),
+        "widths": widths,
+        "placeholder": "data:image/webp;base64," + base64.b64encode(placeholder.getvalue()).decode(),
+    }
+    (tmp / "image.json").write_text(json.dumps(entry))
+    try:
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not directory.is_dir():
+            raise
+    return entry
+
+
+# -------------------------------
+# MANIFEST
+# -------------------------------
+
+def read_manifest(store=None):
+    try:
+        return json.loads((Path(store or store_dir()) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {"version": "", "sources": {}, "images": {}}
+
+
+def write_manifest(sources, images, store=None):
+    """Make ``sources`` and ``images`` current, and delete the images no source uses."""
+    store = Path(store or store_dir())
+    used = {entry["digest"] for entry in sources.values()}
+    images = {digest: entry for digest, entry in images.items() if digest in used}
+    manifest = {"sources": sources, "images": images}
+    manifest["version"] = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+    store.mkdir(parents=True, exist_ok=True)
+    tmp = store / f"{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, store / MANIFEST_NAME)
+
+    removed = 0
+    for directory in store.glob("*/*"):
+        if directory.is_dir() and directory.name not in used:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+    return manifest["version"], removed
+
+
+# -------------------------------
+# SERVING
+# -------------------------------
+
+_loaded = {"checked": None, "mtime": None, "manifest": None}
+
+
+def manifest():
+    """The current manifest, re-read at most every RELOAD_INTERVAL seconds if it changed."""
+    now = time.monotonic()
+    if _loaded["checked"] is None or now - _loaded["checked"] > RELOAD_INTERVAL or settings.DEBUG:
+        _loaded["checked"] = now
+        try:
+            mtime = (store_dir() / MANIFEST_NAME).stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != _loaded["mtime"] or _loaded["manifest"] is None:
+            _loaded["manifest"] = read_manifest()
+            _loaded["mtime"] = mtime
+    return _loaded["manifest"]
+
+
+def version():
+    """Changes with every build that changes an image, for caches of rendered HTML."""
+    return manifest()["version"]
+
+
+def variants(url):
+    """
+    {"src", "srcset": {extension: srcset}, "width", "height",
+    "placeholder"} for the image at ``url``, or None if the store doesn't
+    have it.
+    """
+    current = manifest()
+    source = current["sources"].get(url)
+    image = source and current["images"].get(source["digest"])
+    if not image:
+        return None
+    base = f"{settings.MEDIA_URL}{STORE}/{image_path(source['digest'])}/"
+    default = max((width for width in image["widths"] if width <= DEFAULT_WIDTH), default=image["widths"][0])
+    return {
+        "src": f"{base}{default}.jpg",
+        "srcset": {
+            extension: ", ".join(f"{base}{width}.{extension} {width}w" for width in image["widths"])
+            for extension in FORMATS
+        },
+        "width": image["width"],
+        "height": image["height"],
+        "placeholder": image["placeholder"],
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from tabs.search_index import autocomplete_index
+from tabs.view_samples import autocomplete_urls
+
+# Untimed requests per path first, so imports and template loading aren't measured
+WARM_UP = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search_api throughput under concurrent autocomplete load through "
+        "Django's WSGI handler (on a thread pool, like a threaded WSGI server) and "
+        "its ASGI handler (on one event loop, like an ASGI server worker). Requests "
+        "are driven in-process, so no server or network is measured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Requests per handler (default: 2000).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Requests in flight at once: threads for WSGI, tasks for ASGI (default: 16).",
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2 or options["concurrency"] < 1:
+            raise CommandError("Need --requests of at least 2 and --concurrency of at least 1.")
+
+        # Built once per process at start-up, not per request
+        autocomplete_index.ensure_built()
+        urls = autocomplete_urls(random.Random(options["seed"]), options["requests"])
+        concurrency = options["concurrency"]
+
+        self.stdout.write(
+            f"{len(urls)} autocomplete requests, {concurrency} at a time\n"
+            f"{'handler':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        failed = 0
+        for name, run in (("WSGI", run_wsgi), ("ASGI", run_asgi)):
+            run(urls[:WARM_UP], concurrency)
+            started = time.perf_counter()
+            samples = run(urls, concurrency)
+            elapsed = time.perf_counter() - started
+
+            latencies = [ms for ms, _ in samples]
+            errors = sum(status != 200 for _, status in samples)
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            self.stdout.write(
+                f"{name:<8} {len(samples) / elapsed:>8.0f} {cuts[49]:>8.1f} "
+                f"{cuts[94]:>8.1f} {cuts[98]:>8.1f} {errors:>7}"
+            )
+            failed += errors
+
+        if failed:
+            raise CommandError(f"{failed} requests failed.")
+
+
+def run_wsgi(urls, concurrency):
+    """Request every URL through a WSGIHandler; returns [(ms, status)]."""
+    handler = WSGIHandler()
+
+    def request(url):
+        parts = urlsplit(url)
+        environ = {"PATH_INFO": parts.path, "QUERY_STRING": parts.query}
+        setup_testing_defaults(environ)
+        status = []
+        start = time.perf_counter()
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return (time.perf_counter() - start) * 1000, int(status[0].split()[0])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(request, urls))
+
+
+def run_asgi(urls, concurrency):
+    """Request every URL through an ASGIHandler; returns [(ms, status)]."""
+    return asyncio.run(_run_asgi(urls, concurrency))
+
+
+async def _run_asgi(urls, concurrency):
+    handler = ASGIHandler()
+    pending = iter(urls)
+    samples = []
+
+    async def request(url):
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"127.0.0.1")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("127.0.0.1", 80),
+        }
+        body_sent = False
+        # The handler listens for a disconnect until the response is sent
+        disconnect = asyncio.Event()
+        status = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        start = time.perf_counter()
+        await handler(scope, receive, send)
+        disconnect.set()
+        return (time.perf_counter() - start) * 1000, status[0]
+
+    async def worker():
+        for url in pending:
+            samples.append(await request(url))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
@@ -0,0 +1,143 @@
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tabs.facets import facet_index
+from tabs.models import Song
+from tabs.search_index import autocomplete_index
+from tabs.view_samples import benchmark_urls, bypass_page_cache, fetch, without_view_counts
+
+# Public views the readers request; the change feed streams whole tables and isn't one of them
+READ_VIEWS = (
+    "tabs:base", "tabs:tabs_list", "tabs:albums_list", "tabs:artists_list",
+    "tabs:song_detail", "tabs:song_panel", "tabs:album_detail", "tabs:artist_detail",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure public page latency with concurrent readers, first alone and "
+        "then while a writer re-saves songs back to back the way the admin does "
+        "(one transaction per save, signal receivers included). Saves leave the "
+        "songs unchanged apart from date_last_edited. Compare journal settings "
+        "by running it again with e.g. SQLITE_PRAGMAS=journal_mode=delete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8, help="Reader threads (default: 8).")
+        parser.add_argument(
+            "--duration", type=float, default=10.0, help="Seconds per phase (default: 10)."
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+
+    def handle(self, *args, **options):
+        if options["readers"] < 1 or options["duration"] <= 0:
+            raise CommandError("Need at least one reader and a positive --duration.")
+
+        # Built once per process at start-up, not per request
+        autocomplete_index.ensure_built()
+        facet_index.ensure_built()
+        rng = random.Random(options["seed"])
+        urls = [url for name, url in benchmark_urls(rng, 50) if name in READ_VIEWS]
+        song_ids = list(Song.objects.filter(is_filler=False).values_list("pk", flat=True)[:1000])
+        if not urls or not song_ids:
+            raise CommandError("The catalog is empty; generate one with generate_catalog first.")
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['duration']:.0f}s per phase, "
+            f"journal_mode={self._journal_mode()}\n"
+            f"{'phase':<8} {'reads/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'errors':>7} {'saves/s':>8} {'save p95':>9}"
+        )
+        setup_test_environment()
+        uncached = bypass_page_cache()
+        uncached.enable()
+        uncounted = without_view_counts()
+        uncounted.enable()
+        failed = 0
+        try:
+            for phase, writing in (("idle", False), ("saving", True)):
+                reads, saves, errors = run_phase(
+                    urls, song_ids, options["readers"], options["duration"], writing, options["seed"]
+                )
+                cuts = statistics.quantiles(reads, n=100, method="inclusive") if len(reads) > 1 else [0] * 99
+                save_p95 = (
+                    f"{statistics.quantiles(saves, n=100, method='inclusive')[94]:>9.1f}"
+                    if len(saves) > 1 else f"{'-':>9}"
+                )
+                self.stdout.write(
+                    f"{phase:<8} {len(reads) / options['duration']:>8.0f} {cuts[49]:>8.1f} "
+                    f"{cuts[94]:>8.1f} {cuts[98]:>8.1f} {errors:>7} "
+                    f"{len(saves) / options['duration']:>8.1f} {save_p95}"
+                )
+                failed += errors
+        finally:
+            uncounted.disable()
+            uncached.disable()
+            teardown_test_environment()
+
+        if failed:
+            raise CommandError(f"{failed} requests or saves failed.")
+
+    @staticmethod
+    def _journal_mode():
+        with connections["default"].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            return cursor.fetchone()[0]
+
+
+def run_phase(urls, song_ids, readers, duration, writing, seed):
+    """Read (and save, if ``writing``) for ``duration`` seconds; returns (read ms, save ms, errors)."""
+    deadline = time.perf_counter() + duration
+    reads, saves = [], []
+    errors = 0
+    lock = threading.Lock()
+
+    def read(index):
+        nonlocal errors
+        rng = random.Random(seed + index)
+        client = Client(raise_request_exception=False)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = fetch(client, rng.choice(urls)).status_code
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    reads.append(elapsed)
+                    errors += status != 200
+        finally:
+            connections.close_all()
+
+    def save():
+        nonlocal errors
+        rng = random.Random(seed)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    # As the admin saves: one transaction, signal receivers included
+                    with transaction.atomic():
+                        Song.objects.get(pk=rng.choice(song_ids)).save()
+                except DatabaseError:
+                    with lock:
+                        errors += 1
+                    continue
+                with lock:
+                    saves.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+    if writing:
+        threads.append(threading.Thread(target=save))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return reads, saves, errors
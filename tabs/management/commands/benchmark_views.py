@@ -0,0 +1,198 @@
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tabs import fulltext
+from tabs.models import Album, Artist, Song
+from tabs.facets import facet_index
+from tabs.query_stats import QueryRecorder
+from tabs.search_index import autocomplete_index
+from tabs.view_samples import benchmark_urls, bypass_page_cache, fetch, without_view_counts
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "views.json"
+
+# p95 changes smaller than this are noise, whatever the percentage
+NOISE_FLOOR_MS = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every tabs URL pattern with the test client under a randomized but "
+        "reproducible mix of parameters, report p50/p95/p99 latency and query "
+        "counts per pattern, and fail on regressions against a baseline file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Requests per URL pattern (default: 50).",
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+        parser.add_argument(
+            "--baseline",
+            default=str(DEFAULT_BASELINE),
+            help=f"Baseline JSON to compare with (default: {DEFAULT_BASELINE.relative_to(settings.BASE_DIR)}).",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results to --baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed p95 slowdown as a fraction of the baseline (default: 0.5).",
+        )
+        parser.add_argument(
+            "--page-cache",
+            action="store_true",
+            help="Leave the page cache on (by default every request runs its view).",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        baseline_path = Path(options["baseline"])
+
+        # Built (or probed) once per process, not per request
+        autocomplete_index.ensure_built()
+        facet_index.ensure_built()
+        fulltext.is_available()
+
+        urls = benchmark_urls(random.Random(options["seed"]), options["requests"])
+        random.Random(options["seed"]).shuffle(urls)
+
+        setup_test_environment()
+        uncached = None if options["page_cache"] else bypass_page_cache()
+        if uncached:
+            uncached.enable()
+        uncounted = without_view_counts()
+        uncounted.enable()
+        try:
+            timings, errors = self._run(urls)
+        finally:
+            uncounted.disable()
+            if uncached:
+                uncached.disable()
+            teardown_test_environment()
+
+        results = {
+            "catalog": {
+                "songs": Song.objects.count(),
+                "albums": Album.objects.count(),
+                "artists": Artist.objects.count(),
+            },
+            "requests": options["requests"],
+            "seed": options["seed"],
+            "views": {name: summarize(samples) for name, samples in sorted(timings.items())},
+        }
+
+        baseline = None
+        if not options["save_baseline"] and baseline_path.exists():
+            try:
+                baseline = json.loads(baseline_path.read_text())
+            except ValueError as exc:
+                raise CommandError(f"Unreadable baseline {baseline_path}: {exc}") from exc
+        self._report(results, baseline)
+
+        for url, status in errors:
+            self.stderr.write(f"{url}: HTTP {status}")
+        if errors:
+            raise CommandError(f"{len(errors)} requests failed.")
+
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+        if baseline is None:
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+            return
+
+        if results["catalog"] != baseline.get("catalog"):
+            self.stdout.write("The catalog differs from the baseline's; comparing query counts only.")
+        regressions = compare(results, baseline, options["tolerance"])
+        for problem in regressions:
+            self.stderr.write(problem)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regressions against {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def _run(self, urls):
+        """Request every URL; returns ({name: [(ms, queries)]}, [(url, status)])."""
+        client = Client()
+        # One untimed pass per pattern, so template loading isn't measured
+        for url in dict(urls).values():
+            client.get(url)
+
+        timings = defaultdict(list)
+        errors = []
+        for name, url in urls:
+            with QueryRecorder() as recorder:
+                start = time.perf_counter()
+                response = fetch(client, url)
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                errors.append((url, response.status_code))
+            timings[name].append((elapsed, recorder.count))
+        return timings, errors
+
+    def _report(self, results, baseline):
+        base_views = (baseline or {}).get("views", {})
+        self.stdout.write(
+            f"{'view':<20} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>8} {'max':>4} {'base p95':>9}"
+        )
+        for name, view in results["views"].items():
+            base = base_views.get(name, {}).get("p95_ms")
+            self.stdout.write(
+                f"{name.partition(':')[2]:<20} {view['count']:>4} {view['p50_ms']:>8.1f} "
+                f"{view['p95_ms']:>8.1f} {view['p99_ms']:>8.1f} {view['queries_mean']:>8.1f} "
+                f"{view['queries_max']:>4} {'' if base is None else f'{base:.1f}':>9}"
+            )
+
+
+def summarize(samples):
+    """Latency percentiles and query counts for (ms, queries) samples."""
+    latencies = [ms for ms, _ in samples]
+    queries = [count for _, count in samples]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "queries_mean": round(statistics.fmean(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of ``results`` against ``baseline``. Query counts must never
+    grow; latency is only compared when the catalog is the same size, as
+    timings from a different catalog mean nothing.
+    """
+    same_catalog = results["catalog"] == baseline.get("catalog")
+    problems = []
+    for name, view in results["views"].items():
+        base = baseline.get("views", {}).get(name)
+        if base is None:
+            continue
+        if view["queries_max"] > base["queries_max"]:
+            problems.append(f"{name}: up to {view['queries_max']} queries, baseline {base['queries_max']}")
+        slower = view["p95_ms"] - base["p95_ms"]
+        if same_catalog and slower > NOISE_FLOOR_MS and view["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {view['p95_ms']:.1f} ms, baseline {base['p95_ms']:.1f} ms")
+    return problems
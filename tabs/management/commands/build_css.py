@@ -0,0 +1,56 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from tabs import stylesheet
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the site stylesheet: style.css and the Tailwind utilities the "
+        "templates use, purged of unused rules, minified, and written under a "
+        "content-hashed name with gzip and brotli copies. Rerun after changing "
+        "a template's classes or style.css."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Write nothing; fail if the current build is out of date.",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=stylesheet.KEEP_BUILDS,
+            help=(
+                "Builds to keep, the new one included (default: "
+                f"{stylesheet.KEEP_BUILDS}). Use 1 for a build to commit."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        css, stats = stylesheet.build()
+        self.stdout.write(
+            f"{stats['classes']} classes in templates, {stats['utilities']} of them "
+            f"Tailwind utilities; kept {stats['kept']} style.css rules, dropped {stats['dropped']}"
+        )
+        if stats["unmatched"] and options["verbosity"] > 1:
+            self.stdout.write("Classes with no styles: " + " ".join(stats["unmatched"]))
+
+        if options["check"]:
+            try:
+                current = stylesheet.current()
+            except ImproperlyConfigured as exc:
+                raise CommandError(str(exc)) from exc
+            if current.rsplit("/", 1)[-1] != stylesheet.filename(css):
+                raise CommandError(f"{current} is out of date; run manage.py build_css.")
+            self.stdout.write(f"{current} is up to date")
+            return
+
+        if options["keep"] < 1:
+            raise CommandError("--keep must be at least 1.")
+        written = stylesheet.write(css, options["keep"])
+        for path in written:
+            self.stdout.write(f"{path.relative_to(stylesheet.source_dir())}: {path.stat().st_size} bytes")
+        if not any(path.suffix == ".br" for path in written):
+            self.stderr.write("The brotli module isn't installed; no .br copy written.")
@@ -0,0 +1,78 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tabs import images, page_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch every artist, album and tabber image and store resized WebP and "
+        "JPEG copies and a placeholder under MEDIA_ROOT for the templates to "
+        "serve. Reruns only re-fetch images their server says changed, and only "
+        "re-encode images whose bytes changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Fetching and encoding processes (default: one per CPU).",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-fetch and re-encode every image.")
+
+    def handle(self, *args, **options):
+        store = images.store_dir()
+        urls = images.sources()
+        previous = images.read_manifest(store)
+        sources = {}
+        stored = dict(previous["images"])
+        statuses = Counter()
+        failures = []
+
+        for url, (status, source, image) in zip(urls, self._process(urls, previous, store, options)):
+            if status.startswith("failed"):
+                failures.append((url, status))
+                # Keep serving what the last run stored, if anything
+                if url in previous["sources"]:
+                    sources[url] = previous["sources"][url]
+                continue
+            statuses[status] += 1
+            sources[url] = source
+            if image is not None:
+                stored[source["digest"]] = image
+
+        version, removed = images.write_manifest(sources, stored, store)
+        if version != previous["version"]:
+            # Cached pages still have the old image URLs
+            page_cache.invalidate_all()
+
+        for url, status in failures:
+            self.stderr.write(f"{url}: {status}")
+        self.stdout.write(
+            f"{statuses['written']} images written, {statuses['stored']} already stored, "
+            f"{statuses['unchanged']} unchanged, {removed} removed, {len(failures)} failed."
+        )
+        if urls and len(failures) == len(urls):
+            raise CommandError("No image could be fetched.")
+
+    def _process(self, urls, previous, store, options):
+        """Yield process()'s result for each of ``urls``, in order."""
+        arguments = (
+            urls,
+            [previous["sources"].get(url) for url in urls],
+            [str(store)] * len(urls),
+            [options["force"]] * len(urls),
+        )
+        workers = max(1, options["workers"])
+        if workers == 1 or len(urls) <= 1:
+            yield from map(images.process, *arguments)
+            return
+        # Forked workers mustn't share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(images.process, *arguments, chunksize=16)
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import resolve
+
+from tabs.facets import facet_index
+from tabs.query_stats import REPEAT_THRESHOLD, QueryRecorder, budget_problems
+from tabs.search_index import autocomplete_index
+from tabs.view_samples import bypass_page_cache, fetch, sample_urls, without_view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every public view against the current database and fail if one "
+        "runs more queries than its @query_budget, or runs the same statement "
+        "shape repeatedly (an N+1)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat-threshold",
+            type=int,
+            default=REPEAT_THRESHOLD,
+            help=(
+                "Report a statement shape run this many times in one request "
+                f"(default: {REPEAT_THRESHOLD})."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        threshold = options["repeat_threshold"]
+        failures = []
+
+        # Built once per process at start-up, not per request
+        autocomplete_index.ensure_built()
+        facet_index.ensure_built()
+
+        setup_test_environment()
+        uncached = bypass_page_cache()
+        uncached.enable()
+        uncounted = without_view_counts()
+        uncounted.enable()
+        try:
+            client = Client()
+            for name, url in sample_urls():
+                view = resolve(url.partition("?")[0]).func
+                budget = getattr(view, "query_budget", None)
+                with QueryRecorder() as recorder:
+                    response = fetch(client, url)
+
+                problems = []
+                if response.status_code != 200:
+                    problems.append(f"HTTP {response.status_code}")
+                problems.extend(budget_problems(view, recorder, threshold))
+
+                self.stdout.write(
+                    f"{url}: {recorder.count}/{budget} queries, "
+                    f"{recorder.duration * 1000:.1f} ms in SQL"
+                )
+                failures.extend((url, problem) for problem in problems)
+        finally:
+            uncounted.disable()
+            uncached.disable()
+            teardown_test_environment()
+
+        if failures:
+            for url, problem in failures:
+                self.stderr.write(f"{url}: {problem}")
+            raise CommandError(f"{len(failures)} query budget problems.")
+        self.stdout.write(self.style.SUCCESS("Every view is within its query budget."))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import resolve
+
+from tabs.facets import facet_index
+from tabs.query_stats import QueryRecorder, full_scans, query_plan, unbounded_sorts
+from tabs.search_index import autocomplete_index
+from tabs.view_samples import bypass_page_cache, fetch, sample_urls, without_view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every public view against the current database, run EXPLAIN "
+        "QUERY PLAN on each SELECT it issues, and fail if any falls back to a "
+        "full table scan or sorts an unbounded set of rows."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("check_query_plans only understands SQLite query plans.")
+
+        verbosity = options["verbosity"]
+        failures = []
+
+        # The one-off index load is a deliberate full read; keep it out of the check
+        autocomplete_index.ensure_built()
+        facet_index.ensure_built()
+
+        setup_test_environment()
+        uncached = bypass_page_cache()
+        uncached.enable()
+        uncounted = without_view_counts()
+        uncounted.enable()
+        try:
+            client = Client()
+            for name, url in sample_urls():
+                with QueryRecorder(keep_statements=True) as recorder:
+                    response = fetch(client, url)
+                if response.status_code != 200:
+                    failures.append((url, f"HTTP {response.status_code}", []))
+                    continue
+                # Views that export whole tables are expected to scan them
+                expected = getattr(resolve(url.partition("?")[0]).func, "full_scan", False)
+                captured = [
+                    (sql, params) for sql, params in recorder.statements
+                    if sql.lstrip().upper().startswith("SELECT")
+                ]
+                for sql, params in captured:
+                    plan = query_plan(sql, params)
+                    problems = full_scans(sql, plan) + unbounded_sorts(sql, plan)
+                    if problems and not expected:
+                        failures.append((url, sql, plan))
+                    if verbosity >= 2:
+                        self.stdout.write(f"{url}\n  {sql}")
+                        for line in plan:
+                            self.stdout.write(f"    {line}")
+                if verbosity >= 1:
+                    self.stdout.write(f"{url}: {len(captured)} queries checked")
+        finally:
+            uncounted.disable()
+            uncached.disable()
+            teardown_test_environment()
+
+        if failures:
+            for url, sql, plan in failures:
+                self.stderr.write(f"\n{url}\n  {sql}")
+                for line in plan:
+                    self.stderr.write(f"    {line}")
+            raise CommandError(f"{len(failures)} queries regressed to a full table scan or sort.")
+        self.stdout.write(self.style.SUCCESS("No full table scans or unbounded sorts."))
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Max
+from django.test import Client
+from django.urls import reverse
+
+from tabs import images
+from tabs.models import Album, Artist, CatalogStats, Song, SongChangeLog, Tabber
+from tabs.view_samples import without_view_counts
+from tabs.views import PAGE_SIZE
+
+MANIFEST_NAME = "manifest.json"
+
+# URLs handed to a worker at a time
+CHUNK_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every public page (home, about, listings with their pages, and "
+        "every artist, album and song, with the song pages' panels) into a "
+        "static directory. Reruns only re-render pages whose inputs changed, "
+        "tracked in a manifest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory to write the site into.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Rendering processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host name to render with; must be in ALLOWED_HOSTS (default: localhost).",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-render every page.")
+
+    def handle(self, *args, **options):
+        output = Path(options["output"])
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST_NAME
+        previous = {}
+        if manifest_path.exists():
+            try:
+                previous = json.loads(manifest_path.read_text())["pages"]
+            except (ValueError, KeyError) as exc:
+                raise CommandError(f"Unreadable manifest {manifest_path}: {exc}") from exc
+
+        pages = plan_pages()
+        todo = [
+            url for url, (filename, fingerprint) in pages.items()
+            if options["force"]
+            or previous.get(url, {}).get("fingerprint") != fingerprint
+            or not (output / filename).exists()
+        ]
+        removed = [entry["file"] for url, entry in previous.items() if url not in pages]
+        for filename in removed:
+            (output / filename).unlink(missing_ok=True)
+
+        failures = dict(self._render(todo, output, options["host"], max(1, options["workers"])))
+        manifest = {
+            url: {"file": filename, "fingerprint": fingerprint}
+            for url, (filename, fingerprint) in pages.items()
+            if url not in failures
+        }
+        tmp = manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"pages": manifest}, indent=1, sort_keys=True))
+        os.replace(tmp, manifest_path)
+
+        for url, status in sorted(failures.items()):
+            self.stderr.write(f"{url}: HTTP {status}")
+        self.stdout.write(
+            f"{len(todo) - len(failures)} pages rendered, {len(pages) - len(todo)} unchanged, "
+            f"{len(removed)} removed."
+        )
+        if failures:
+            raise CommandError(f"{len(failures)} pages failed to render.")
+        self.stdout.write(self.style.SUCCESS(f"Site exported to {output}"))
+
+    def _render(self, urls, output, host, workers):
+        """Yield (url, status) for every page that didn't render."""
+        chunks = [urls[i:i + CHUNK_SIZE] for i in range(0, len(urls), CHUNK_SIZE)]
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield from render_pages(str(output), host, chunk)
+            return
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            for failed in pool.map(render_pages, [str(output)] * len(chunks), [host] * len(chunks), chunks):
+                yield from failed
+
+
+def render_pages(output, host, urls):
+    """Render ``urls`` into ``output``; returns (url, status) for failures."""
+    client = Client(SERVER_NAME=host)
+    failures = []
+    with without_view_counts():
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                failures.append((url, response.status_code))
+                continue
+            target = Path(output) / output_file(url)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.write_bytes(response.content)
+            os.replace(tmp, target)
+    return failures
+
+
+def output_file(url):
+    """/tabs/x/ -> tabs/x/index.html; /tabs/?page=3 -> tabs/page/3/index.html"""
+    path, _, query = url.partition("?")
+    parts = [part for part in path.split("/") if part]
+    if query:
+        parts += ["page", query.partition("=")[2]]
+    return "/".join(parts + ["index.html"])
+
+
+# -------------------------------
+# FINGERPRINTS
+# -------------------------------
+
+def _fingerprint(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def templates_version():
+    """Any template edit changes every page."""
+    digest = hashlib.sha1()
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for path in sorted(Path(directory).rglob("*.html")):
+            digest.update(str(path).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _url_builder(name, arity):
+    """
+    A fast stand-in for reverse(name, args=slugs), which is too slow to
+    call once per song: reverse once with placeholders, then substitute.
+    """
+    placeholders = [f"--slug{i}--" for i in range(arity)]
+    template = reverse(name, args=placeholders)
+
+    def build(*slugs):
+        url = template
+        for placeholder, slug in zip(placeholders, slugs):
+            url = url.replace(placeholder, slug)
+        return url
+
+    return build
+
+
+def _totals(queryset, field):
+    """field value -> (row count, latest date_last_edited), in one query."""
+    return {
+        row[field]: (row["n"], row["latest"])
+        for row in queryset.order_by().values(field).annotate(n=Count("pk"), latest=Max("date_last_edited"))
+    }
+
+
+def plan_pages():
+    """
+    Map every exported URL to (output file, fingerprint). A fingerprint
+    covers everything the page shows: its own row's date_last_edited,
+    its parents', and counts plus latest edits of the rows it lists, so
+    additions, edits and deletions all change it.
+    """
+    # Pages link image variants too, which a new image build can replace
+    templates = _fingerprint(templates_version(), images.version())
+    album_songs = _totals(Song.objects.all(), "album_id")
+    artist_songs = _totals(Song.objects.all(), "artist_id")
+    artist_albums = _totals(Album.objects.all(), "artist_id")
+
+    tabber_names = dict(Tabber.objects.values_list("pk", "name"))
+    song_tabbers = defaultdict(list)
+    for song_id, tabber_id in Song.tabber.through.objects.order_by("pk").values_list("song_id", "tabber_id"):
+        song_tabbers[song_id].append(tabber_names.get(tabber_id))
+    changelogs = {
+        row["song_id"]: (row["n"], row["latest"])
+        for row in SongChangeLog.objects.order_by().values("song_id").annotate(
+            n=Count("pk"), latest=Max("change_date")
+        )
+    }
+
+    catalog = _fingerprint(
+        templates,
+        Song.objects.aggregate(n=Count("pk"), latest=Max("date_last_edited")),
+        Album.objects.aggregate(n=Count("pk"), latest=Max("date_last_edited")),
+        Artist.objects.aggregate(n=Count("pk"), latest=Max("date_last_edited")),
+        CatalogStats.objects.values().first(),
+    )
+
+    pages = {}
+
+    def add(url, fingerprint):
+        pages[url] = (output_file(url), fingerprint)
+
+    add(reverse("tabs:base"), catalog)
+    add(reverse("tabs:about"), _fingerprint(templates))
+    for name, count in (
+        ("tabs:tabs_list", Song.objects.filter(is_filler=False).count()),
+        ("tabs:albums_list", Album.objects.count()),
+        ("tabs:artists_list", Artist.objects.count()),
+    ):
+        add(reverse(name), catalog)
+        for number in range(2, (count + PAGE_SIZE - 1) // PAGE_SIZE + 1):
+            add(f"{reverse(name)}?page={number}", catalog)
+
+    artist_url = _url_builder("tabs:artist_detail", 1)
+    album_url = _url_builder("tabs:album_detail", 2)
+    song_url = _url_builder("tabs:song_detail", 3)
+    panel_url = _url_builder("tabs:song_panel", 4)
+
+    artists = {}
+    for pk, slug, edited in Artist.objects.values_list("pk", "name_cleaned", "date_last_edited").iterator():
+        artists[pk] = (slug, edited)
+        add(
+            artist_url(slug),
+            _fingerprint(templates, edited, artist_albums.get(pk), artist_songs.get(pk)),
+        )
+
+    albums = {}
+    for pk, slug, artist_id, edited in Album.objects.values_list(
+        "pk", "title_cleaned", "artist_id", "date_last_edited"
+    ).iterator():
+        albums[pk] = (slug, edited)
+        artist_slug, artist_edited = artists[artist_id]
+        add(
+            album_url(artist_slug, slug),
+            _fingerprint(templates, edited, artist_edited, album_songs.get(pk)),
+        )
+
+    for pk, slug, album_id, artist_id, edited in Song.objects.filter(is_filler=False).values_list(
+        "pk", "title_cleaned", "album_id", "artist_id", "date_last_edited"
+    ).iterator():
+        artist_slug, artist_edited = artists[artist_id]
+        album_slug, album_edited = albums[album_id]
+        page = _fingerprint(templates, edited, album_edited, artist_edited)
+        add(song_url(artist_slug, album_slug, slug), page)
+        # The panels song pages fetch when they are opened
+        for panel, shown in (
+            ("changelog", changelogs.get(pk)),
+            ("tabbers", song_tabbers.get(pk)),
+            ("related", album_songs.get(album_id)),
+        ):
+            add(panel_url(artist_slug, album_slug, slug, panel), _fingerprint(page, shown))
+    return pages
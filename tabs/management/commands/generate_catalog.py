@@ -0,0 +1,251 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, IntegerField, Value
+from django.db.models.functions import Cast, Mod
+from django.utils.text import slugify
+
+from tabs import fulltext, page_cache, tab_counts
+from tabs.models import Album, Artist, CatalogStats, Song, SongChangeLog, Tabber
+
+WORDS = (
+    "dark night wolf blood king moon storm black fire death shadow iron ghost "
+    "frozen light sorrow winter grave raven steel silent burning crimson empty "
+    "golden broken hollow wild electric last lost eternal cold rising fallen "
+    "river mountain ocean desert city road heart soul dream machine empire "
+    "garden tower kingdom sky sun star rain thunder glass stone echo signal"
+).split()
+
+# Weighted like a real catalog: mostly standard and drop tunings
+TUNINGS = (
+    ("E Standard", 50), ("Drop D", 20), ("Drop C", 10), ("Drop B", 5),
+    ("DADGAD", 3), ("Eb Standard", 7), (None, 5),
+)
+DIFFICULTIES = ((1, 30), (2, 35), (3, 25), (4, 10))
+CHANGE_SUMMARIES = (
+    "Fixed chord names in the chorus",
+    "Corrected the solo",
+    "Added missing bridge",
+    "Updated tuning",
+    "Fixed rhythm in verse 2",
+    "Added palm muting marks",
+    "Re-tabbed the intro",
+)
+
+# Songs and changelog rows are dated back from here, so the data is identical on every run
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a reproducible synthetic catalog (artists, "
+        "albums, songs, tabbers and changelog rows) for load testing and "
+        "benchmarks. The same --seed always produces the same catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--artists", type=int, default=5000, help="Artists (default: 5000).")
+        parser.add_argument("--albums", type=int, default=50000, help="Albums (default: 50000).")
+        parser.add_argument("--songs", type=int, default=500000, help="Songs (default: 500000).")
+        parser.add_argument("--tabbers", type=int, default=50, help="Tabbers (default: 50).")
+        parser.add_argument(
+            "--changelog", type=int, default=50000, help="Song changelog rows (default: 50000)."
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+
+    def handle(self, *args, **options):
+        if not 0 < options["artists"] <= options["albums"] <= options["songs"]:
+            raise CommandError("Need 0 < --artists <= --albums <= --songs.")
+        if Song.objects.exists() or Album.objects.exists() or Artist.objects.exists():
+            raise CommandError("The catalog isn't empty; generate into a fresh database.")
+
+        started = time.monotonic()
+        generator = CatalogGenerator(random.Random(options["seed"]))
+        with transaction.atomic():
+            for label, step, count in (
+                ("artists", generator.artists, options["artists"]),
+                ("albums", generator.albums, options["albums"]),
+                ("tabbers", generator.tabbers, options["tabbers"]),
+                ("songs", generator.songs, options["songs"]),
+                ("changelog rows", generator.changelog, options["changelog"]),
+            ):
+                step(count)
+                self.stdout.write(f"{count} {label}")
+            generator.finish()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalog generated in {time.monotonic() - started:.1f}s."
+        ))
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return lambda: rng.choices(values, weights)[0]
+
+
+def _skewed(rng, n):
+    """An index in range(n), favouring low ones: a few artists/albums get most rows."""
+    return lambda: int(n * rng.random() ** 1.3)
+
+
+def _scatter(limit):
+    """A fixed pseudo-random integer in range(limit) per row, from its pk."""
+    return Cast(Mod(F("pk") * Value(7919), Value(limit)), IntegerField())
+
+
+class CatalogGenerator:
+    """
+    Writes the catalog with bulk_create in batches. bulk_create skips
+    save() and the signal receivers, so derived fields come from the
+    models' set_derived_fields() and everything the receivers maintain
+    is rebuilt once at the end.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.artist_list = []
+        self.album_list = []
+        self.tabber_ids = []
+        self.song_ids = []
+
+    def _name(self, low, high):
+        return " ".join(self.rng.choice(WORDS).title() for _ in range(self.rng.randint(low, high)))
+
+    def _unique(self, name, taken):
+        """``name``, numbered if its slug is already in ``taken``."""
+        candidate, number = name, 1
+        while slugify(candidate) in taken:
+            number += 1
+            candidate = f"{name} {number}"
+        taken.add(slugify(candidate))
+        return candidate
+
+    def artists(self, count):
+        taken = set()
+        for start in range(0, count, BATCH_SIZE):
+            batch = []
+            for _ in range(start, min(count, start + BATCH_SIZE)):
+                artist = Artist(name=self._unique(self._name(1, 3), taken))
+                artist.set_derived_fields()
+                batch.append(artist)
+            self.artist_list.extend(Artist.objects.bulk_create(batch))
+
+    def albums(self, count):
+        # Every artist gets one album; the rest go mostly to popular artists
+        pick_artist = _skewed(self.rng, len(self.artist_list))
+        taken = {artist.pk: set() for artist in self.artist_list}
+        for start in range(0, count, BATCH_SIZE):
+            batch = []
+            for index in range(start, min(count, start + BATCH_SIZE)):
+                artist = self.artist_list[index if index < len(self.artist_list) else pick_artist()]
+                album = Album(
+                    artist=artist,
+                    title=self._unique(self._name(1, 4), taken[artist.pk]),
+                    release_year=str(self.rng.randint(1965, 2024)),
+                    is_complete=self.rng.random() < 0.3,
+                )
+                album.set_derived_fields()
+                batch.append(album)
+            self.album_list.extend(Album.objects.bulk_create(batch))
+
+    def tabbers(self, count):
+        taken = set()
+        for _ in range(count):
+            tabber = Tabber(name=self._unique(self._name(1, 2), taken))
+            tabber.save()
+            self.tabber_ids.append(tabber.pk)
+
+    def songs(self, count):
+        rng = self.rng
+        pick_album = _skewed(rng, len(self.album_list))
+        tuning = _weighted(rng, TUNINGS)
+        difficulty = _weighted(rng, DIFFICULTIES)
+        taken = {album.pk: set() for album in self.album_list}
+        Through = Song.tabber.through
+
+        for start in range(0, count, BATCH_SIZE):
+            batch = []
+            for index in range(start, min(count, start + BATCH_SIZE)):
+                album = self.album_list[index if index < len(self.album_list) else pick_album()]
+                is_filler = rng.random() < 0.03
+                song = Song(
+                    title=self._unique(self._name(1, 4), taken[album.pk]),
+                    album=album,
+                    artist=album.artist,
+                    track_num=len(taken[album.pk]),
+                    duration=timedelta(seconds=rng.randint(90, 600)),
+                    tuning=tuning(),
+                    difficulty=difficulty(),
+                    riffs=rng.randint(0, 12),
+                    artist_verified=rng.random() < 0.15,
+                    was_request=rng.random() < 0.1,
+                    is_filler=is_filler,
+                    cover_video=(
+                        f"https://www.youtube.com/watch?v={rng.getrandbits(40):010x}"
+                        if not is_filler and rng.random() < 0.2 else ""
+                    ),
+                )
+                song.set_derived_fields()
+                batch.append(song)
+            Song.objects.bulk_create(batch)
+            if self.tabber_ids:
+                Through.objects.bulk_create([
+                    Through(song_id=song.pk, tabber_id=tabber_id)
+                    for song in batch if not song.is_filler
+                    for tabber_id in set(rng.choices(self.tabber_ids, k=1 + (rng.random() < 0.2)))
+                ])
+            self.song_ids.extend(song.pk for song in batch)
+
+    def changelog(self, count):
+        if not self.song_ids:
+            return
+        for start in range(0, count, BATCH_SIZE):
+            batch = [
+                SongChangeLog(
+                    song_id=self.rng.choice(self.song_ids),
+                    change_summary=self.rng.choice(CHANGE_SUMMARIES),
+                )
+                for _ in range(start, min(count, start + BATCH_SIZE))
+            ]
+            SongChangeLog.objects.bulk_create(batch)
+
+    def backdate(self):
+        """
+        auto_now_add overrides dates on insert, so spread them afterwards
+        with one UPDATE per table, derived from the pk: songs are added two
+        minutes apart up to EPOCH and edited within 30 days of that; other
+        rows are dated anywhere in the songs' span.
+        """
+        def minutes(expression):
+            # Durations are stored as microseconds
+            return ExpressionWrapper(expression * Value(60 * 10**6), output_field=DurationField())
+
+        if self.song_ids:
+            age = (Value(max(self.song_ids)) - F("pk")) * Value(2)
+            Song.objects.update(
+                date_added=ExpressionWrapper(Value(EPOCH) - minutes(age), output_field=DateTimeField()),
+                date_last_edited=ExpressionWrapper(
+                    Value(EPOCH) - minutes(age - _scatter(30 * 24 * 60)),
+                    output_field=DateTimeField(),
+                ),
+            )
+        anytime = ExpressionWrapper(
+            Value(EPOCH) - minutes(_scatter(2 * len(self.song_ids) or 1)), output_field=DateTimeField()
+        )
+        Artist.objects.update(date_last_edited=anytime)
+        Album.objects.update(date_last_edited=anytime)
+        SongChangeLog.objects.update(change_date=anytime)
+
+    def finish(self):
+        """Backdate, then bring everything signals would have maintained up to date."""
+        self.backdate()
+        tab_counts.reconcile()
+        CatalogStats.rebuild()
+        page_cache.invalidate_all()
+        if fulltext.is_available():
+            fulltext.rebuild()
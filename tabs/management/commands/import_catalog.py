@@ -0,0 +1,353 @@
+import csv
+import json
+import sys
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from tabs import fulltext, page_cache, tab_counts
+from tabs.models import Album, Artist, CatalogStats, Song
+
+# Optional per-song columns; missing columns keep the stored (or default) value
+SONG_COLUMNS = (
+    "track_num", "duration", "tuning", "difficulty", "riffs", "artist_verified",
+    "cover_video", "was_request", "is_filler", "tab_description",
+)
+TRUE_VALUES = {"1", "t", "true", "y", "yes"}
+FALSE_VALUES = {"0", "f", "false", "n", "no"}
+# Songs loaded at a time to refresh their search index entries
+SONG_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Import songs (creating their artists and albums) from a CSV or JSON Lines "
+        "file, one song per row. Rows are matched to existing records by slug, so "
+        "re-running an import only writes what changed. Required columns: artist, "
+        "album, title. Optional: release_year, " + ", ".join(SONG_COLUMNS) + "."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON Lines file, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Input format (default: from the file extension, csv for stdin).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows read and written per batch (default: 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change, then roll everything back.",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or ("jsonl" if options["path"].endswith((".jsonl", ".ndjson")) else "csv")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        importer = CatalogImporter()
+        stream = sys.stdin if options["path"] == "-" else self._open(options["path"])
+        try:
+            with transaction.atomic():
+                rows = read_rows(stream, fmt)
+                while True:
+                    batch = list(islice(rows, options["batch_size"]))
+                    if not batch:
+                        break
+                    importer.import_batch(batch)
+                importer.finish()
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for model, counts in importer.counts.items():
+            self.stdout.write(f"{model}s: " + ", ".join(f"{n} {what}" for what, n in counts.items()))
+        if importer.drift:
+            self.stdout.write(f"Reconciled {len(importer.drift)} album/artist tab counts.")
+        self.stdout.write(self.style.SUCCESS("Dry run, nothing saved." if options["dry_run"] else "Import complete."))
+
+    @staticmethod
+    def _open(path):
+        try:
+            return Path(path).open(newline="", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Can't read {path}: {exc}") from exc
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) pairs from CSV or JSON Lines input."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise CommandError(f"Line {number}: invalid JSON ({exc})") from exc
+        if not isinstance(row, dict):
+            raise CommandError(f"Line {number}: expected a JSON object")
+        yield number, row
+
+
+def clean_value(field, value):
+    """Convert an input value the way a model form would."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "" and field.null:
+            return None
+        if field.get_internal_type() == "BooleanField":
+            if value.lower() in TRUE_VALUES:
+                return True
+            if value.lower() in FALSE_VALUES:
+                return False
+    if field.get_internal_type() == "DurationField" and isinstance(value, (int, float)):
+        value = timedelta(seconds=value)  # JSON durations are in seconds
+    value = field.to_python(value)
+    if value is not None:
+        field.run_validators(value)
+    return value
+
+
+class CatalogImporter:
+    """
+    Upserts batches of song rows. Artists and albums are held in memory by
+    slug for the whole import; songs are looked up one batch at a time.
+    Derived fields come from the models' own set_derived_fields(), so rows
+    end up exactly as Model.save() would have written them.
+    """
+
+    def __init__(self):
+        self.counts = {model: {"created": 0, "updated": 0} for model in ("artist", "album", "song")}
+        self.counts["song"]["unchanged"] = 0
+        self.touched_albums = set()
+        self.touched_artists = set()
+        self.drift = []
+        self.stats = {}  # CatalogStats field -> change
+        # What finish() reindexes and invalidates: artists and albums by pk,
+        # and the pks of songs whose indexed text changed
+        self.changed_artists = {}
+        self.changed_albums = {}
+        self.changed_songs = set()
+        self.artists = {}  # name_cleaned -> Artist
+        for artist in Artist.objects.only("name", "name_cleaned", "path", "artist_img"):
+            self.artists[artist.name_cleaned] = artist
+        artists_by_id = {artist.pk: artist for artist in self.artists.values()}
+        self.albums = {}  # (artist_id, title_cleaned) -> Album
+        for album in Album.objects.only(
+            "title", "title_cleaned", "artist_id", "release_year", "album_img", "path"
+        ):
+            album.artist = artists_by_id[album.artist_id]
+            self.albums[(album.artist_id, album.title_cleaned)] = album
+
+    # -------------------------------
+    # BATCHES
+    # -------------------------------
+
+    def import_batch(self, batch):
+        rows = [self._clean_row(number, raw) for number, raw in batch]
+        self._upsert_artists(rows)
+        self._upsert_albums(rows)
+        self._upsert_songs(rows)
+
+    def finish(self):
+        """
+        Bring everything signals would have maintained up to date, for the
+        rows this import wrote: the stats deltas, the touched rows' search
+        index entries and the touched albums' and artists' pages.
+        """
+        if not any(counts["created"] or counts["updated"] for counts in self.counts.values()):
+            return
+        if self.touched_albums or self.touched_artists:
+            self.drift = tab_counts.reconcile(self.touched_albums, self.touched_artists)
+        CatalogStats.record(self.stats)
+        self._reindex()
+        self._invalidate_pages()
+
+    def _reindex(self):
+        if not fulltext.is_available():
+            return
+        # Artists first: index_artist() and index_album() rewrite the names
+        # stored on existing rows, index_songs() writes whole rows
+        for artist in self.changed_artists.values():
+            fulltext.index_artist(artist)
+        for album in self.changed_albums.values():
+            fulltext.index_album(album)
+        pks = sorted(self.changed_songs)
+        for start in range(0, len(pks), SONG_CHUNK_SIZE):
+            fulltext.index_songs(
+                Song.objects.filter(pk__in=pks[start:start + SONG_CHUNK_SIZE])
+                .select_related("artist", "album")
+                .only("title", "is_filler", "artist__name", "album__title")
+            )
+
+    def _invalidate_pages(self):
+        # Listings follow the catalog token, which any invalidation moves
+        for artist in self.changed_artists.values():
+            page_cache.invalidate_tree(artist.path)
+        for album in self.changed_albums.values():
+            page_cache.invalidate_tree(album.path)
+            page_cache.invalidate_page(album.artist.path)
+
+    def _clean_row(self, number, raw):
+        row = {str(key).strip(): value for key, value in raw.items() if key}
+        for column in ("artist", "album", "title"):
+            if not str(row.get(column) or "").strip():
+                raise CommandError(f"Row {number}: missing {column}")
+            row[column] = str(row[column]).strip()
+        if not slugify(row["artist"]) or not slugify(row["album"]):
+            raise CommandError(f"Row {number}: artist and album names need letters or digits")
+
+        song_values = {}
+        for name in SONG_COLUMNS:
+            field = Song._meta.get_field(name)
+            if name not in row or (row[name] in ("", None) and not field.null):
+                continue  # keep the stored (or default) value
+            try:
+                song_values[name] = clean_value(field, row[name])
+            except (TypeError, ValidationError) as exc:
+                messages = exc.messages if isinstance(exc, ValidationError) else [str(exc)]
+                raise CommandError(f"Row {number}: bad {name}: {'; '.join(messages)}") from exc
+        release_year = row.get("release_year")
+        return {
+            "artist": row["artist"],
+            "album": row["album"],
+            "title": row["title"],
+            "release_year": None if release_year in (None, "") else str(release_year).strip(),
+            "song": song_values,
+        }
+
+    def _upsert_artists(self, rows):
+        created, updated = [], []
+        for row in rows:
+            slug = slugify(row["artist"])
+            artist = self.artists.get(slug)
+            if artist is None:
+                artist = Artist(name=row["artist"])
+                artist.set_derived_fields()
+                self.artists[slug] = artist
+                created.append(artist)
+            elif artist.pk is not None and artist.name != row["artist"]:
+                artist.name = row["artist"]
+                artist.set_derived_fields()
+                updated.append(artist)
+        Artist.objects.bulk_create(created)
+        for artist in updated:
+            artist.date_last_edited = timezone.now()
+        Artist.objects.bulk_update(set(updated), ["name", *Artist.DERIVED_FIELDS, "date_last_edited"])
+        self._count("artist", created, updated)
+        self._add_stats({"total_artists": len(created)})
+        self.changed_artists.update((artist.pk, artist) for artist in [*created, *updated])
+
+    def _upsert_albums(self, rows):
+        created, updated = [], []
+        for row in rows:
+            artist = self.artists[slugify(row["artist"])]
+            key = (artist.pk, slugify(row["album"]))
+            album = self.albums.get(key)
+            if album is None:
+                album = Album(artist=artist, title=row["album"], release_year=row["release_year"] or "")
+                album.set_derived_fields()
+                self.albums[key] = album
+                created.append(album)
+                continue
+            changed = album.title != row["album"]
+            changed |= row["release_year"] is not None and album.release_year != row["release_year"]
+            if album.pk is not None and changed:
+                album.title = row["album"]
+                if row["release_year"] is not None:
+                    album.release_year = row["release_year"]
+                album.set_derived_fields()
+                updated.append(album)
+        Album.objects.bulk_create(created)
+        for album in updated:
+            album.date_last_edited = timezone.now()
+        Album.objects.bulk_update(
+            set(updated), ["title", "release_year", *Album.DERIVED_FIELDS, "date_last_edited"]
+        )
+        self._count("album", created, updated)
+        self._add_stats({"total_albums": len(created)})
+        self.changed_albums.update((album.pk, album) for album in [*created, *updated])
+        self.touched_artists.update(album.artist_id for album in created)
+
+    def _upsert_songs(self, rows):
+        keyed = {}
+        for row in rows:
+            album = self.albums[(self.artists[slugify(row["artist"])].pk, slugify(row["album"]))]
+            keyed[(album.pk, slugify(row["title"]))] = (album, row)
+
+        existing = {
+            (song.album_id, song.title_cleaned): song
+            for song in Song.objects.filter(
+                album_id__in={album_id for album_id, _ in keyed},
+                title_cleaned__in={slug for _, slug in keyed},
+            )
+        }
+
+        now = timezone.now()
+        created, updated, fields = [], [], set()
+        for key, (album, row) in keyed.items():
+            song = existing.get(key)
+            if song is None:
+                song = Song(title=row["title"], album=album, artist=album.artist, **row["song"])
+                song.set_derived_fields()
+                created.append(song)
+                self._add_stats(song.stats_contribution())
+                continue
+            before = {name: getattr(song, name) for name in ("title", *row["song"], *Song.DERIVED_FIELDS)}
+            stats_before = song.stats_contribution()
+            song.title = row["title"]
+            for name, value in row["song"].items():
+                setattr(song, name, value)
+            song.album = album
+            if song.artist_id == album.artist_id:
+                song.artist = album.artist
+            song.set_derived_fields()
+            changes = {name for name, value in before.items() if getattr(song, name) != value}
+            if changes:
+                song.date_last_edited = now
+                fields |= changes
+                updated.append(song)
+                self._add_stats(song.stats_contribution(), stats_before)
+                self.changed_albums.setdefault(album.pk, album)
+                if changes & set(fulltext.SONG_SOURCE_FIELDS):
+                    self.changed_songs.add(song.pk)
+
+        Song.objects.bulk_create(created)
+        if updated:
+            Song.objects.bulk_update(updated, [*sorted(fields), "date_last_edited"])
+        self._count("song", created, updated)
+        self.counts["song"]["unchanged"] += len(keyed) - len(created) - len(updated)
+        for song in created:
+            self.touched_albums.add(song.album_id)
+            self.touched_artists.add(song.artist_id)
+            self.changed_albums.setdefault(song.album_id, song.album)
+            self.changed_songs.add(song.pk)
+
+    def _add_stats(self, after, before=None):
+        """Add the change from one stats_contribution() (or count) to another."""
+        before = before or {}
+        for name in set(after) | set(before):
+            zero = timedelta(0) if name == "total_duration" else 0
+            self.stats[name] = self.stats.get(name, zero) + after.get(name, zero) - before.get(name, zero)
+
+    def _count(self, model, created, updated):
+        self.counts[model]["created"] += len(created)
+        self.counts[model]["updated"] += len(set(updated))
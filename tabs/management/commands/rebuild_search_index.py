@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from tabs import fulltext
+
+
+class Command(BaseCommand):
+    help = "Recreate the FTS5 search tables from the Song, Album and Artist tables."
+
+    def handle(self, *args, **options):
+        if not fulltext.fts5_supported(connection):
+            raise CommandError("This database does not support SQLite FTS5.")
+        with transaction.atomic():
+            fulltext.create_tables(connection)
+            fulltext.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tabs import tab_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount num_tabs for every album and artist with set-based queries, "
+        "report any rows that had drifted and fix them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift, and exit with an error if there is any.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            found = tab_counts.drift()
+        else:
+            with transaction.atomic():
+                found = tab_counts.reconcile()
+
+        for kind, pk, name, stored, actual in found:
+            self.stdout.write(f"{kind} {pk} ({name}): stored {stored}, actual {actual}")
+
+        if not found:
+            self.stdout.write(self.style.SUCCESS("No drift: every num_tabs matches its songs."))
+        elif options["check"]:
+            raise CommandError(f"{len(found)} album/artist counts have drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(found)} drifted counts."))
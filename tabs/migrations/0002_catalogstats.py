@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:34
+
+import datetime
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_catalog_stats(apps, schema_editor):
+    Artist = apps.get_model('tabs', 'Artist')
+    Album = apps.get_model('tabs', 'Album')
+    Song = apps.get_model('tabs', 'Song')
+    CatalogStats = apps.get_model('tabs', 'CatalogStats')
+    songs = Song.objects.filter(is_filler=False)
+    totals = songs.aggregate(riffs=Sum('riffs'), duration=Sum('duration'))
+    CatalogStats.objects.create(
+        id=1,
+        total_tabs=songs.count(),
+        total_albums=Album.objects.count(),
+        total_artists=Artist.objects.count(),
+        verified_tabs=songs.filter(artist_verified=True).count(),
+        total_riffs=totals['riffs'] or 0,
+        total_duration=totals['duration'] or datetime.timedelta(0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_tabs', models.IntegerField(db_column='totalTabs', default=0)),
+                ('total_albums', models.IntegerField(db_column='totalAlbums', default=0)),
+                ('total_artists', models.IntegerField(db_column='totalArtists', default=0)),
+                ('verified_tabs', models.IntegerField(db_column='verifiedTabs', default=0)),
+                ('total_riffs', models.IntegerField(db_column='totalRiffs', default=0)),
+                ('total_duration', models.DurationField(db_column='totalDuration', default=datetime.timedelta(0))),
+            ],
+            options={
+                'verbose_name_plural': 'catalog stats',
+            },
+        ),
+        migrations.RunPython(build_catalog_stats, migrations.RunPython.noop),
+    ]
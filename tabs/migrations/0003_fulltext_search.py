@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# The FTS5 tables as this migration creates them, frozen here rather than
+# read from tabs.fulltext, so later changes there can't change what it does
+FTS_TABLES = {
+    "tabs_song_fts": ("title", "artist", "album"),
+    "tabs_album_fts": ("title", "artist"),
+    "tabs_artist_fts": ("name",),
+}
+
+POPULATE_SQL = {
+    "tabs_song_fts": (
+        'SELECT s.id, s."songTitle", ar."artistName", al."albumTitle" FROM tabs_song s '
+        "JOIN tabs_artist ar ON ar.id = s.artist_id JOIN tabs_album al ON al.id = s.album_id "
+        "WHERE NOT s.is_filler"
+    ),
+    "tabs_album_fts": (
+        'SELECT al.id, al."albumTitle", ar."artistName" FROM tabs_album al '
+        "JOIN tabs_artist ar ON ar.id = al.artist_id"
+    ),
+    "tabs_artist_fts": 'SELECT id, "artistName" FROM tabs_artist',
+}
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    if not fts5_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for table, columns in FTS_TABLES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"{', '.join(columns)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            cursor.execute(
+                f"INSERT INTO {table} (rowid, {', '.join(columns)}) {POPULATE_SQL[table]}"
+            )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in FTS_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0002_catalogstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
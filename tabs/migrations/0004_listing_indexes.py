@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0003_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['title'], name='album_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['artist', 'title_cleaned'], name='album_artist_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['artist', 'release_year'], name='album_artist_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['name'], name='artist_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['name_cleaned'], name='artist_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(condition=models.Q(('is_filler', False)), fields=['date_added'], name='song_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(condition=models.Q(('is_filler', False)), fields=['title'], name='song_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(condition=models.Q(('is_filler', False)), fields=['tuning', 'difficulty', 'title'], name='song_tab_filter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['album', 'track_num', 'title'], name='song_album_track_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['album', 'is_filler'], name='song_album_filler_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(condition=models.Q(('is_filler', False)), fields=['artist', 'date_added'], name='song_artist_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['title_cleaned', 'album'], name='song_slug_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0004_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='date_last_edited',
+            field=models.DateTimeField(auto_now=True, db_column='dateLastEdited'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='date_last_edited',
+            field=models.DateTimeField(auto_now=True, db_column='dateLastEdited'),
+        ),
+    ]
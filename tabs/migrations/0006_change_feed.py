@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0005_artist_album_last_edited'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('artist', 'Artist'), ('album', 'Album'), ('song', 'Song')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('date_deleted', models.DateTimeField(auto_now_add=True, db_column='dateDeleted')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['date_last_edited', 'id'], name='album_edited_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['date_last_edited', 'id'], name='artist_edited_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['date_last_edited', 'id'], name='song_edited_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['date_deleted', 'id'], name='tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:03
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0006_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogstats',
+            name='popularity_landmark',
+            field=models.DateTimeField(db_column='popularityLandmark', default=datetime.datetime(2025, 1, 1, 0, 0, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='popularity',
+            field=models.FloatField(db_column='popularity', default=0),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='view_count',
+            field=models.IntegerField(db_column='viewCount', default=0),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(condition=models.Q(('is_filler', False)), fields=['popularity'], name='song_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tabs', '0007_song_popularity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='songchangelog',
+            index=models.Index(fields=['song', 'change_date'], name='changelog_song_date_idx'),
+        ),
+    ]
@@ -1,17 +1,61 @@
 # type: ignore
+from datetime import datetime, timedelta, timezone
+
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models import F, Q, Sum
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 from django.urls import reverse
 
-
-class Artist(models.Model):
+from .commit_buffer import CommitBuffer
+
+# Where popularity weights start from (see tabs/popularity.py)
+POPULARITY_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class TrackedFieldsMixin:
+    """
+    Keeps the stored values of TRACKED_FIELDS, taken when an instance is
+    loaded and refreshed after each save (tabs/signals.py), so the
+    receivers can diff an edit against them without a query.
+    """
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot()
+        return instance
+
+    def snapshot(self):
+        """Remember the tracked field values as they are stored in the database."""
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.TRACKED_FIELDS
+            if name in self.__dict__
+        }
+
+    def changes(self, fields):
+        """
+        {name: (stored value, current value)} for the ``fields`` that differ
+        from the snapshot; every field, for an instance without one.
+        """
+        stored = getattr(self, "_loaded_values", {})
+        return {
+            name: (stored.get(name), getattr(self, name))
+            for name in fields
+            if stored.get(name) != getattr(self, name)
+        }
+
+
+class Artist(TrackedFieldsMixin, models.Model):
     name = models.CharField(db_column="artistName", max_length=100)
     name_cleaned = models.CharField(db_column="artistNameCleaned", max_length=100)
 
     num_tabs = models.IntegerField(db_column="numTabs", default=0)
     artist_img = models.URLField(db_column="artistImage")
     path = models.CharField(db_column="path", max_length=200, blank=True, default="")
+    date_last_edited = models.DateTimeField(db_column="dateLastEdited", auto_now=True)
 
     def __str__(self):
         return self.name
@@ -21,8 +65,25 @@ class Artist(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='artist_name_idx'),
+            models.Index(fields=['name_cleaned'], name='artist_slug_idx'),
+            # Change feed (tabs/change_feed.py)
+            models.Index(fields=['date_last_edited', 'id'], name='artist_edited_idx'),
+        ]
+
+    # Fields save() derives from the others (bulk writers must set them too)
+    DERIVED_FIELDS = ("name_cleaned", "path", "artist_img")
+
+    # A rename also invalidates the pages at the old path, and reindexes
+    # the name for search
+    TRACKED_FIELDS = ("path", "name")
 
     def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
         self.name_cleaned = slugify(self.name)
         self.path = "/tabs/" + self.name_cleaned
         self.artist_img = (
@@ -30,10 +91,9 @@ class Artist(models.Model):
             + self.name_cleaned
             + ".jpg"
         )
-        super().save(*args, **kwargs)
 
 
-class Album(models.Model):
+class Album(TrackedFieldsMixin, models.Model):
     title = models.CharField(db_column="albumTitle", max_length=100)
     title_cleaned = models.CharField(db_column="albumTitleCleaned", max_length=100)
 
@@ -49,11 +109,31 @@ class Album(models.Model):
     cover_playlist = models.URLField(db_column="coverPlaylist", blank=True)
 
     path = models.CharField(db_column="path", max_length=200, blank=True, default="")
+    date_last_edited = models.DateTimeField(db_column="dateLastEdited", auto_now=True)
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['title'], name='album_title_idx'),
+            models.Index(fields=['artist', 'title_cleaned'], name='album_artist_slug_idx'),
+            models.Index(fields=['artist', 'release_year'], name='album_artist_year_idx'),
+            # Change feed (tabs/change_feed.py)
+            models.Index(fields=['date_last_edited', 'id'], name='album_edited_idx'),
+        ]
+
+    DERIVED_FIELDS = ("title_cleaned", "album_img", "path")
+
+    # A rename or a move to another artist also invalidates the pages at
+    # the old path, and reindexes the album for search
+    TRACKED_FIELDS = ("path", "title", "artist_id")
+
     def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
         self.title_cleaned = slugify(self.title)
         self.album_img = (
             "https://f005.backblazeb2.com/file/afras-tabs-album-arts/"
@@ -61,10 +141,9 @@ class Album(models.Model):
             + ".jpg"
         )
         self.path = "/tabs/" + self.artist.name_cleaned + "/" + self.title_cleaned
-        super().save(*args, **kwargs)
 
 
-class Song(models.Model):
+class Song(TrackedFieldsMixin, models.Model):
     title = models.CharField(db_column="songTitle", max_length=100)
     title_cleaned = models.CharField(
         db_column="songTitleCleaned", max_length=100, blank=True
@@ -102,6 +181,10 @@ class Song(models.Model):
     )
     path = models.CharField(db_column="path", max_length=200, blank=True, default="")
 
+    # Written in batches by tabs/popularity.py
+    view_count = models.IntegerField(db_column="viewCount", default=0)
+    popularity = models.FloatField(db_column="popularity", default=0)
+
     def __str__(self):
         return f"{self.title} - {self.artist.name}"
     
@@ -114,8 +197,67 @@ class Song(models.Model):
     
     class Meta:
         ordering = ['artist__name', 'album__title', 'track_num', 'title']
+        # Matched to the querysets in tabs/views.py; check_query_plans
+        # fails if any of them falls back to a full table scan. Django
+        # renders is_filler=False as NOT is_filler, which SQLite can't use
+        # as an index prefix, so the listing indexes are partial instead.
+        indexes = [
+            # Listings and the home page: non-filler songs in sort order
+            models.Index(fields=['date_added'], condition=Q(is_filler=False), name='song_recent_idx'),
+            models.Index(fields=['title'], condition=Q(is_filler=False), name='song_title_idx'),
+            models.Index(fields=['popularity'], condition=Q(is_filler=False), name='song_popular_idx'),
+            models.Index(
+                fields=['tuning', 'difficulty', 'title'],
+                condition=Q(is_filler=False),
+                name='song_tab_filter_idx',
+            ),
+            # Album and artist pages, and the per-album/artist tab counts
+            models.Index(fields=['album', 'track_num', 'title'], name='song_album_track_idx'),
+            models.Index(fields=['album', 'is_filler'], name='song_album_filler_idx'),
+            models.Index(
+                fields=['artist', 'date_added'],
+                condition=Q(is_filler=False),
+                name='song_artist_recent_idx',
+            ),
+            # song_detail slug lookup
+            models.Index(fields=['title_cleaned', 'album'], name='song_slug_idx'),
+            # Change feed (tabs/change_feed.py)
+            models.Index(fields=['date_last_edited', 'id'], name='song_edited_idx'),
+        ]
+
+    # Editorial fields whose edits are written to SongChangeLog (see tabs/changelog.py)
+    CHANGELOG_FIELDS = ("tuning", "difficulty", "riffs", "tab_description", "cover_video")
+
+    # Fields whose previous values the signal receivers need to diff against
+    TRACKED_FIELDS = (
+        "title", "is_filler", "artist_verified", "duration", "album_id", "artist_id", "path",
+        *CHANGELOG_FIELDS,
+    )
+
+    def stats_contribution(self, values=None):
+        """
+        What this song adds to CatalogStats, computed from ``values``
+        (defaults to the current field values). Filler tracks add nothing.
+        """
+        if values is None:
+            values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+        if values.get("is_filler"):
+            return {}
+        return {
+            "total_tabs": 1,
+            "verified_tabs": 1 if values.get("artist_verified") else 0,
+            "total_riffs": values.get("riffs") or 0,
+            "total_duration": values.get("duration") or timedelta(0),
+        }
+
+    DERIVED_FIELDS = ("title_cleaned", "tab_files", "path")
+    TAB_FILES_ROOT = "https://f005.backblazeb2.com/file/afras-tabs-tab-files/"
 
     def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
         self.title_cleaned = slugify(self.title)
 
         if not self.is_filler:
@@ -131,18 +273,13 @@ class Song(models.Model):
                 getattr(self.album, "title_cleaned", "").lower() if self.album else ""
             )
 
-            self.tab_files = (
-                f"https://f005.backblazeb2.com/file/afras-tabs-tab-files/"
-                f"{artist_cleaned}/{album_cleaned}/{self.title_cleaned}"
-            )
+            self.tab_files = f"{self.TAB_FILES_ROOT}{artist_cleaned}/{album_cleaned}/{self.title_cleaned}"
             self.path = f"/tabs/{artist_cleaned}/{album_cleaned}/{self.title_cleaned}"
         else:
             # Filler: no tab files, no path
             self.tab_files = None
             self.path = ""
 
-        super().save(*args, **kwargs)
-
 
 class SongChangeLog(models.Model):
     song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="changelog")
@@ -151,6 +288,10 @@ class SongChangeLog(models.Model):
 
     class Meta:
         ordering = ["-change_date"]
+        indexes = [
+            # A song's changelog panel, newest first
+            models.Index(fields=["song", "change_date"], name="changelog_song_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.song.title} - {self.change_date.date()}"
@@ -177,3 +318,109 @@ class Tabber(models.Model):
         )
 
         super().save(*args, **kwargs)
+
+
+class CatalogStats(models.Model):
+    """
+    Single-row table of catalog totals, kept current by the signal
+    receivers in tabs/signals.py so pages can read them with one lookup.
+    The receivers record() their deltas, which are summed per transaction
+    and applied with one UPDATE when it commits.
+    """
+    total_tabs = models.IntegerField(db_column="totalTabs", default=0)
+    total_albums = models.IntegerField(db_column="totalAlbums", default=0)
+    total_artists = models.IntegerField(db_column="totalArtists", default=0)
+    verified_tabs = models.IntegerField(db_column="verifiedTabs", default=0)
+    total_riffs = models.IntegerField(db_column="totalRiffs", default=0)
+    total_duration = models.DurationField(db_column="totalDuration", default=timedelta(0))
+    # Popularity scores are stored relative to this; tabs/popularity.py moves it
+    popularity_landmark = models.DateTimeField(db_column="popularityLandmark", default=POPULARITY_EPOCH)
+
+    SINGLETON_ID = 1
+
+    class Meta:
+        verbose_name_plural = "catalog stats"
+
+    def __str__(self):
+        return "Catalog stats"
+
+    @property
+    def total_hours(self):
+        return round(self.total_duration.total_seconds() / 3600)
+
+    @classmethod
+    def load(cls):
+        """Return the stats row, building it from the catalog if missing."""
+        stats = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        if stats is None:
+            stats = cls.rebuild()
+        return stats
+
+    @classmethod
+    async def aload(cls):
+        """load() for async views."""
+        stats = await cls.objects.filter(pk=cls.SINGLETON_ID).afirst()
+        if stats is None:
+            stats = await sync_to_async(cls.rebuild)()
+        return stats
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every total from scratch."""
+        songs = Song.objects.filter(is_filler=False).aggregate(
+            riffs=Sum("riffs"), duration=Sum("duration")
+        )
+        stats, _ = cls.objects.update_or_create(
+            pk=cls.SINGLETON_ID,
+            defaults={
+                "total_tabs": Song.objects.filter(is_filler=False).count(),
+                "total_albums": Album.objects.count(),
+                "total_artists": Artist.objects.count(),
+                "verified_tabs": Song.objects.filter(is_filler=False, artist_verified=True).count(),
+                "total_riffs": songs["riffs"] or 0,
+                "total_duration": songs["duration"] or timedelta(0),
+            },
+        )
+        return stats
+
+    @classmethod
+    def apply(cls, deltas):
+        """Add ``deltas`` (field name -> amount) to the stored totals."""
+        deltas = {name: amount for name, amount in deltas.items() if amount}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{name: F(name) + amount for name, amount in deltas.items()}
+        )
+        if not updated:
+            cls.rebuild()
+
+    @classmethod
+    def record(cls, deltas, using=None):
+        """apply() ``deltas`` on commit, added to the rest of the transaction's."""
+        with _pending_stats.collect(using) as pending:
+            for name, amount in deltas.items():
+                pending[name] = pending[name] + amount if name in pending else amount
+
+
+_pending_stats = CommitBuffer("catalog_stats", dict, CatalogStats.apply)
+
+
+class Tombstone(models.Model):
+    """
+    A deleted song, album or artist, recorded by tabs/signals.py so the
+    change feed can tell clients to drop it.
+    """
+    KIND_CHOICES = [("artist", "Artist"), ("album", "Album"), ("song", "Song")]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    date_deleted = models.DateTimeField(db_column="dateDeleted", auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_deleted', 'id'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} (deleted {self.date_deleted:%Y-%m-%d})"
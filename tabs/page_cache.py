@@ -0,0 +1,264 @@
+"""
+Rendered-page cache for the song, album and artist detail pages (and the
+song pages' panels).
+
+Pages are cached gzip-compressed under a key built from the request path
+and generation tokens, so a warm hit is two cache reads: no ORM, no
+templates. Catalog paths nest (/tabs/artist/album/song), and each path
+has two generations, both kept in the shared "pages" cache so every
+worker sees a bump at once:
+
+- node: the page at exactly that path
+- tree: that page and every page below it
+
+A page's key covers the tree generation of each of its path prefixes and
+its own node generation. The receivers in tabs/signals.py bump the
+narrowest generations that cover what an edit touched (e.g. a song edit
+bumps its album's tree and its artist's node), and stale entries simply
+stop being looked up.
+
+Tokens are the time of the bump, so they double as HTTP validators: a
+detail page's ETag is its cache key and its Last-Modified the newest of
+its tokens. Every bump also moves a catalog-wide token that does the
+same for the listing pages (the popularity sort also follows a token
+tabs/popularity.py moves when it writes view counts). Either way a conditional GET is answered
+from the cache alone.
+"""
+import gzip
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .commit_buffer import CommitBuffer
+
+CACHE_ALIAS = "pages"
+
+# Bodies outlive any edit by at most a day; generation tokens never expire
+BODY_TIMEOUT = 60 * 60 * 24
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def normalize(path):
+    return "/" + path.strip("/")
+
+
+def song_panel_path(song_path, panel):
+    """The path of one of a song page's panels (tabs.views.song_panel), below the song's."""
+    return f"{song_path}/panels/{panel}" if song_path else ""
+
+
+def _prefixes(path):
+    parts = normalize(path).strip("/").split("/")
+    return ["/" + "/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _version_keys(path):
+    return [f"page-tree:{prefix}" for prefix in _prefixes(path)] + [f"page-node:{normalize(path)}"]
+
+
+CATALOG_KEY = "catalog-version"
+# Moved when tabs/popularity.py writes view counts, which is not an edit
+POPULARITY_KEY = "popularity-version"
+# The listing sort (tabs.views.SONG_SORTS) those writes reorder
+POPULAR_SORT = "Most Popular"
+
+
+def _new_token():
+    return str(time.time_ns())
+
+
+def _versions(keys):
+    cache = _cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh token rather than a default, so an evicted generation
+            # can never fall back to one that cached pages were stored under
+            token = _new_token()
+            versions[key] = token if cache.add(key, token, timeout=None) else cache.get(key, token)
+    return versions
+
+
+def _page_versions(request):
+    if not hasattr(request, "_page_versions"):
+        request._page_versions = _versions(_version_keys(request.path))
+    return request._page_versions
+
+
+def _digest(*parts):
+    return hashlib.md5("|".join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+def _as_datetime(tokens):
+    return datetime.fromtimestamp(max(int(token) for token in tokens) // 10**9, tz=timezone.utc)
+
+
+def _page_key(request):
+    versions = _page_versions(request)
+    return "page:" + _digest(*(f"{key}={value}" for key, value in sorted(versions.items())))
+
+
+# -------------------------------
+# HTTP VALIDATORS (for django.views.decorators.http.condition)
+# -------------------------------
+
+def page_etag(request, *args, **kwargs):
+    # Weak: the same page may go out gzipped or not
+    return f'W/"{_page_key(request)[5:]}"'
+
+
+def page_last_modified(request, *args, **kwargs):
+    return _as_datetime(_page_versions(request).values())
+
+
+def catalog_version():
+    """The catalog-wide token, moved by every edit."""
+    return _versions([CATALOG_KEY])[CATALOG_KEY]
+
+
+# Sent when this process moves the catalog token, with the token it
+# replaced. A process-local index built at ``previous`` has already
+# applied this process's edits, so it can take ``version`` rather than
+# rebuild (tabs/facets.py, tabs/search_index.py).
+catalog_moved = Signal()
+
+
+def _catalog_tokens(request):
+    if not hasattr(request, "_catalog_tokens"):
+        keys = [CATALOG_KEY]
+        if request.GET.get("sort") == POPULAR_SORT:
+            keys.append(POPULARITY_KEY)
+        versions = _versions(keys)
+        request._catalog_tokens = [versions[key] for key in keys]
+    return request._catalog_tokens
+
+
+async def aload_catalog_tokens(request):
+    """
+    Read the tokens catalog_etag() and catalog_last_modified() use in a
+    thread, for async views: the file cache would block the event loop.
+    """
+    await sync_to_async(_catalog_tokens)(request)
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Listings change with any catalog edit, and differ per query and
+    fragment; the popularity sort also changes whenever views are written.
+    """
+    fragment = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    return f'W/"{_digest(*_catalog_tokens(request), request.get_full_path(), fragment)}"'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return _as_datetime(_catalog_tokens(request))
+
+
+# -------------------------------
+# INVALIDATION (called from tabs/signals.py)
+# -------------------------------
+
+def _covered(path, trees):
+    """True if a tree bump in ``trees`` already covers ``path``."""
+    return any(path.startswith(tree + "/") for tree in trees)
+
+
+def _flush(pending):
+    # Bulk edits pend thousands of paths, often under a tree that is being
+    # bumped anyway; skip those, as each write is a file in the shared cache
+    trees = {path for path in pending["tree"] if not _covered(path, pending["tree"])}
+    nodes = {path for path in pending["node"] if path not in trees and not _covered(path, trees)}
+    token = _new_token()
+    versions = {f"page-tree:{path}": token for path in trees}
+    versions.update((f"page-node:{path}", token) for path in nodes)
+    versions[CATALOG_KEY] = token
+    previous = _cache().get(CATALOG_KEY)
+    _cache().set_many(versions, timeout=None)
+    catalog_moved.send(sender=None, previous=previous, version=token)
+
+
+# Bumps wait for the commit: a page rendered before then would otherwise
+# be cached under the new generation with the old data
+_pending = CommitBuffer("page_cache", lambda: {"node": set(), "tree": set()}, _flush)
+
+
+def popularity_changed():
+    """Song popularity was written (tabs/popularity.py); listings sorted by it are stale."""
+    _cache().set(POPULARITY_KEY, _new_token(), timeout=None)
+
+
+def invalidate_page(path):
+    """The page at ``path`` changed."""
+    if path:
+        with _pending.collect() as pending:
+            pending["node"].add(normalize(path))
+
+
+def invalidate_tree(path):
+    """The page at ``path`` and everything under it changed."""
+    if path:
+        with _pending.collect() as pending:
+            pending["tree"].add(normalize(path))
+
+
+def invalidate_all():
+    """Every cached detail page changed (e.g. after a bulk import)."""
+    invalidate_tree("/tabs")
+
+
+# -------------------------------
+# VIEW DECORATOR
+# -------------------------------
+
+def cache_page_by_path(view):
+    """
+    Serve plain GETs of ``view`` from the page cache. Requests with a query
+    string, anything but a 200 response, and everything while
+    settings.CACHE_PAGES is off bypass it.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not settings.CACHE_PAGES or request.method not in ("GET", "HEAD") or request.GET:
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request)
+        entry = _cache().get(key)
+        if entry is not None:
+            return _from_entry(request, entry)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            _cache().set(key, {
+                "body": gzip.compress(response.content),
+                "content_type": response["Content-Type"],
+            }, BODY_TIMEOUT)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+    return wrapped
+
+
+def _from_entry(request, entry):
+    return gzipped_response(request, entry["body"], entry["content_type"])
+
+
+def gzipped_response(request, body, content_type):
+    """A response with the gzip-compressed ``body``, decompressed for clients that can't take gzip."""
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(body, content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(body), content_type=content_type)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
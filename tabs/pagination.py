@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination for the catalog listings.
+
+A cursor is a signed, opaque token holding the sort-key values and pk of
+the last row shown. The next page is fetched with a WHERE on those values
+instead of an OFFSET, and no COUNT(*) is needed, so the cost of a page
+doesn't depend on how deep it is.
+"""
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = "tabs.pagination.cursor"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def with_pk(ordering):
+    """Append a pk tiebreaker in the direction of the last sort key."""
+    ordering = tuple(ordering)
+    if ordering and ordering[-1].lstrip("-") in ("pk", "id"):
+        return ordering
+    descending = bool(ordering) and ordering[-1].startswith("-")
+    return ordering + ("-pk" if descending else "pk",)
+
+
+class CursorPage:
+    """One page of keyset results; quacks enough like a Paginator Page for templates."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.number = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return False
+
+    def has_other_pages(self):
+        return self.has_next()
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by ``ordering`` (model field names, optionally
+    prefixed with '-'; a pk tiebreaker is added). Sort fields must be
+    non-null model fields.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.ordering = with_pk(ordering)
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+        self.model = queryset.model
+
+    def page(self, cursor=None):
+        queryset = self.rows_after(self.decode(cursor)) if cursor else self.queryset
+        rows = list(queryset[: self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        next_cursor = self.cursor_for(rows[-1]) if has_next else None
+        return CursorPage(rows, next_cursor)
+
+    def get_page(self, cursor=None):
+        """Like page(), but a tampered or stale cursor restarts from the top."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    async def apage(self, cursor=None):
+        """page() for async views."""
+        queryset = self.rows_after(self.decode(cursor)) if cursor else self.queryset
+        rows = [row async for row in queryset[: self.per_page + 1]]
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        next_cursor = self.cursor_for(rows[-1]) if has_next else None
+        return CursorPage(rows, next_cursor)
+
+    async def aget_page(self, cursor=None):
+        """get_page() for async views."""
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage(None)
+
+    # -------------------------------
+    # CURSORS
+    # -------------------------------
+
+    def cursor_for(self, obj):
+        """The cursor that continues after ``obj``."""
+        values = []
+        for name in self.ordering:
+            value = getattr(obj, self._field(name).attname)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return signing.dumps(values, salt=CURSOR_SALT, compress=True)
+
+    def decode(self, cursor):
+        try:
+            values = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature as exc:
+            raise InvalidCursor(str(exc)) from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor("cursor does not match the current ordering")
+        try:
+            return [self._field(name).to_python(value) for name, value in zip(self.ordering, values)]
+        except Exception as exc:
+            raise InvalidCursor(str(exc)) from exc
+
+    def _field(self, name):
+        name = name.lstrip("-")
+        return self.model._meta.pk if name == "pk" else self.model._meta.get_field(name)
+
+    def rows_after(self, values):
+        """The ordered queryset from just after the row with sort values ``values``."""
+        return self.queryset.filter(self._after(values))
+
+    def _after(self, values):
+        """
+        Rows strictly after ``values`` in sort order, i.e. the lexicographic
+        (a, b, ...) > (x, y, ...) expanded into ORs. The leading >= on the
+        first key lets the database seek straight into its index.
+        """
+        names = [name.lstrip("-") for name in self.ordering]
+        ops = ["lt" if name.startswith("-") else "gt" for name in self.ordering]
+
+        condition = Q()
+        for i in range(len(names)):
+            term = Q(**{f"{names[i]}__{ops[i]}": values[i]})
+            for j in range(i):
+                term &= Q(**{names[j]: values[j]})
+            condition |= term
+        inclusive = {"gt": "gte", "lt": "lte"}[ops[0]]
+        leading = Q(**{f"{names[0]}__{inclusive}": values[0]})
+        return leading & condition
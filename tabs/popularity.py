@@ -0,0 +1,156 @@
+"""
+Song view counts and popularity, written in batches.
+
+song_detail hits are counted in process memory by record(). A daemon
+thread writes them every FLUSH_INTERVAL seconds (and at exit), as a few
+UPDATEs for the whole batch, so a page view never waits on SQLite's
+write lock. If a flush fails its hits are kept for the next one.
+Tooling that renders song pages (the query checks, benchmarks, static
+export and tests) turns RECORD_SONG_VIEWS off, so its requests aren't
+counted.
+
+Popularity is forward-decayed: a view at time t adds
+2 ** ((t - landmark) / HALF_LIFE) to the song's score, so a view one
+HALF_LIFE old weighs half as much as one now. Every score shares the
+landmark, so ordering by the stored score orders by decayed popularity
+(song_popular_idx keeps that sort cheap) and old rows are never
+rewritten. Weights double every HALF_LIFE; before they grow past
+RESCALE_AFTER doublings a flush halves every score that many times and
+moves the landmark (CatalogStats.popularity_landmark) forward, which
+keeps the order as it was.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+
+from . import page_cache
+from .facets import facet_index
+from .models import CatalogStats, Song
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 30  # seconds
+HALF_LIFE = timedelta(days=7)
+RESCALE_AFTER = 64  # half-lives, about 15 months
+# Songs per UPDATE, to stay well under SQLite's parameter limit
+BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_pending = Counter()  # (artist_slug, album_slug, song_slug) -> views
+_flusher = None
+
+
+def count_views(view):
+    """
+    Record successful GETs of song_detail, including the ones answered
+    from the page cache or with a 304, which never reach the view body,
+    unless settings.RECORD_SONG_VIEWS is off.
+    """
+    @wraps(view)
+    def wrapped(request, artist_slug, album_slug, song_slug):
+        response = view(request, artist_slug=artist_slug, album_slug=album_slug, song_slug=song_slug)
+        if settings.RECORD_SONG_VIEWS and request.method == "GET" and response.status_code in (200, 304):
+            record(artist_slug, album_slug, song_slug)
+        return response
+
+    return wrapped
+
+
+def record(artist_slug, album_slug, song_slug, views=1):
+    """Count ``views`` of a song; written by the next flush()."""
+    global _flusher
+    with _lock:
+        _pending[artist_slug, album_slug, song_slug] += views
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name="popularity-flush", daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def pending():
+    """Views recorded in this process and not written yet."""
+    with _lock:
+        return sum(_pending.values())
+
+
+def flush(now=None):
+    """Write the recorded views; returns how many songs were updated."""
+    global _pending
+    with _lock:
+        hits, _pending = _pending, Counter()
+    if not hits:
+        return 0
+    try:
+        updated = _write(hits, time.time() if now is None else now)
+    except DatabaseError:
+        logger.warning("Song views not written; will retry on the next flush", exc_info=True)
+        with _lock:
+            _pending.update(hits)
+        return 0
+    if updated:
+        facet_index.invalidate_order("popularity")
+        page_cache.popularity_changed()
+    return updated
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        finally:
+            # This thread's connection; request threads keep their own
+            connections.close_all()
+
+
+def _write(hits, now):
+    # Slugs are resolved here, in one query per batch, because the page
+    # cache answers most views without ever loading the song
+    songs = Song.objects.filter(
+        is_filler=False, title_cleaned__in={song_slug for _, _, song_slug in hits}
+    ).order_by().values_list("pk", "artist__name_cleaned", "album__title_cleaned", "title_cleaned")
+    slugs = {(artist_slug, album_slug, song_slug): pk for pk, artist_slug, album_slug, song_slug in songs.iterator()}
+    views = Counter()
+    for key, count in hits.items():
+        if key in slugs:
+            views[slugs[key]] += count
+    if not views:
+        return 0
+
+    with transaction.atomic():
+        exponent = _exponent(now)
+        weight = 2.0 ** exponent
+        pks = sorted(views)
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start:start + BATCH_SIZE]
+            Song.objects.filter(pk__in=batch).update(
+                view_count=F("view_count") + Case(
+                    *(When(pk=pk, then=Value(views[pk])) for pk in batch), output_field=IntegerField()
+                ),
+                popularity=F("popularity") + Case(
+                    *(When(pk=pk, then=Value(views[pk] * weight)) for pk in batch), output_field=FloatField()
+                ),
+            )
+    return len(views)
+
+
+def _exponent(now):
+    """Doublings of a view's weight at ``now``, rescaling the stored scores if they've grown too many."""
+    landmark = CatalogStats.load().popularity_landmark
+    exponent = (now - landmark.timestamp()) / HALF_LIFE.total_seconds()
+    if exponent > RESCALE_AFTER:
+        shift = int(exponent)
+        Song.objects.filter(popularity__gt=0).update(popularity=F("popularity") * 2.0 ** -shift)
+        CatalogStats.objects.filter(pk=CatalogStats.SINGLETON_ID).update(
+            popularity_landmark=landmark + HALF_LIFE * shift
+        )
+        exponent -= shift
+    return exponent
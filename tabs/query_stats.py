@@ -0,0 +1,233 @@
+"""
+Per-request SQL instrumentation.
+
+QueryRecorder counts the statements run inside it, their total time, and
+how often each statement *shape* repeats: the SQL with literals and IN
+lists normalized away, so "SELECT ... WHERE id = 1" and "... id = 2"
+share a fingerprint. A shape repeated many times in one request is the
+signature of an N+1. Views declare how many queries they may run with
+@query_budget; QueryStatsMiddleware checks live requests against it and
+the check_query_budgets command and the tests check every view in one go.
+full_scans() and unbounded_sorts() read SQLite query plans for
+check_query_plans and the tests.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# A statement shape seen this many times in one request is reported as an N+1
+REPEAT_THRESHOLD = 3
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN \((?:%s|\?|#)(?:, ?(?:%s|\?|#))*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+# "SCAN tabs_song" with no index; aliases like U0 appear for subqueries
+_BARE_SCAN_RE = re.compile(r"^SCAN (\S+)$")
+ALLOWED_SCANS = {"subquery", "sqlite_master", "CONSTANT"}
+
+
+def fingerprint(sql):
+    """The statement's shape: literals become #, IN lists of any length match."""
+    sql = _STRING_RE.sub("#", sql)
+    sql = _NUMBER_RE.sub("#", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def query_budget(limit):
+    """Declare the most queries a view may run per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def full_scan(view):
+    """Declare that a view reads whole tables on purpose, for check_query_plans."""
+    view.full_scan = True
+    return view
+
+
+def query_plan(sql, params, using=DEFAULT_DB_ALIAS):
+    """The detail column of SQLite's EXPLAIN QUERY PLAN for one statement."""
+    with connections[using].cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql, plan):
+    """
+    Plan lines that read a whole table. A bare SCAN is still fine when the
+    statement has a LIMIT and no temp B-tree sort: that is an ordered walk
+    of the table that stops after one page.
+    """
+    bounded = " LIMIT " in sql.upper() and not temp_btrees(plan)
+    scans = []
+    for line in plan:
+        match = _BARE_SCAN_RE.match(line.strip())
+        if match and match.group(1) not in ALLOWED_SCANS and not bounded:
+            scans.append(line.strip())
+    return scans
+
+
+def temp_btrees(plan):
+    """Plan lines that sort or de-duplicate rows in a temporary B-tree."""
+    return [line.strip() for line in plan if "TEMP B-TREE" in line]
+
+
+def unbounded_sorts(sql, plan):
+    """
+    Temp B-tree lines of a statement whose rows aren't bounded up front.
+    Two sorts are fine: rows read by a list of primary keys (a page, the
+    ranked search matches, or a subquery with its own LIMIT), and a
+    full-text match ranked under a LIMIT, which SQLite sorts keeping only
+    the best rows.
+    """
+    sorts = temp_btrees(plan)
+    if not sorts:
+        return []
+    driver = plan[0].strip()
+    by_pks = driver.startswith("SEARCH ") and "INTEGER PRIMARY KEY" in driver and all(
+        " LIMIT " in subquery for subquery in _in_subqueries(sql.upper())
+    )
+    ranked = " MATCH " in sql.upper() and " LIMIT " in sql.upper() and "VIRTUAL TABLE" in driver
+    return [] if by_pks or ranked else sorts
+
+
+def _in_subqueries(sql):
+    """The text of each IN (SELECT ...) in ``sql``, up to its closing parenthesis."""
+    start = sql.find("IN (SELECT ")
+    while start != -1:
+        depth = 0
+        for end in range(start + 3, len(sql)):
+            depth += {"(": 1, ")": -1}.get(sql[end], 0)
+            if depth == 0:
+                break
+        yield sql[start + 4:end]
+        start = sql.find("IN (SELECT ", end)
+
+
+class QueryRecorder:
+    """
+    Context manager recording every statement run on ``conn`` (by default
+    on every database alias: reads and writes go to different ones). The
+    statements themselves, with their parameters, are only kept in
+    ``statements`` with ``keep_statements``, for the plan checks.
+    """
+
+    def __init__(self, conn=None, keep_statements=False):
+        self.connections = [conn] if conn else connections.all()
+        self.keep_statements = keep_statements
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.statements = []
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for conn in self.connections:
+            self._wrappers.enter_context(conn.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrappers.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+            if self.keep_statements:
+                self.statements.append((sql, params))
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """(shape, times) for statement shapes run at least ``threshold`` times."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+
+def budget_of(request):
+    """The query budget of the view that handled ``request``, if declared."""
+    match = getattr(request, "resolver_match", None)
+    return getattr(match.func, "query_budget", None) if match else None
+
+
+def budget_problems(view, recorder, threshold=REPEAT_THRESHOLD):
+    """
+    What is wrong with the queries one request to ``view`` ran, as recorded
+    by ``recorder``: no declared budget, going over it, or statement shapes
+    run ``threshold`` or more times. Empty for a request within budget.
+    """
+    budget = getattr(view, "query_budget", None)
+    problems = []
+    if budget is None:
+        problems.append("no @query_budget declared")
+    elif recorder.count > budget:
+        problems.append(f"{recorder.count} queries, budget {budget}")
+    for shape, times in recorder.repeated(threshold):
+        problems.append(f"{times}x {shape}")
+    return problems
+
+
+class QueryStatsMiddleware:
+    """
+    Record every request's queries, with DEBUG or the QUERY_STATS setting
+    on. Over-budget requests and repeated statement shapes are logged as
+    warnings; with DEBUG on, the totals are also sent in a Server-Timing
+    header for the browser's dev tools.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG or getattr(settings, "QUERY_STATS", False)):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs on the request's own sync thread, with its
+        # own connection, so the recorder has to be installed from there
+        recorder = QueryRecorder()
+        await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        budget = budget_of(request)
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d)", request.path, recorder.count, budget
+            )
+        for shape, times in recorder.repeated():
+            logger.warning("%s ran the same query %d times: %s", request.path, times, shape)
+        if settings.DEBUG:
+            response["Server-Timing"] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+            )
+        return response
@@ -0,0 +1,37 @@
+"""
+Read/write split for the SQLite database.
+
+settings.py opens the database file twice: "default", which takes every
+write, and "replica", a query_only connection to the same file that
+takes the public views' reads. With WAL those reads never wait on a
+write in progress, and query_only guarantees they can't start one.
+Being the same file, the replica never lags.
+
+Reads made inside a transaction on "default" (the admin's saves, and the
+signal receivers that run in them) stay on "default" so they see the
+transaction's own uncommitted writes.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = "replica"
+
+
+class ReadWriteRouter:
+    def __init__(self):
+        # Settings without a replica (e.g. a one-off test database) read from default
+        self.read_alias = READ_ALIAS if READ_ALIAS in connections.settings else DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
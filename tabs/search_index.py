@@ -0,0 +1,484 @@
+"""
+Process-local autocomplete index for the header search dropdown.
+
+Titles and names of songs, albums and artists are split into folded
+tokens. Each type has its own sorted token list, which answers prefix
+lookups with bisect, so search_api never has to touch the database and
+its song, album and artist lookups are independent. Short prefixes (the
+first few keystrokes, which match much of the catalog) also keep their
+entries in rank order, and titles are kept sorted per length, so a
+lookup reads down those only until the dropdown is full instead of
+ranking every match. The index is built
+once per process (on first use, or eagerly from wsgi.py/asgi.py) and the
+receivers in tabs/signals.py keep it current as the catalog changes.
+Like the facet index (tabs/facets.py), it records the page cache's
+catalog token it was built at and is rebuilt once that has moved, so
+edits from other workers, a shell or import_catalog reach it too.
+Receivers schedule their updates for the commit (update_on_commit()), so
+a rolled-back edit never shows up in the dropdown.
+"""
+import asyncio
+import logging
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import namedtuple
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.urls import reverse
+
+from . import page_cache
+from .commit_buffer import CommitBuffer
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+
+Entry = namedtuple("Entry", "kind pk title folded subtitle verified url_name url_kwargs tokens")
+
+
+def fold(text):
+    """Lowercase and strip accents so 'Beyoncé' matches 'beyonce'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+# Prefixes up to this long keep their entries in rank order, so the first
+# keystrokes of a query, which match much of the catalog, read only as
+# far down as the results they need
+RANKED_PREFIX_LENGTH = 3
+# Ranked entries a lookup checks against the whole query before giving up:
+# a word combination rarer than that among its first letters' entries
+# can go unlisted
+MAX_SCAN = 2000
+
+
+def _order(entry):
+    """How matches rank after the titles starting with the query: shortest, then alphabetical."""
+    return (len(entry.folded), entry.folded, entry.pk)
+
+
+def _ranked_prefixes(tokens):
+    return {token[:n] for token in tokens for n in range(1, min(len(token), RANKED_PREFIX_LENGTH) + 1)}
+
+
+def _discard(ordered, key):
+    position = bisect_left(ordered, key)
+    if position < len(ordered) and ordered[position] == key:
+        del ordered[position]
+
+
+class TokenIndex:
+    """
+    The entries of one kind: a sorted token list for prefix lookups, the
+    entries of each short prefix in _order(), and the entries of each
+    title length sorted by title, for the titles that start with a query.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = {}    # pk -> Entry
+        self.postings = {}   # token -> set of pks
+        self.tokens = []     # sorted list of every token in postings
+        self.ranked = {}     # prefix of up to RANKED_PREFIX_LENGTH -> sorted _order() keys
+        self.by_length = {}  # len(folded) -> sorted _order() keys
+        self.lengths = []    # sorted list of every length in by_length
+
+    def get(self, pk):
+        return self.entries.get(pk)
+
+    def load(self, entries):
+        """put() ``entries`` into this empty index, sorting once at the end."""
+        with self.lock:
+            for entry in entries:
+                self.entries[entry.pk] = entry
+                key = _order(entry)
+                for token in entry.tokens:
+                    self.postings.setdefault(token, set()).add(entry.pk)
+                for prefix in _ranked_prefixes(entry.tokens):
+                    self.ranked.setdefault(prefix, []).append(key)
+                self.by_length.setdefault(key[0], []).append(key)
+            self.tokens = sorted(self.postings)
+            self.lengths = sorted(self.by_length)
+            for ordered in (*self.ranked.values(), *self.by_length.values()):
+                ordered.sort()
+
+    def put(self, entry):
+        with self.lock:
+            old = self.entries.get(entry.pk)
+            if old is not None:
+                self._unlink(old)
+            self.entries[entry.pk] = entry
+            key = _order(entry)
+            for token in entry.tokens:
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = set()
+                    insort(self.tokens, token)
+                postings.add(entry.pk)
+            for prefix in _ranked_prefixes(entry.tokens):
+                insort(self.ranked.setdefault(prefix, []), key)
+            if key[0] not in self.by_length:
+                self.by_length[key[0]] = []
+                insort(self.lengths, key[0])
+            insort(self.by_length[key[0]], key)
+
+    def remove(self, pk):
+        with self.lock:
+            entry = self.entries.pop(pk, None)
+            if entry is not None:
+                self._unlink(entry)
+
+    def top(self, tokens, limit):
+        """
+        The best ``limit`` entries with a token starting with each of
+        ``tokens``: titles starting with the query first (an exact match
+        first of all), then the rest in _order(). Reads only as many
+        entries as it takes to fill ``limit``.
+        """
+        with self.lock:
+            found = self._leading(" ".join(tokens), limit)
+            if len(found) < limit:
+                seen = {entry.pk for entry in found}
+                for entry in self._candidates(tokens):
+                    if entry.pk not in seen and all(
+                        any(t.startswith(q) for t in entry.tokens) for q in tokens
+                    ):
+                        found.append(entry)
+                        if len(found) == limit:
+                            break
+            return found
+
+    def _leading(self, query, limit):
+        """Up to ``limit`` entries whose title starts with ``query``, shortest first."""
+        found = []
+        for length in self.lengths[bisect_left(self.lengths, len(query)):]:
+            ordered = self.by_length[length]
+            position = bisect_left(ordered, (length, query))
+            while position < len(ordered) and ordered[position][1].startswith(query):
+                found.append(self.entries[ordered[position][2]])
+                if len(found) == limit:
+                    return found
+                position += 1
+        return found
+
+    def _candidates(self, tokens):
+        """
+        Entries that may match ``tokens``, in _order(); top() checks each
+        against all of them. They come from whichever token matches the
+        fewest entries, read exhaustively if that is at most MAX_SCAN.
+        """
+        sources = []
+        for token in tokens:
+            if len(token) <= RANKED_PREFIX_LENGTH:
+                ordered = self.ranked.get(token, ())
+                sources.append((len(ordered), token, ordered))
+            else:
+                matching = self._prefix_tokens(token)
+                sources.append((sum(len(self.postings[t]) for t in matching), token, matching))
+        size, token, source = min(sources, key=lambda source: source[0])
+        if not size:
+            return ()
+        if len(token) > RANKED_PREFIX_LENGTH:
+            if size <= MAX_SCAN:
+                pks = set().union(*(self.postings[t] for t in source))
+                return sorted((self.entries[pk] for pk in pks), key=_order)
+            # Common enough that a good share of its first letters' entries match
+            source = self.ranked.get(token[:RANKED_PREFIX_LENGTH], ())
+        return (self.entries[key[2]] for key in islice(source, MAX_SCAN))
+
+    def _prefix_tokens(self, prefix):
+        start = bisect_left(self.tokens, prefix)
+        end = bisect_left(self.tokens, prefix + "\U0010ffff", lo=start)
+        return self.tokens[start:end]
+
+    def _unlink(self, entry):
+        key = _order(entry)
+        for token in entry.tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(entry.pk)
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+        for prefix in _ranked_prefixes(entry.tokens):
+            ordered = self.ranked.get(prefix)
+            if ordered is not None:
+                _discard(ordered, key)
+                if not ordered:
+                    del self.ranked[prefix]
+        ordered = self.by_length.get(key[0])
+        if ordered is not None:
+            _discard(ordered, key)
+            if not ordered:
+                del self.by_length[key[0]]
+                del self.lengths[bisect_left(self.lengths, key[0])]
+
+
+def _new_pending():
+    return {"artist": {}, "album": {}, "song": {}}  # kind -> pk -> instance, or None if deleted
+
+
+def _apply_pending(pending):
+    # Artists and albums first: renaming them re-puts their songs
+    for kind, changed in pending.items():
+        for pk, instance in changed.items():
+            # Saved and then deleted (in a later savepoint): the pk is gone
+            if instance is None or instance.pk is None:
+                autocomplete_index.remove(kind, pk)
+            else:
+                getattr(autocomplete_index, f"update_{kind}")(instance)
+
+
+_pending = CommitBuffer("autocomplete", _new_pending, _apply_pending)
+
+
+class AutocompleteIndex:
+    # How many results of each type the dropdown shows, in display order
+    LIMITS = (("song", 2), ("album", 2), ("artist", 1))
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the thread rebuilding a stale index; the rest keep using it
+        self._rebuilding = threading.Lock()
+        self._built = False
+        self._version = None  # page_cache.catalog_version() when built
+        # One TokenIndex per type, each with its own lock, so the three
+        # lookups of a search don't wait on each other
+        self._kinds = {kind: TokenIndex() for kind, _ in self.LIMITS}
+
+    @property
+    def is_built(self):
+        return self._built
+
+    # -------------------------------
+    # BUILDING
+    # -------------------------------
+
+    def build(self):
+        """(Re)load every song, album and artist from the database."""
+        from .models import Album, Artist, Song  # avoid import cycle with models
+
+        # Read first: an edit committed while loading moves it past this
+        version = page_cache.catalog_version()
+        # Loaded aside and swapped in, so lookups carry on meanwhile
+        kinds = {kind: TokenIndex() for kind, _ in self.LIMITS}
+        kinds["artist"].load(
+            self._artist_entry(artist)
+            for artist in Artist.objects.only("name", "name_cleaned", "num_tabs").iterator()
+        )
+        kinds["album"].load(
+            self._album_entry(album)
+            for album in Album.objects.select_related("artist").only(
+                "title", "title_cleaned", "release_year",
+                "artist__name", "artist__name_cleaned",
+            ).iterator()
+        )
+        kinds["song"].load(
+            self._song_entry(song)
+            for song in Song.objects.filter(is_filler=False).select_related("artist", "album").only(
+                "title", "title_cleaned", "artist_verified",
+                "artist__name", "artist__name_cleaned",
+                "album__title", "album__title_cleaned",
+            ).iterator()
+        )
+
+        with self._lock:
+            self._kinds = kinds
+            self._version = version
+            self._built = True
+
+    def warm(self):
+        """Build at process start-up, tolerating a database that isn't ready yet."""
+        try:
+            self.build()
+        except DatabaseError:
+            logger.warning("Autocomplete index not built; will retry on first search", exc_info=True)
+
+    def ensure_built(self):
+        """Build on first use, and rebuild if the catalog changed outside this process."""
+        if not self.is_stale():
+            return
+        # Only the first build makes callers wait; a stale index keeps
+        # answering while one thread rebuilds it
+        if not self._rebuilding.acquire(blocking=not self._built):
+            return
+        try:
+            if self.is_stale():
+                self.build()
+        finally:
+            self._rebuilding.release()
+
+    def is_stale(self):
+        return not self._built or self._version != page_cache.catalog_version()
+
+    def follow(self, previous, version):
+        """This process moved the catalog token from ``previous`` to ``version`` (see catalog_moved)."""
+        with self._lock:
+            if self._built and self._version == previous:
+                self._version = version
+
+    # -------------------------------
+    # UPDATES (called from tabs/signals.py)
+    # -------------------------------
+
+    def update_song(self, song):
+        if not self._built:
+            return
+        if song.is_filler:
+            self.remove("song", song.pk)
+        else:
+            self._put(self._song_entry(song))
+
+    def update_album(self, album):
+        """Reindex an album, and its songs if the title they display changed."""
+        if not self._built:
+            return
+        previous = self._kinds["album"].get(album.pk)
+        self._put(self._album_entry(album))
+        if previous is None or previous.title != album.title:
+            for song in album.songs.filter(is_filler=False).select_related("artist"):
+                song.album = album
+                self._put(self._song_entry(song))
+
+    def update_artist(self, artist):
+        """Reindex an artist, and its albums and songs if its name changed."""
+        if not self._built:
+            return
+        previous = self._kinds["artist"].get(artist.pk)
+        self._put(self._artist_entry(artist))
+        if previous is None or previous.title != artist.name:
+            for album in artist.albums.all():
+                album.artist = artist
+                self._put(self._album_entry(album))
+            for song in artist.songs.filter(is_filler=False).select_related("album"):
+                song.artist = artist
+                self._put(self._song_entry(song))
+
+    def remove(self, kind, pk):
+        self._kinds[kind].remove(pk)
+
+    def update_on_commit(self, instance, using=None):
+        """Reindex a song, album or artist once the transaction commits; not at all if it rolls back."""
+        if self._built:
+            with _pending.collect(using) as pending:
+                pending[instance._meta.model_name][instance.pk] = instance
+
+    def remove_on_commit(self, kind, pk, using=None):
+        """remove() once the transaction commits."""
+        if self._built:
+            with _pending.collect(using) as pending:
+                pending[kind][pk] = None
+
+    # -------------------------------
+    # QUERYING
+    # -------------------------------
+
+    def search(self, query):
+        """Return the dropdown results for ``query``, best matches first."""
+        self.ensure_built()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return [
+            result
+            for kind, limit in self.LIMITS
+            for result in self.lookup(kind, tokens, limit)
+        ]
+
+    async def asearch(self, query):
+        """
+        search() for async views. The song, album and artist lookups run
+        concurrently on worker threads, so the event loop keeps serving
+        other requests while they scan.
+        """
+        if self.is_stale():
+            await sync_to_async(self.ensure_built)()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        found = await asyncio.gather(*(
+            sync_to_async(self.lookup, thread_sensitive=False)(kind, tokens, limit)
+            for kind, limit in self.LIMITS
+        ))
+        return [result for results in found for result in results]
+
+    def lookup(self, kind, tokens, limit):
+        """The best ``limit`` results of one type for a query's ``tokens``."""
+        return [
+            {
+                "type": entry.kind,
+                "title": entry.title,
+                "subtitle": entry.subtitle,
+                "url": reverse(entry.url_name, kwargs=dict(entry.url_kwargs)),
+                "verified": entry.verified,
+            }
+            for entry in self._kinds[kind].top(tokens, limit)
+        ]
+
+    # -------------------------------
+    # INTERNALS
+    # -------------------------------
+
+    def _put(self, entry):
+        self._kinds[entry.kind].put(entry)
+
+    @staticmethod
+    def _song_entry(song):
+        return Entry(
+            kind="song",
+            pk=song.pk,
+            title=song.title,
+            folded=" ".join(tokenize(song.title)),
+            subtitle=f"{song.artist.name} - {song.album.title}",
+            verified=song.artist_verified,
+            url_name="tabs:song_detail",
+            url_kwargs=(
+                ("artist_slug", song.artist.name_cleaned),
+                ("album_slug", song.album.title_cleaned),
+                ("song_slug", song.title_cleaned),
+            ),
+            tokens=frozenset(tokenize(song.title)),
+        )
+
+    @staticmethod
+    def _album_entry(album):
+        return Entry(
+            kind="album",
+            pk=album.pk,
+            title=album.title,
+            folded=" ".join(tokenize(album.title)),
+            subtitle=f"{album.artist.name} ({album.release_year})",
+            verified=False,
+            url_name="tabs:album_detail",
+            url_kwargs=(
+                ("artist_slug", album.artist.name_cleaned),
+                ("album_slug", album.title_cleaned),
+            ),
+            tokens=frozenset(tokenize(album.title)),
+        )
+
+    @staticmethod
+    def _artist_entry(artist):
+        return Entry(
+            kind="artist",
+            pk=artist.pk,
+            title=artist.name,
+            folded=" ".join(tokenize(artist.name)),
+            subtitle=f"{artist.num_tabs} tab{'s' if artist.num_tabs != 1 else ''}",
+            verified=False,
+            url_name="tabs:artist_detail",
+            url_kwargs=(("artist_slug", artist.name_cleaned),),
+            tokens=frozenset(tokenize(artist.name)),
+        )
+
+
+autocomplete_index = AutocompleteIndex()
@@ -1,57 +1,412 @@
-from django.db.models.signals import post_save, post_delete, pre_delete
-from django.db.models import F
-from django.db import transaction
+from datetime import timedelta
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Song, Artist, Album  # type: ignore
+from .models import Song, Artist, Album, CatalogStats, SongChangeLog, Tabber, Tombstone  # type: ignore
+from .facets import facet_index
+from .search_index import autocomplete_index
+from . import changelog, fulltext, page_cache, tab_counts
+
+
+def _stats_delta(before, after):
+    """Difference between two Song.stats_contribution() dicts."""
+    delta = {}
+    for name in set(before) | set(after):
+        zero = timedelta(0) if name == "total_duration" else 0
+        delta[name] = after.get(name, zero) - before.get(name, zero)
+    return delta
 
 
 # -------------------------------
 # SONG SIGNALS
 # -------------------------------
 
+@receiver(pre_save, sender=Song)
+def snapshot_song_before_save(sender, instance, **kwargs):
+    """
+    Make sure an existing song carries a snapshot of its stored values.
+    Instances loaded from the database already have one (Song.from_db);
+    only hand-built or deferred-field instances need the extra lookup.
+    """
+    if instance._state.adding:
+        return
+    if set(Song.TRACKED_FIELDS) <= set(getattr(instance, "_loaded_values", {})):
+        return
+    stored = Song.objects.filter(pk=instance.pk).values(*Song.TRACKED_FIELDS).first()  # type: ignore
+    instance._loaded_values = stored or {}
+
+
+@receiver(post_save, sender=Song)
+def update_catalog_stats_on_song_save(sender, instance, created, **kwargs):
+    """
+    Record the change in this song's contribution to CatalogStats (applied
+    on commit). Edits that touch none of the tracked fields cost nothing.
+    """
+    before = {} if created else instance.stats_contribution(instance._loaded_values)
+    CatalogStats.record(_stats_delta(before, instance.stats_contribution()), using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Song)
+def update_catalog_stats_on_song_delete(sender, instance, **kwargs):
+    """Remove a deleted song's contribution from CatalogStats."""
+    CatalogStats.record(_stats_delta(instance.stats_contribution(), {}), using=kwargs.get("using"))
+
+
 @receiver(post_save, sender=Song)
 def update_tab_counts_on_save(sender, instance, created, **kwargs):
     """
-    Update artist and album num_tabs after a song is saved.
-    Works for both creation and update.
+    Move a song's count to its new album/artist when it is created or
+    reassigned. The deltas are applied once, when the transaction commits.
     """
-    with transaction.atomic():  # type: ignore
-        # Recalculate album's tab count
-        Album.objects.filter(id=instance.album_id).update(  # type: ignore
-            num_tabs=Song.objects.filter(album_id=instance.album_id).count()  # type: ignore
-        )
-        # Recalculate artist's tab count
-        Artist.objects.filter(id=instance.artist_id).update(  # type: ignore
-            num_tabs=Song.objects.filter(artist_id=instance.artist_id).count()  # type: ignore
-        )
+    if created:
+        tab_counts.song_added(instance.album_id, instance.artist_id, using=kwargs.get("using"))
+        return
+    before = instance._loaded_values
+    moved_album = before.get("album_id") != instance.album_id
+    moved_artist = before.get("artist_id") != instance.artist_id
+    if not (moved_album or moved_artist):
+        return
+    using = kwargs.get("using")
+    tab_counts.song_removed(
+        before.get("album_id") if moved_album else None,
+        before.get("artist_id") if moved_artist else None,
+        using=using,
+    )
+    tab_counts.song_added(
+        instance.album_id if moved_album else None,
+        instance.artist_id if moved_artist else None,
+        using=using,
+    )
 
 
 @receiver(post_delete, sender=Song)
 def update_tab_counts_on_delete(sender, instance, **kwargs):
+    """Take a deleted song off its album's and artist's counts (on commit)."""
+    tab_counts.song_removed(instance.album_id, instance.artist_id, using=kwargs.get("using"))
+
+
+# -------------------------------
+# ALBUM SIGNALS
+# -------------------------------
+
+@receiver(post_save, sender=Album)
+def update_catalog_stats_on_album_save(sender, instance, created, **kwargs):
+    """Count newly created albums in CatalogStats."""
+    if created:
+        CatalogStats.record({"total_albums": 1}, using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Album)
+def update_catalog_stats_on_album_delete(sender, instance, **kwargs):
+    """Drop deleted albums from CatalogStats."""
+    CatalogStats.record({"total_albums": -1}, using=kwargs.get("using"))
+
+
+# -------------------------------
+# ARTIST SIGNALS
+# -------------------------------
+
+@receiver(post_save, sender=Artist)
+def update_catalog_stats_on_artist_save(sender, instance, created, **kwargs):
+    """Count newly created artists in CatalogStats."""
+    if created:
+        CatalogStats.record({"total_artists": 1}, using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Artist)
+def update_catalog_stats_on_artist_delete(sender, instance, **kwargs):
+    """Drop deleted artists from CatalogStats."""
+    CatalogStats.record({"total_artists": -1}, using=kwargs.get("using"))
+
+
+# -------------------------------
+# AUTOCOMPLETE INDEX
+# -------------------------------
+
+@receiver(post_save, sender=Song)
+def update_autocomplete_on_song_save(sender, instance, **kwargs):
+    """Reindex a saved song in this process's autocomplete index, on commit."""
+    autocomplete_index.update_on_commit(instance, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=Album)
+def update_autocomplete_on_album_save(sender, instance, **kwargs):
+    """Reindex a saved album (and its songs' subtitles if renamed), on commit."""
+    autocomplete_index.update_on_commit(instance, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=Artist)
+def update_autocomplete_on_artist_save(sender, instance, **kwargs):
+    """Reindex a saved artist (and its albums and songs if renamed), on commit."""
+    autocomplete_index.update_on_commit(instance, using=kwargs.get("using"))
+
+
+@receiver(tab_counts.tab_counts_changed)
+def update_autocomplete_on_tab_counts_changed(sender, artist_ids, **kwargs):
+    """Refresh the tab counts shown under artist results."""
+    if not autocomplete_index.is_built or not artist_ids:
+        return
+    for artist in Artist.objects.filter(pk__in=artist_ids).only("name", "name_cleaned", "num_tabs"):
+        autocomplete_index.update_artist(artist)
+
+
+@receiver(post_delete, sender=Song)
+@receiver(post_delete, sender=Album)
+@receiver(post_delete, sender=Artist)
+def update_autocomplete_on_delete(sender, instance, **kwargs):
+    """Drop deleted songs, albums and artists from the autocomplete index, on commit."""
+    autocomplete_index.remove_on_commit(sender._meta.model_name, instance.pk, using=kwargs.get("using"))
+
+
+@receiver(page_cache.catalog_moved)
+def follow_catalog_in_autocomplete(sender, previous, version, **kwargs):
+    """This process's own edits are in the autocomplete index already; don't rebuild for them."""
+    autocomplete_index.follow(previous, version)
+
+
+# -------------------------------
+# FACET INDEX
+# -------------------------------
+
+@receiver(post_save, sender=Song)
+def update_facets_on_song_save(sender, instance, **kwargs):
+    """Move a saved song to its current values in this process's facet index, on commit."""
+    facet_index.update_on_commit(instance, using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Song)
+def update_facets_on_song_delete(sender, instance, **kwargs):
+    """Drop a deleted song from the facet index, on commit."""
+    facet_index.remove_on_commit(instance.pk, using=kwargs.get("using"))
+
+
+@receiver(page_cache.catalog_moved)
+def follow_catalog_in_facets(sender, previous, version, **kwargs):
+    """This process's own edits are in the facet index already; don't rebuild for them."""
+    facet_index.follow(previous, version)
+
+
+# -------------------------------
+# FULL-TEXT SEARCH
+# -------------------------------
+
+@receiver(post_save, sender=Song)
+def update_fulltext_on_song_save(sender, instance, created, **kwargs):
     """
-    Update artist and album num_tabs after a song is deleted.
-    Bulk-safe: always recalculates counts.
+    Keep the song's FTS row in step with its title, artist and album.
+    Edits that change none of them (tuning, difficulty, ...) cost nothing.
     """
-    with transaction.atomic():  # type: ignore
-        Album.objects.filter(id=instance.album_id).update(  # type: ignore
-            num_tabs=Song.objects.filter(album_id=instance.album_id).count()  # type: ignore
-        )
-        Artist.objects.filter(id=instance.artist_id).update(  # type: ignore
-            num_tabs=Song.objects.filter(artist_id=instance.artist_id).count()  # type: ignore
+    if not created and not instance.changes(fulltext.SONG_SOURCE_FIELDS):
+        return
+    fulltext.index_song(instance)
+
+
+@receiver(post_save, sender=Album)
+def update_fulltext_on_album_save(sender, instance, created, **kwargs):
+    """
+    Reindex the album and the album title stored on its songs, if its
+    title or artist changed.
+    """
+    if not created and not instance.changes(fulltext.ALBUM_SOURCE_FIELDS):
+        return
+    fulltext.index_album(instance)
+
+
+@receiver(post_save, sender=Artist)
+def update_fulltext_on_artist_save(sender, instance, created, **kwargs):
+    """
+    Reindex the artist and the artist name stored on its albums and
+    songs, if the name changed.
+    """
+    if not created and not instance.changes(fulltext.ARTIST_SOURCE_FIELDS):
+        return
+    fulltext.index_artist(instance)
+
+
+@receiver(post_delete, sender=Song)
+@receiver(post_delete, sender=Album)
+@receiver(post_delete, sender=Artist)
+def update_fulltext_on_delete(sender, instance, **kwargs):
+    """Drop deleted songs, albums and artists from the FTS tables."""
+    fulltext.remove(sender._meta.model_name, instance.pk)
+
+
+# -------------------------------
+# PAGE CACHE
+# -------------------------------
+# Catalog paths nest as /tabs/<artist>/<album>/<song>, with the song page's
+# panels (tabs.views.song_panel) under its song; see tabs/page_cache.py.
+
+def _parent(path):
+    return path.rsplit("/", 1)[0] if path else ""
+
+
+def _song_album_path(song, values):
+    """The album path for a song's ``values`` (a snapshot or its current fields)."""
+    if values.get("path"):
+        return _parent(values["path"])
+    # Filler tracks have no path of their own but are still listed on the album page
+    if Song.album.is_cached(song) and song.album_id == values.get("album_id"):
+        return song.album.path
+    return Album.objects.filter(pk=values.get("album_id")).values_list("path", flat=True).first()
+
+
+@receiver(pre_save, sender=Album)
+@receiver(pre_save, sender=Artist)
+def snapshot_tracked_fields_before_save(sender, instance, **kwargs):
+    """
+    Make sure an existing album or artist carries its stored path and
+    search fields, so a rename also invalidates the old pages and
+    reindexes it. Instances loaded from the database already have them
+    (TrackedFieldsMixin.from_db); only hand-built or deferred-field
+    instances need the lookup.
+    """
+    if instance._state.adding:
+        return
+    if set(sender.TRACKED_FIELDS) <= set(getattr(instance, "_loaded_values", {})):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(*sender.TRACKED_FIELDS).first()
+    instance._loaded_values = stored or {}
+
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+def invalidate_pages_on_song_change(sender, instance, **kwargs):
+    """
+    A song shows up on its own page, its album's page, the related-songs
+    panel of its album's other songs, and its artist's page.
+    """
+    current = {"path": instance.path, "album_id": instance.album_id}
+    versions = [current]
+    stored = {} if kwargs.get("created") else instance._loaded_values
+    if stored and (stored.get("path"), stored.get("album_id")) != (current["path"], current["album_id"]):
+        versions.append(stored)
+    for values in versions:
+        album_path = _song_album_path(instance, values)
+        page_cache.invalidate_tree(album_path)
+        page_cache.invalidate_page(_parent(album_path))
+
+
+@receiver(post_save, sender=Album)
+@receiver(post_delete, sender=Album)
+def invalidate_pages_on_album_change(sender, instance, **kwargs):
+    """An album's pages (its own and its songs') and its artist's page."""
+    for path in {instance.path, getattr(instance, "_loaded_values", {}).get("path")}:
+        page_cache.invalidate_tree(path)
+        page_cache.invalidate_page(_parent(path))
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_delete, sender=Artist)
+def invalidate_pages_on_artist_change(sender, instance, **kwargs):
+    """Everything under the artist."""
+    for path in {instance.path, getattr(instance, "_loaded_values", {}).get("path")}:
+        page_cache.invalidate_tree(path)
+
+
+@receiver(post_save, sender=Tabber)
+@receiver(pre_delete, sender=Tabber)
+def invalidate_pages_on_tabber_change(sender, instance, **kwargs):
+    """The tabbers panels of the songs this tabber is credited on."""
+    for path in Song.objects.filter(tabber=instance).values_list("path", flat=True):
+        page_cache.invalidate_page(page_cache.song_panel_path(path, "tabbers"))
+
+
+@receiver(m2m_changed, sender=Song.tabber.through)
+def invalidate_pages_on_tabbers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tabbers added to or removed from songs, from either side."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        page_cache.invalidate_page(page_cache.song_panel_path(instance.path, "tabbers"))
+        return
+    songs = Song.objects.filter(pk__in=pk_set) if pk_set else Song.objects.filter(tabber=instance)
+    for path in songs.values_list("path", flat=True):
+        page_cache.invalidate_page(page_cache.song_panel_path(path, "tabbers"))
+
+
+@receiver(post_save, sender=SongChangeLog)
+@receiver(post_delete, sender=SongChangeLog)
+def invalidate_pages_on_changelog_change(sender, instance, **kwargs):
+    """The changelog is shown in its song's changelog panel."""
+    path = Song.objects.filter(pk=instance.song_id).values_list("path", flat=True).first()
+    page_cache.invalidate_page(page_cache.song_panel_path(path, "changelog"))
+
+
+@receiver(tab_counts.tab_counts_changed)
+def invalidate_pages_on_tab_counts_changed(sender, album_ids, artist_ids, **kwargs):
+    """num_tabs is shown on album and artist pages (e.g. after a reconcile)."""
+    for model, ids in ((Album, album_ids), (Artist, artist_ids)):
+        if ids:
+            for path in model.objects.filter(pk__in=ids).values_list("path", flat=True):
+                page_cache.invalidate_page(path)
+
+
+# -------------------------------
+# CHANGE FEED
+# -------------------------------
+
+@receiver(post_delete, sender=Song)
+@receiver(post_delete, sender=Album)
+@receiver(post_delete, sender=Artist)
+def record_tombstone_on_delete(sender, instance, **kwargs):
+    """Leave a tombstone so change feed clients drop the row too."""
+    Tombstone.objects.create(kind=sender._meta.model_name, object_id=instance.pk)
+
+
+# -------------------------------
+# CHANGELOG
+# -------------------------------
+
+@receiver(post_save, sender=Song)
+def log_song_changes(sender, instance, created, **kwargs):
+    """Log edits to the editorial fields, diffed against the snapshot (no query)."""
+    if created:
+        return
+    changes = instance.changes(Song.CHANGELOG_FIELDS)
+    if changes:
+        changelog.record(
+            instance.pk,
+            instance.path,
+            [changelog.describe(name, *values) for name, values in changes.items()],
+            using=kwargs.get("using"),
         )
 
 
+@receiver(m2m_changed, sender=Song.tabber.through)
+def log_tabbers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log tabbers credited on or removed from songs, from either side."""
+    if action not in ("post_add", "post_remove", "pre_clear") or (action != "pre_clear" and not pk_set):
+        return
+    verb = "added" if action == "post_add" else "removed"
+    using = kwargs.get("using")
+    if not reverse:
+        tabbers = Tabber.objects.filter(pk__in=pk_set) if pk_set else instance.tabber.all()
+        names = sorted(tabbers.values_list("name", flat=True))
+        if names:
+            changelog.record(instance.pk, instance.path, [f"Tabbers {verb}: {', '.join(names)}"], using=using)
+        return
+    songs = Song.objects.filter(pk__in=pk_set) if pk_set else Song.objects.filter(tabber=instance)
+    for pk, path in songs.values_list("pk", "path"):
+        changelog.record(pk, path, [f"Tabbers {verb}: {instance.name}"], using=using)
+
+
+@receiver(post_delete, sender=Song)
+def discard_changelog_on_delete(sender, instance, **kwargs):
+    """A song deleted in the transaction that edited it gets no entry."""
+    changelog.discard(instance.pk, using=kwargs.get("using"))
+
+
 # -------------------------------
-# ALBUM SIGNALS
+# SNAPSHOT (keep last)
 # -------------------------------
 
-@receiver(pre_delete, sender=Album)
-def update_artist_on_album_delete(sender, instance, **kwargs):
+@receiver(post_save, sender=Song)
+@receiver(post_save, sender=Album)
+@receiver(post_save, sender=Artist)
+def refresh_snapshot(sender, instance, **kwargs):
     """
-    When an album is deleted, recalc the artist's num_tabs.
-    All songs in this album will be deleted automatically because of CASCADE.
+    The saved values are now the stored ones. Registered after every other
+    receiver, since several of them diff against the old snapshot.
     """
-    with transaction.atomic():  # type: ignore
-        Artist.objects.filter(id=instance.artist_id).update(  # type: ignore
-            num_tabs=Song.objects.filter(artist_id=instance.artist_id).count()  # type: ignore
-        )
\ No newline at end of file
+    instance.snapshot()
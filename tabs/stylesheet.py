@@ -0,0 +1,894 @@
+"""
+The site stylesheet, built ahead of time by ``manage.py build_css``.
+
+Pages used to load Tailwind's Play CDN, which compiles the templates'
+utility classes in the browser on every page load, and then
+static/css/style.css as well. build() replaces both with one minified
+file:
+
+- the classes the templates use are collected from their class
+  attributes, the blocks those attributes pull in (body_class), the
+  css_class arguments of tags such as {% responsive_img %} and the
+  classList calls in their scripts;
+- style.css is kept minus the rules whose selectors need a class no
+  template uses;
+- Tailwind's preflight and the utilities among those classes follow,
+  generated from the theme below (the tailwind.config base.html used to
+  carry). They come after style.css, as the CDN's styles did.
+
+write() names the file by a hash of its content, so browsers and
+proxies can cache it forever, and pre-compresses it for the web server.
+The {% stylesheet_url %} tag links whatever MANIFEST_NAME says is
+current. Only the utility families the templates have needed so far
+are generated; a class that is neither one of them nor a style.css
+class styles nothing, and the command lists those.
+
+Nothing in the Tailwind half is fetched or generated at build time; it
+was written by hand against Tailwind CSS v3.4 (MIT licence):
+
+- PREFLIGHT is its src/css/preflight.css, reformatted;
+- PALETTES, SPACING and the other scales are its default theme
+  (stubs/config.full.js), trimmed to what the templates use; COLORS'
+  dark-* entries, BACKGROUND_IMAGES, the fonts and CUSTOM_UTILITIES are
+  the site's own, from the tailwind.config base.html used to carry;
+- each family under UTILITIES re-implements one of its corePlugins, in
+  its plugin order.
+
+To support a class no family covers, add it to the family Tailwind
+defines it in (or a new one, at that plugin's place in the order),
+taking the values from the same theme file. To check the result, or
+to move to a newer Tailwind, build the templates with its CLI
+(npx tailwindcss@3.4 --content "templates/**/*.html" -o tailwind.css,
+with the theme above as its config) and compare the rules for the
+classes in question, then copy any changes to preflight.css across.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Under the first STATICFILES_DIRS entry
+OUTPUT_DIR = Path("css") / "dist"
+SOURCE = Path("css") / "style.css"
+MANIFEST_NAME = "manifest.json"
+
+# Builds kept on disk, the current one included: pages in the page
+# cache (and in browsers) keep linking the one they were rendered with.
+# The repository only needs the current one (build_css --keep 1).
+KEEP_BUILDS = 3
+
+
+# -------------------------------
+# THEME
+# -------------------------------
+
+SCREENS = {"sm": "640px", "md": "768px", "lg": "1024px", "xl": "1280px", "2xl": "1536px"}
+
+PALETTE_STEPS = ("50", "100", "200", "300", "400", "500", "600", "700", "800", "900", "950")
+PALETTES = {
+    "gray": ("#f9fafb", "#f3f4f6", "#e5e7eb", "#d1d5db", "#9ca3af", "#6b7280",
+             "#4b5563", "#374151", "#1f2937", "#111827", "#030712"),
+    "red": ("#fef2f2", "#fee2e2", "#fecaca", "#fca5a5", "#f87171", "#ef4444",
+            "#dc2626", "#b91c1c", "#991b1b", "#7f1d1d", "#450a0a"),
+    "yellow": ("#fefce8", "#fef9c3", "#fef08a", "#fde047", "#facc15", "#eab308",
+               "#ca8a04", "#a16207", "#854d0e", "#713f12", "#422006"),
+    "green": ("#f0fdf4", "#dcfce7", "#bbf7d0", "#86efac", "#4ade80", "#22c55e",
+              "#16a34a", "#15803d", "#166534", "#14532d", "#052e16"),
+    "blue": ("#eff6ff", "#dbeafe", "#bfdbfe", "#93c5fd", "#60a5fa", "#3b82f6",
+             "#2563eb", "#1d4ed8", "#1e40af", "#1e3a8a", "#172554"),
+}
+
+COLORS = {
+    "inherit": "inherit",
+    "current": "currentColor",
+    "transparent": "transparent",
+    "black": "#000",
+    "white": "#fff",
+    **{
+        f"{name}-{step}": shade
+        for name, shades in PALETTES.items()
+        for step, shade in zip(PALETTE_STEPS, shades)
+    },
+    # The site's own, from the old tailwind.config
+    "dark-primary": "#141414",
+    "dark-secondary": "#1A1A1A",
+    "dark-tertiary": "#222222",
+    "dark-light": "#4a90e2",
+    "dark-card": "rgba(255, 255, 255, 0.04)",
+    "dark-cardHover": "rgba(255, 255, 255, 0.08)",
+    "dark-border": "rgba(255, 255, 255, 0.1)",
+    "dark-text": "#cfcfcf",
+    "dark-accent": "#357abd",
+}
+
+BACKGROUND_IMAGES = {
+    "none": "none",
+    "gradient-primary": "linear-gradient(135deg, #0E0E0E 0%, #1A1A1A 50%, #222222 100%)",
+    "gradient-card-1": "linear-gradient(135deg, #8B4513, #2F1B0C)",
+    "gradient-card-2": "linear-gradient(135deg, #708090, #2F4F4F)",
+    "gradient-card-3": "linear-gradient(135deg, #1C1C1C, #000000)",
+    "gradient-card-4": "linear-gradient(135deg, #4169E1, #191970)",
+}
+
+# The utilities the old tailwind.config's stylesheet added
+CUSTOM_UTILITIES = {
+    "text-4xl": ('font-family:"IM Fell English",serif',),
+    "body": ('font-family:"Libre Caslon Text",serif',),
+    "text-xl": ('font-family:"Libre Caslon Text",serif', "font-size:15px"),
+    "leading-tight": ('font-family:"Libre Caslon Text",serif', "font-size:17px"),
+}
+
+SPACING = {
+    "0": "0px", "px": "1px", "0.5": "0.125rem", "1": "0.25rem", "1.5": "0.375rem",
+    "2": "0.5rem", "2.5": "0.625rem", "3": "0.75rem", "3.5": "0.875rem", "4": "1rem",
+    "5": "1.25rem", "6": "1.5rem", "7": "1.75rem", "8": "2rem", "9": "2.25rem",
+    "10": "2.5rem", "11": "2.75rem", "12": "3rem", "14": "3.5rem", "16": "4rem",
+    "20": "5rem", "24": "6rem", "28": "7rem", "32": "8rem", "36": "9rem", "40": "10rem",
+    "44": "11rem", "48": "12rem", "52": "13rem", "56": "14rem", "60": "15rem",
+    "64": "16rem", "72": "18rem", "80": "20rem", "96": "24rem",
+}
+
+FRACTIONS = {
+    "1/2": "50%", "1/3": "33.333333%", "2/3": "66.666667%",
+    "1/4": "25%", "2/4": "50%", "3/4": "75%",
+}
+
+SIZES = {**SPACING, "auto": "auto", **FRACTIONS, "full": "100%",
+         "min": "min-content", "max": "max-content", "fit": "fit-content"}
+
+FONT_SIZES = {
+    "xs": ("0.75rem", "1rem"), "sm": ("0.875rem", "1.25rem"), "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"), "xl": ("1.25rem", "1.75rem"), "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"), "4xl": ("2.25rem", "2.5rem"), "5xl": ("3rem", "1"),
+    "6xl": ("3.75rem", "1"), "7xl": ("4.5rem", "1"), "8xl": ("6rem", "1"), "9xl": ("8rem", "1"),
+}
+
+FONT_FAMILIES = {
+    "sans": 'ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", '
+            '"Segoe UI Symbol", "Noto Color Emoji"',
+    "serif": 'ui-serif, Georgia, Cambria, "Times New Roman", Times, serif',
+    "mono": 'ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", '
+            '"Courier New", monospace',
+}
+
+FONT_WEIGHTS = {
+    "thin": "100", "extralight": "200", "light": "300", "normal": "400", "medium": "500",
+    "semibold": "600", "bold": "700", "extrabold": "800", "black": "900",
+}
+
+LINE_HEIGHTS = {
+    "3": ".75rem", "4": "1rem", "5": "1.25rem", "6": "1.5rem", "7": "1.75rem",
+    "8": "2rem", "9": "2.25rem", "10": "2.5rem", "none": "1", "tight": "1.25",
+    "snug": "1.375", "normal": "1.5", "relaxed": "1.625", "loose": "2",
+}
+
+MAX_WIDTHS = {
+    **SPACING, "none": "none", "xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem",
+    "xl": "36rem", "2xl": "42rem", "3xl": "48rem", "4xl": "56rem", "5xl": "64rem",
+    "6xl": "72rem", "7xl": "80rem", "full": "100%", "min": "min-content",
+    "max": "max-content", "fit": "fit-content", "prose": "65ch",
+    **{f"screen-{name}": width for name, width in SCREENS.items()},
+}
+
+RADII = {
+    "none": "0px", "sm": "0.125rem", "": "0.25rem", "md": "0.375rem", "lg": "0.5rem",
+    "xl": "0.75rem", "2xl": "1rem", "3xl": "1.5rem", "full": "9999px",
+}
+
+OPACITIES = {str(step): f"{step / 100:g}" for step in range(0, 101, 5)}
+SCALES = {step: f"{int(step) / 100:g}" for step in
+          ("0", "50", "75", "90", "95", "100", "105", "110", "125", "150")}
+DURATIONS = {step: f"{step}ms" for step in ("0", "75", "100", "150", "200", "300", "500", "700", "1000")}
+Z_INDEXES = {step: step for step in ("0", "10", "20", "30", "40", "50", "auto")}
+
+EASING = "cubic-bezier(0.4, 0, 0.2, 1)"
+TRANSITIONS = {
+    "": "color, background-color, border-color, text-decoration-color, fill, stroke, "
+        "opacity, box-shadow, transform, filter, backdrop-filter",
+    "all": "all",
+    "colors": "color, background-color, border-color, text-decoration-color, fill, stroke",
+    "opacity": "opacity",
+    "shadow": "box-shadow",
+    "transform": "transform",
+}
+
+TRANSFORM = (
+    "translate(var(--tw-translate-x), var(--tw-translate-y)) rotate(var(--tw-rotate)) "
+    "skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) "
+    "scaleY(var(--tw-scale-y))"
+)
+TRANSFORM_DEFAULTS = (
+    "*, ::before, ::after { --tw-translate-x: 0; --tw-translate-y: 0; --tw-rotate: 0; "
+    "--tw-skew-x: 0; --tw-skew-y: 0; --tw-scale-x: 1; --tw-scale-y: 1 }"
+)
+
+# Tailwind's base styles (v3.4's src/css/preflight.css), which the CDN
+# injected into every page
+PREFLIGHT = """
+*, ::before, ::after { box-sizing: border-box; border-width: 0; border-style: solid; border-color: #e5e7eb }
+::before, ::after { --tw-content: '' }
+html, :host { line-height: 1.5; -webkit-text-size-adjust: 100%; -moz-tab-size: 4; tab-size: 4;
+  font-family: ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", "Noto Color Emoji";
+  font-feature-settings: normal; font-variation-settings: normal; -webkit-tap-highlight-color: transparent }
+body { margin: 0; line-height: inherit }
+hr { height: 0; color: inherit; border-top-width: 1px }
+abbr:where([title]) { text-decoration: underline dotted }
+h1, h2, h3, h4, h5, h6 { font-size: inherit; font-weight: inherit }
+a { color: inherit; text-decoration: inherit }
+b, strong { font-weight: bolder }
+code, kbd, samp, pre { font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;
+  font-feature-settings: normal; font-variation-settings: normal; font-size: 1em }
+small { font-size: 80% }
+sub, sup { font-size: 75%; line-height: 0; position: relative; vertical-align: baseline }
+sub { bottom: -0.25em }
+sup { top: -0.5em }
+table { text-indent: 0; border-color: inherit; border-collapse: collapse }
+button, input, optgroup, select, textarea { font-family: inherit; font-feature-settings: inherit;
+  font-variation-settings: inherit; font-size: 100%; font-weight: inherit; line-height: inherit;
+  letter-spacing: inherit; color: inherit; margin: 0; padding: 0 }
+button, select { text-transform: none }
+button, input:where([type='button']), input:where([type='reset']), input:where([type='submit']) {
+  -webkit-appearance: button; background-color: transparent; background-image: none }
+:-moz-focusring { outline: auto }
+:-moz-ui-invalid { box-shadow: none }
+progress { vertical-align: baseline }
+::-webkit-inner-spin-button, ::-webkit-outer-spin-button { height: auto }
+[type='search'] { -webkit-appearance: textfield; outline-offset: -2px }
+::-webkit-search-decoration { -webkit-appearance: none }
+::-webkit-file-upload-button { -webkit-appearance: button; font: inherit }
+summary { display: list-item }
+blockquote, dl, dd, h1, h2, h3, h4, h5, h6, hr, figure, p, pre { margin: 0 }
+fieldset { margin: 0; padding: 0 }
+legend { padding: 0 }
+ol, ul, menu { list-style: none; margin: 0; padding: 0 }
+dialog { padding: 0 }
+textarea { resize: vertical }
+input::placeholder, textarea::placeholder { opacity: 1; color: #9ca3af }
+button, [role="button"] { cursor: pointer }
+:disabled { cursor: default }
+img, svg, video, canvas, audio, iframe, embed, object { display: block; vertical-align: middle }
+img, video { max-width: 100%; height: auto }
+[hidden] { display: none }
+"""
+
+
+# -------------------------------
+# UTILITIES
+# -------------------------------
+# Each family maps a class (variants stripped) to (rank, declarations),
+# or None if it isn't one of its utilities. Families are listed in
+# Tailwind's plugin order and ranked within by their theme's order, which
+# is the order the CDN emitted them in, so conflicting utilities resolve
+# the way they used to.
+
+def _arbitrary(value):
+    """The CSS value of an arbitrary ``[...]`` utility value: underscores are spaces."""
+    return re.sub(r"(?<!\\)_", " ", value).replace("\\_", "_")
+
+
+def _exact(table):
+    order = list(table)
+
+    def match(name):
+        if name in table:
+            return order.index(name), table[name]
+    return match
+
+
+def _scale(prefix, properties, values, negative=False, arbitrary=True):
+    """``prefix-<key>`` for each key of ``values``, or (if ``arbitrary``) ``prefix-[value]``."""
+    order = list(values)
+
+    def match(name):
+        sign = ""
+        if negative and name.startswith("-"):
+            sign, name = "-", name[1:]
+        key = name[len(prefix) + 1:] if name.startswith(prefix + "-") else None
+        if key in values:
+            rank, value = order.index(key), values[key]
+        elif arbitrary and key and key.startswith("[") and key.endswith("]"):
+            rank, value = len(order), _arbitrary(key[1:-1])
+        else:
+            return None
+        if sign:
+            value = f"calc({value} * -1)"
+        return rank, tuple(f"{prop}:{value}" for prop in properties)
+    return match
+
+
+def _color_value(key):
+    """The color of ``name`` or ``name/opacity``, e.g. ``white/70``."""
+    name, _, alpha = key.partition("/")
+    if re.fullmatch(r"\[(#|rgba?\(|hsla?\().*\]", name):
+        color = _arbitrary(name[1:-1])
+    else:
+        color = COLORS.get(name)
+    if color is None or not alpha:
+        return color
+    opacity = _arbitrary(alpha[1:-1]) if alpha.startswith("[") else OPACITIES.get(alpha)
+    hex_digits = color.lstrip("#")
+    if opacity is None or not color.startswith("#") or len(hex_digits) not in (3, 6):
+        return None
+    if len(hex_digits) == 3:
+        hex_digits = "".join(digit * 2 for digit in hex_digits)
+    red, green, blue = (int(hex_digits[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgb({red} {green} {blue} / {opacity})"
+
+
+def _colors(prefix, prop):
+    order = list(COLORS)
+
+    def match(name):
+        if not name.startswith(prefix + "-"):
+            return None
+        key = name[len(prefix) + 1:]
+        color = _color_value(key)
+        if color is None:
+            return None
+        base = key.partition("/")[0]
+        return (order.index(base) if base in COLORS else len(order)), (f"{prop}:{color}",)
+    return match
+
+
+def _font_size(name):
+    key = name[5:] if name.startswith("text-") else None
+    if key in FONT_SIZES:
+        size, line_height = FONT_SIZES[key]
+        return list(FONT_SIZES).index(key), (f"font-size:{size}", f"line-height:{line_height}")
+    if key and key.startswith("[") and key.endswith("]") and re.match(r"\[[\d.]", key):
+        return len(FONT_SIZES), (f"font-size:{_arbitrary(key[1:-1])}",)
+
+
+def _font_family(name):
+    key = name[5:] if name.startswith("font-") else None
+    if key in FONT_FAMILIES:
+        return list(FONT_FAMILIES).index(key), (f"font-family:{FONT_FAMILIES[key]}",)
+    if key and key.startswith("[") and key.endswith("]"):
+        return len(FONT_FAMILIES), (f"font-family:{_arbitrary(key[1:-1])}",)
+
+
+def _background_image(name):
+    key = name[3:] if name.startswith("bg-") else None
+    if key in BACKGROUND_IMAGES:
+        return list(BACKGROUND_IMAGES).index(key), (f"background-image:{BACKGROUND_IMAGES[key]}",)
+    if key and re.match(r"\[(url|[a-z-]*gradient)\(", key):
+        return len(BACKGROUND_IMAGES), (f"background-image:{_arbitrary(key[1:-1])}",)
+
+
+def _grid_columns(name):
+    key = name[10:] if name.startswith("grid-cols-") else None
+    if key and key.isdigit():
+        return int(key), (f"grid-template-columns:repeat({key}, minmax(0, 1fr))",)
+    if key in ("none", "subgrid"):
+        return 13, (f"grid-template-columns:{key}",)
+    if key and key.startswith("[") and key.endswith("]"):
+        # As in Tailwind, top-level commas separate tracks
+        return 14, (f"grid-template-columns:{_arbitrary(key[1:-1]).replace(',', ' ')}",)
+
+
+def _border_width(name):
+    match = re.fullmatch(r"border(?:-([xytrbl]))?(?:-(0|2|4|8|\[[^\]]+\]))?", name)
+    if not match:
+        return None
+    side, width = match.groups()
+    width = "1px" if width is None else _arbitrary(width[1:-1]) if width.startswith("[") else f"{width}px"
+    sides = {
+        None: ("",), "x": ("-left", "-right"), "y": ("-top", "-bottom"),
+        "t": ("-top",), "r": ("-right",), "b": ("-bottom",), "l": ("-left",),
+    }[side]
+    return "_xytrbl".index(side or "_"), tuple(f"border{edge}-width:{width}" for edge in sides)
+
+
+def _border_radius(name):
+    match = re.fullmatch(r"rounded(?:-([trbl]))?(?:-([a-z0-9]+))?", name)
+    if not match or (match[2] or "") not in RADII:
+        return None
+    side, size = match[1], match[2] or ""
+    corners = {
+        None: ("border-radius",),
+        "t": ("border-top-left-radius", "border-top-right-radius"),
+        "r": ("border-top-right-radius", "border-bottom-right-radius"),
+        "b": ("border-bottom-right-radius", "border-bottom-left-radius"),
+        "l": ("border-top-left-radius", "border-bottom-left-radius"),
+    }[side]
+    return "_trbl".index(side or "_") * len(RADII) + list(RADII).index(size), tuple(
+        f"{corner}:{RADII[size]}" for corner in corners
+    )
+
+
+def _scale_transform(name):
+    match = re.fullmatch(r"(-?)scale(?:-([xy]))?-(\d+)", name)
+    if not match or match[3] not in SCALES:
+        return None
+    sign, axis, step = match.groups()
+    value = f"{sign}{SCALES[step]}"
+    axes = (axis,) if axis else ("x", "y")
+    return "_xy".index(axis or "_") * len(SCALES) + list(SCALES).index(step), (
+        *(f"--tw-scale-{a}:{value}" for a in axes), f"transform:{TRANSFORM}"
+    )
+
+
+def _transition(name):
+    key = name[11:] if name.startswith("transition-") else "" if name == "transition" else None
+    if key not in TRANSITIONS:
+        return None
+    return list(TRANSITIONS).index(key), (
+        f"transition-property:{TRANSITIONS[key]}",
+        f"transition-timing-function:{EASING}",
+        "transition-duration:150ms",
+    )
+
+
+def _spacing_family(prefix, properties, negative=True, extra=None):
+    return _scale(prefix, properties, {**SPACING, **(extra or {})}, negative=negative)
+
+
+FAMILIES = (
+    _exact({"static": ("position:static",), "fixed": ("position:fixed",),
+            "absolute": ("position:absolute",), "relative": ("position:relative",),
+            "sticky": ("position:sticky",)}),
+    _scale("inset", ("inset",), {**SPACING, "auto": "auto", **FRACTIONS, "full": "100%"}, negative=True),
+    *(
+        _scale(side, (side,), {**SPACING, "auto": "auto", **FRACTIONS, "full": "100%"}, negative=True)
+        for side in ("top", "right", "bottom", "left")
+    ),
+    _scale("z", ("z-index",), Z_INDEXES, negative=True),
+    _spacing_family("m", ("margin",), extra={"auto": "auto"}),
+    _spacing_family("mx", ("margin-left", "margin-right"), extra={"auto": "auto"}),
+    _spacing_family("my", ("margin-top", "margin-bottom"), extra={"auto": "auto"}),
+    *(
+        _spacing_family(f"m{side[0]}", (f"margin-{side}",), extra={"auto": "auto"})
+        for side in ("top", "right", "bottom", "left")
+    ),
+    _exact({"block": ("display:block",), "inline-block": ("display:inline-block",),
+            "inline": ("display:inline",), "flex": ("display:flex",),
+            "inline-flex": ("display:inline-flex",), "table": ("display:table",),
+            "grid": ("display:grid",), "inline-grid": ("display:inline-grid",),
+            "contents": ("display:contents",), "hidden": ("display:none",)}),
+    _scale("aspect", ("aspect-ratio",), {"auto": "auto", "square": "1 / 1", "video": "16 / 9"}),
+    _scale("h", ("height",), {**SIZES, "screen": "100vh"}),
+    _scale("max-h", ("max-height",), {**SPACING, "none": "none", "full": "100%", "screen": "100vh",
+                                      "min": "min-content", "max": "max-content", "fit": "fit-content"}),
+    _scale("min-h", ("min-height",), {**SPACING, "full": "100%", "screen": "100vh",
+                                      "min": "min-content", "max": "max-content", "fit": "fit-content"}),
+    _scale("w", ("width",), {**SIZES, "screen": "100vw"}),
+    _scale("min-w", ("min-width",), {**SPACING, "full": "100%", "min": "min-content",
+                                     "max": "max-content", "fit": "fit-content"}),
+    _scale("max-w", ("max-width",), MAX_WIDTHS),
+    _exact({"flex-1": ("flex:1 1 0%",), "flex-auto": ("flex:1 1 auto",),
+            "flex-initial": ("flex:0 1 auto",), "flex-none": ("flex:none",)}),
+    _exact({"shrink-0": ("flex-shrink:0",), "shrink": ("flex-shrink:1",)}),
+    _exact({"grow-0": ("flex-grow:0",), "grow": ("flex-grow:1",)}),
+    _scale_transform,
+    _exact({"cursor-auto": ("cursor:auto",), "cursor-default": ("cursor:default",),
+            "cursor-pointer": ("cursor:pointer",), "cursor-not-allowed": ("cursor:not-allowed",)}),
+    _exact({"list-none": ("list-style-type:none",), "list-disc": ("list-style-type:disc",),
+            "list-decimal": ("list-style-type:decimal",)}),
+    _grid_columns,
+    _exact({"flex-row": ("flex-direction:row",), "flex-row-reverse": ("flex-direction:row-reverse",),
+            "flex-col": ("flex-direction:column",), "flex-col-reverse": ("flex-direction:column-reverse",)}),
+    _exact({"flex-wrap": ("flex-wrap:wrap",), "flex-wrap-reverse": ("flex-wrap:wrap-reverse",),
+            "flex-nowrap": ("flex-wrap:nowrap",)}),
+    _exact({"items-start": ("align-items:flex-start",), "items-end": ("align-items:flex-end",),
+            "items-center": ("align-items:center",), "items-baseline": ("align-items:baseline",),
+            "items-stretch": ("align-items:stretch",)}),
+    _exact({"justify-normal": ("justify-content:normal",), "justify-start": ("justify-content:flex-start",),
+            "justify-end": ("justify-content:flex-end",), "justify-center": ("justify-content:center",),
+            "justify-between": ("justify-content:space-between",),
+            "justify-around": ("justify-content:space-around",),
+            "justify-evenly": ("justify-content:space-evenly",)}),
+    _scale("gap", ("gap",), SPACING),
+    _scale("gap-x", ("column-gap",), SPACING),
+    _scale("gap-y", ("row-gap",), SPACING),
+    _exact({f"overflow{axis}-{value}": (f"overflow{axis}:{value}",)
+            for axis in ("", "-x", "-y") for value in ("auto", "hidden", "clip", "visible", "scroll")}),
+    _exact({"truncate": ("overflow:hidden", "text-overflow:ellipsis", "white-space:nowrap")}),
+    _exact({"whitespace-normal": ("white-space:normal",), "whitespace-nowrap": ("white-space:nowrap",),
+            "whitespace-pre": ("white-space:pre",), "whitespace-pre-wrap": ("white-space:pre-wrap",)}),
+    _border_radius,
+    _border_width,
+    _colors("border", "border-color"),
+    _colors("bg", "background-color"),
+    _background_image,
+    _exact({f"object-{fit}": (f"object-fit:{fit}",)
+            for fit in ("contain", "cover", "fill", "none", "scale-down")}),
+    _scale("p", ("padding",), SPACING),
+    _scale("px", ("padding-left", "padding-right"), SPACING),
+    _scale("py", ("padding-top", "padding-bottom"), SPACING),
+    *(_scale(f"p{side[0]}", (f"padding-{side}",), SPACING) for side in ("top", "right", "bottom", "left")),
+    _exact({f"text-{align}": (f"text-align:{align}",)
+            for align in ("left", "center", "right", "justify", "start", "end")}),
+    _exact({f"align-{align}": (f"vertical-align:{align}",)
+            for align in ("baseline", "top", "middle", "bottom", "text-top", "text-bottom")}),
+    _font_family,
+    _font_size,
+    _scale("font", ("font-weight",), FONT_WEIGHTS, arbitrary=False),
+    _exact({"uppercase": ("text-transform:uppercase",), "lowercase": ("text-transform:lowercase",),
+            "capitalize": ("text-transform:capitalize",), "normal-case": ("text-transform:none",)}),
+    _exact({"italic": ("font-style:italic",), "not-italic": ("font-style:normal",)}),
+    _scale("leading", ("line-height",), LINE_HEIGHTS),
+    _colors("text", "color"),
+    _exact({"underline": ("text-decoration-line:underline",),
+            "line-through": ("text-decoration-line:line-through",),
+            "no-underline": ("text-decoration-line:none",)}),
+    _scale("opacity", ("opacity",), OPACITIES),
+    _exact({"outline-none": ("outline:2px solid transparent", "outline-offset:2px")}),
+    _transition,
+    _scale("duration", ("transition-duration",), DURATIONS),
+)
+
+VARIANTS = {
+    # Pseudo-elements, then pseudo-classes, then group-*, in Tailwind's order
+    "placeholder": "::placeholder",
+    "before": "::before",
+    "after": "::after",
+    "first": ":first-child",
+    "last": ":last-child",
+    "odd": ":nth-child(odd)",
+    "even": ":nth-child(even)",
+    "focus-within": ":focus-within",
+    "hover": ":hover",
+    "focus": ":focus",
+    "focus-visible": ":focus-visible",
+    "active": ":active",
+    "disabled": ":disabled",
+    "group-hover": ".group:hover ",
+    "group-focus": ".group:focus ",
+}
+
+
+def escape(name):
+    """``name`` as a CSS class selector."""
+    return "." + re.sub(r"[^a-zA-Z0-9_-]", lambda match: "\\" + match[0], name)
+
+
+def utility_rules(name):
+    """
+    (sort key, at-rule or None, selector, declarations) for each rule the
+    Tailwind class ``name`` (e.g. ``md:flex-row``) makes; none if it isn't
+    one. Like Tailwind, a class can make several: text-4xl is both a font
+    size and, in CUSTOM_UTILITIES, a font family.
+    """
+    rest, variants, screen = name, [], None
+    while (prefix := re.match(r"([a-z0-9-]+):", rest)) and (prefix[1] in VARIANTS or prefix[1] in SCREENS):
+        if prefix[1] in SCREENS:
+            if screen is not None:
+                return []
+            screen = prefix[1]
+        else:
+            variants.append(prefix[1])
+        rest = rest[prefix.end():]
+
+    selector = escape(name)
+    pseudo_elements = ""
+    for variant in variants:
+        suffix = VARIANTS[variant]
+        if suffix.endswith(" "):
+            selector = suffix + selector
+        elif suffix.startswith("::"):
+            pseudo_elements += suffix
+        else:
+            selector += suffix
+    at_rule = f"@media (min-width: {SCREENS[screen]})" if screen else None
+    variant_key = (
+        list(SCREENS).index(screen) if screen else -1,
+        tuple(sorted(list(VARIANTS).index(variant) for variant in variants)),
+    )
+
+    rules = []
+    for family, matcher in enumerate((*FAMILIES, _exact(CUSTOM_UTILITIES))):
+        found = matcher(rest)
+        if found:
+            rank, declarations = found
+            rules.append(((*variant_key, family, rank), at_rule, selector + pseudo_elements, declarations))
+    return rules
+
+
+def utilities_css(classes):
+    """The container and utility rules among ``classes``, and the classes they cover."""
+    rules = sorted(
+        ((rule, name) for name in classes for rule in utility_rules(name)),
+        key=lambda item: (item[0][0], item[1]),
+    )
+    parts, covered = [], {name for _, name in rules}
+    if any("--tw-scale" in declaration for (*_, declarations), _ in rules for declaration in declarations):
+        parts.append(minify(TRANSFORM_DEFAULTS))
+    if "container" in classes:
+        covered.add("container")
+        parts.append(".container{width:100%}")
+        parts += [
+            f"@media (min-width:{width}){{.container{{max-width:{width}}}}}" for width in SCREENS.values()
+        ]
+    if any(variant.startswith("group-") for _, name in rules for variant in name.split(":")[:-1]):
+        # The class group-* variants key on, which styles nothing itself
+        covered.add("group")
+    # Rules under the same media query share one block
+    for at_rule, group in groupby(rules, key=lambda item: item[0][1]):
+        block = "".join(
+            f"{selector}{{{';'.join(minify_declaration(d) for d in declarations)}}}"
+            for (_, _, selector, declarations), _ in group
+        )
+        parts.append(f"{minify(at_rule)}{{{block}}}" if at_rule else block)
+    return "".join(parts), covered
+
+
+# -------------------------------
+# TEMPLATES
+# -------------------------------
+
+CLASS_ATTRIBUTE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+# Template tags that render an element take its classes as css_class="..."
+TAG_CLASS_ARGUMENT = re.compile(r"""{%[^%]*?\bcss_class=(?:"([^"]*)"|'([^']*)')""")
+CLASS_BLOCK = re.compile(r"""\bclass\s*=\s*["'][^"']*?{%\s*block\s+(\w+)\s*%}""")
+CLASS_LIST_CALL = re.compile(r"""classList\.(?:add|remove|toggle|replace|contains)\(([^)]*)\)""")
+QUOTED = re.compile(r"""(['"`])(.*?)\1""")
+TEMPLATE_TAG = re.compile(r"{%.*?%}|{{.*?}}|{#.*?#}", re.S)
+
+
+def template_classes(directories):
+    """Every class the templates under ``directories`` can put on an element."""
+    texts = [
+        path.read_text()
+        for directory in directories
+        for path in sorted(Path(directory).rglob("*.html"))
+    ]
+    classes = set()
+    blocks = {name for text in texts for name in CLASS_BLOCK.findall(text)}
+    for text in texts:
+        # Blocks that fill a class attribute, e.g. {% block body_class %}page-about{% endblock %}
+        for name in blocks:
+            for value in re.findall(r"{%\s*block\s+" + name + r"\s*%}(.*?){%\s*endblock", text, re.S):
+                classes.update(TEMPLATE_TAG.sub(" ", value).split())
+        for call in CLASS_LIST_CALL.findall(text):
+            classes.update(word for _, value in QUOTED.findall(call) for word in value.split())
+        for double, single in TAG_CLASS_ARGUMENT.findall(text):
+            classes.update((double or single).split())
+        for double, single in CLASS_ATTRIBUTE.findall(TEMPLATE_TAG.sub(" ", text)):
+            classes.update((double or single).split())
+    return classes
+
+
+# -------------------------------
+# STYLE.CSS
+# -------------------------------
+
+COMMENT = re.compile(r"/\*.*?\*/", re.S)
+GROUPING_RULES = ("@media", "@supports", "@layer", "@container")
+
+
+def parse(css):
+    """
+    Top-level (prelude, body) pairs of ``css``, comments removed; body is
+    None for statements (e.g. @import), and a list of pairs for grouping
+    at-rules such as @media.
+    """
+    css = COMMENT.sub("", css)
+    nodes, position = [], 0
+    while True:
+        while position < len(css) and css[position].isspace():
+            position += 1
+        if position >= len(css):
+            return nodes
+        end = _scan(css, position, "{;")
+        prelude = css[position:end].strip()
+        if end >= len(css) or css[end] == ";":
+            nodes.append((prelude, None))
+            position = end + 1
+            continue
+        close = _matching_brace(css, end)
+        body = css[end + 1:close]
+        nodes.append((prelude, parse(body) if prelude.startswith(GROUPING_RULES) else body))
+        position = close + 1
+
+
+def _scan(css, position, stops):
+    quote = None
+    while position < len(css):
+        char = css[position]
+        if quote:
+            if char == "\\":
+                position += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in stops:
+            return position
+        position += 1
+    return position
+
+
+def _matching_brace(css, opening):
+    depth, position = 0, opening
+    while position < len(css):
+        position = _scan(css, position, "{}")
+        if position >= len(css):
+            break
+        depth += 1 if css[position] == "{" else -1
+        if depth == 0:
+            return position
+        position += 1
+    raise ValueError(f"unbalanced braces after {css[max(0, opening - 40):opening]!r}")
+
+
+def selector_classes(selector):
+    """The classes an element must have for ``selector`` to match something."""
+    selector = re.sub(r":not\([^)]*\)", "", selector)
+    return {
+        re.sub(r"\\([0-9a-fA-F]{1,6}) ?|\\(.)", lambda m: chr(int(m[1], 16)) if m[1] else m[2], name)
+        for name in re.findall(r"\.((?:\\[0-9a-fA-F]{1,6} ?|\\.|[\w-])+)", selector)
+    }
+
+
+def split_selectors(prelude):
+    return [selector.strip() for selector in re.split(r",(?![^(]*\))", prelude) if selector.strip()]
+
+
+def purge(nodes, classes):
+    """
+    ``nodes`` without the selectors that need a class outside
+    ``classes``; returns the CSS and the rules kept and dropped.
+    """
+    parts, kept, dropped = [], 0, 0
+    keyframes = []
+    for prelude, body in nodes:
+        if body is None:
+            parts.append(minify(prelude) + ";")
+        elif isinstance(body, list):
+            inner, inner_kept, inner_dropped = purge(body, classes)
+            kept, dropped = kept + inner_kept, dropped + inner_dropped
+            if inner:
+                parts.append(f"{minify(prelude)}{{{inner}}}")
+        elif prelude.startswith("@keyframes"):
+            keyframes.append((len(parts), prelude, body))
+        elif prelude.startswith("@"):
+            parts.append(f"{minify(prelude)}{{{minify(body)}}}")
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_classes(s) <= classes]
+            if selectors:
+                kept += 1
+                parts.append(f"{','.join(minify(s) for s in selectors)}{{{minify(body)}}}")
+            else:
+                dropped += 1
+
+    # Animations whose every user was dropped go too
+    used = "".join(parts)
+    for index, prelude, body in reversed(keyframes):
+        if re.search(r"\b" + re.escape(prelude.split()[-1]) + r"\b", used):
+            parts.insert(index, f"{minify(prelude)}{{{minify(body)}}}")
+    return "".join(parts), kept, dropped
+
+
+def style_classes(nodes):
+    """Every class the selectors of ``nodes`` name."""
+    classes = set()
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            classes |= style_classes(body)
+        elif body is not None and not prelude.startswith("@"):
+            classes |= selector_classes(prelude)
+    return classes
+
+
+# -------------------------------
+# MINIFYING
+# -------------------------------
+
+def minify(css):
+    """Whitespace-only minification: strings are left alone, selectors keep their meaning."""
+    out, position = [], 0
+    css = COMMENT.sub("", css)
+    for match in re.finditer(r"""(["'])(?:\\.|(?!\1).)*\1""", css):
+        out.append(_squeeze(css[position:match.start()]))
+        out.append(match[0])
+        position = match.end()
+    out.append(_squeeze(css[position:]))
+    return "".join(out).strip().rstrip(";")
+
+
+def _squeeze(text):
+    text = re.sub(r"\s+", " ", text)
+    # Never before ':', which would turn "a :hover" into "a:hover"
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}")
+
+
+def minify_declaration(declaration):
+    prop, _, value = declaration.partition(":")
+    return f"{prop.strip()}:{minify(value)}"
+
+
+# -------------------------------
+# BUILDING
+# -------------------------------
+
+def source_dir():
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def build():
+    """The stylesheet, and counts of what went into it for the command to report."""
+    classes = template_classes(settings.TEMPLATES[0]["DIRS"])
+    nodes = parse((source_dir() / SOURCE).read_text())
+    site, kept, dropped = purge(nodes, classes)
+    tailwind, covered = utilities_css(classes)
+    return site + minify(PREFLIGHT) + tailwind + "\n", {
+        "classes": len(classes),
+        "utilities": len(covered),
+        "kept": kept,
+        "dropped": dropped,
+        "unmatched": sorted(classes - covered - style_classes(nodes)),
+    }
+
+
+def filename(css):
+    return f"site.{hashlib.sha256(css.encode()).hexdigest()[:12]}.css"
+
+
+def write(css, keep=KEEP_BUILDS):
+    """
+    Write ``css`` under its hashed name with .gz and (if the brotli module
+    is installed) .br copies, make it current, and prune all but the
+    ``keep`` newest builds. Returns the paths written.
+    """
+    directory = source_dir() / OUTPUT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    name = filename(css)
+    data = css.encode()
+    path = directory / name
+    written = [path]
+    path.write_bytes(data)
+    # mtime=0 so rebuilding the same CSS writes the same bytes
+    (directory / f"{name}.gz").write_bytes(gzip.compress(data, 9, mtime=0))
+    written.append(directory / f"{name}.gz")
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        (directory / f"{name}.br").write_bytes(brotli.compress(data, mode=brotli.MODE_TEXT, quality=11))
+        written.append(directory / f"{name}.br")
+
+    manifest = _read_manifest(directory) or {}
+    builds = [name] + [build for build in manifest.get("builds", []) if build != name]
+    builds = builds[:keep]
+    for old in directory.glob("site.*.css*"):
+        if old.name.split(".css")[0] + ".css" not in builds:
+            old.unlink()
+    tmp = directory / f"{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps({
+        "stylesheet": (OUTPUT_DIR / name).as_posix(),
+        "builds": builds,
+    }, indent=1) + "\n")
+    os.replace(tmp, directory / MANIFEST_NAME)
+    _current.clear()
+    return written
+
+
+def _read_manifest(directory):
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+_current = {}
+
+
+def current():
+    """The static path of the current build, e.g. ``css/dist/site.<hash>.css``."""
+    if "path" not in _current or settings.DEBUG:
+        manifest = _read_manifest(source_dir() / OUTPUT_DIR)
+        if not manifest:
+            raise ImproperlyConfigured(
+                f"No stylesheet in {source_dir() / OUTPUT_DIR}; run manage.py build_css."
+            )
+        _current["path"] = manifest["stylesheet"]
+    return _current["path"]
@@ -0,0 +1,118 @@
+"""
+Album and artist num_tabs maintenance.
+
+The Song receivers in tabs/signals.py record a +1/-1 for the album and
+artist a song joins or leaves. Deltas are summed per transaction and
+applied on commit as F() updates, one UPDATE per distinct delta, so
+edits that don't move a song cost nothing and an admin save touching
+many songs costs a handful of queries. Bulk paths that bypass signals
+(queryset.update(), bulk_create) call reconcile() for the rows they
+touched; the reconcile_tab_counts command runs it over everything.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+
+from .commit_buffer import CommitBuffer
+from .models import Album, Artist, Song
+
+# Sent after num_tabs changed, with album_ids and artist_ids (sets)
+tab_counts_changed = Signal()
+
+
+def _new_changes():
+    return {"album": Counter(), "artist": Counter()}
+
+
+def _flush(changes):
+    apply(changes["album"], changes["artist"])
+
+
+_changes = CommitBuffer("tab_counts", _new_changes, _flush)
+
+
+def song_added(album_id, artist_id, using=None):
+    _record(album_id, artist_id, 1, using)
+
+
+def song_removed(album_id, artist_id, using=None):
+    _record(album_id, artist_id, -1, using)
+
+
+def _record(album_id, artist_id, delta, using):
+    with _changes.collect(using) as changes:
+        if album_id is not None:
+            changes["album"][album_id] += delta
+        if artist_id is not None:
+            changes["artist"][artist_id] += delta
+
+
+def apply(album_deltas, artist_deltas):
+    """Add per-id deltas to num_tabs, grouping ids that share a delta."""
+    changed = {}
+    for kind, model, deltas in (("album", Album, album_deltas), ("artist", Artist, artist_deltas)):
+        by_delta = defaultdict(list)
+        for pk, delta in deltas.items():
+            if delta:
+                by_delta[delta].append(pk)
+        for delta, ids in by_delta.items():
+            model.objects.filter(pk__in=ids).update(num_tabs=F("num_tabs") + delta)
+        changed[kind] = {pk for ids in by_delta.values() for pk in ids}
+    if changed["album"] or changed["artist"]:
+        tab_counts_changed.send(
+            sender=apply, album_ids=changed["album"], artist_ids=changed["artist"]
+        )
+
+
+# -------------------------------
+# RECONCILIATION
+# -------------------------------
+
+def _actual_count(field):
+    return Coalesce(
+        Subquery(
+            Song.objects.filter(**{field: OuterRef("pk")})
+            .order_by().values(field).annotate(n=Count("pk")).values("n"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _drifted(kind, ids=None):
+    model = {"album": Album, "artist": Artist}[kind]
+    queryset = model.objects.all() if ids is None else model.objects.filter(pk__in=ids)
+    return queryset.annotate(actual=_actual_count(kind)).filter(~Q(num_tabs=F("actual")))
+
+
+def drift(album_ids=None, artist_ids=None):
+    """
+    Rows whose stored num_tabs disagrees with their songs, as
+    (kind, pk, name, stored, actual) tuples. Pass ids to limit the check.
+    """
+    rows = []
+    for kind, label, ids in (("album", "title", album_ids), ("artist", "name", artist_ids)):
+        queryset = _drifted(kind, ids).order_by("pk").values_list("pk", label, "num_tabs", "actual")
+        rows.extend((kind, *row) for row in queryset)
+    return rows
+
+
+def reconcile(album_ids=None, artist_ids=None):
+    """
+    Recount num_tabs with one set-based UPDATE per model, touching only
+    rows that drifted. Returns the drift found (see drift()).
+    """
+    found = drift(album_ids, artist_ids)
+    fixed = {"album": set(), "artist": set()}
+    for kind, pk, *_ in found:
+        fixed[kind].add(pk)
+    for kind, ids in (("album", album_ids), ("artist", artist_ids)):
+        if fixed[kind]:
+            _drifted(kind, ids).update(num_tabs=_actual_count(kind))
+    if fixed["album"] or fixed["artist"]:
+        tab_counts_changed.send(
+            sender=reconcile, album_ids=fixed["album"], artist_ids=fixed["artist"]
+        )
+    return found
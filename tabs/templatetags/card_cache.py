@@ -0,0 +1,11 @@
+from django import template
+
+from tabs.card_cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_cards(rows, kind):
+    """{% cached_cards page_obj "song" %}: every row's card, from the card cache."""
+    return render_cards(rows, kind)
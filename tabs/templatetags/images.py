@@ -0,0 +1,28 @@
+from django import template
+from django.utils.html import format_html
+
+from tabs.images import SIZES, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(url, alt, layout, css_class="", lazy=True):
+    """
+    {% responsive_img album.album_img album.title "grid" css_class="albums-album-img" %}:
+    the image at ``url`` from the local store, sized for ``layout`` (see
+    tabs.images.SIZES). Pass lazy=False for images shown above the fold.
+    """
+    loading = "lazy" if lazy else "eager"
+    image = variants(url)
+    if image is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">', url, alt, css_class, loading
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="{}" decoding="async" style="background:url({}) center/cover no-repeat"></picture>',
+        image["srcset"]["webp"], SIZES[layout], image["src"], image["srcset"]["jpg"], SIZES[layout],
+        image["width"], image["height"], alt, css_class, loading, image["placeholder"],
+    )
@@ -0,0 +1,12 @@
+from django import template
+from django.templatetags.static import static
+
+from tabs.stylesheet import current
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_url():
+    """{% stylesheet_url %}: the site stylesheet manage.py build_css last wrote."""
+    return static(current())
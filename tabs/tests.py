@@ -0,0 +1,599 @@
+"""
+Tests over a small seeded catalog: the query checks the
+check_query_budgets and check_query_plans commands run against a real
+database, and the totals, counts and indexes the signal receivers keep
+up to date on commit, checked against the tables they summarize.
+"""
+import json
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Q
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from . import bulk_edit, change_feed, changelog, page_cache, popularity, tab_counts
+from .facets import FACETS, facet_index
+from .models import Album, Artist, CatalogStats, Song, SongChangeLog, Tabber
+from .pagination import CursorPaginator, InvalidCursor, with_pk
+from .query_stats import QueryRecorder, budget_problems, full_scans, query_plan, unbounded_sorts
+from .search_index import autocomplete_index
+from .view_samples import fetch, sample_urls
+from .views import SONG_SORTS
+
+TUNINGS = ["E Standard", "Drop D", "D Standard"]
+
+# Keep test requests away from the shared on-disk page cache
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "pages": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-pages"},
+    "fragments": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-fragments"},
+}
+
+
+def seed_catalog():
+    """
+    A small catalog with a bit of everything the views show: several
+    artists and albums, more songs than fit on one listing page, filler
+    tracks, tabber credits, mixed tunings and difficulties, and changelog
+    entries.
+    """
+    tabbers = [Tabber.objects.create(name=name) for name in ("Afra", "Guest Tabber")]
+    number = 0
+    for artist_name in ("The Fall Of Troy", "Dance Gavin Dance", "Chon", "The Mars Volta"):
+        artist = Artist.objects.create(name=artist_name)
+        for year, album_title in enumerate(("The Phantom On The Horizon", "Doppelganger"), start=2008):
+            album = Album.objects.create(
+                title=f"{album_title} {artist.pk}", artist=artist, release_year=str(year),
+                tuning=TUNINGS[number % len(TUNINGS)], has_filler=True,
+            )
+            for track in range(1, 5):
+                number += 1
+                song = Song.objects.create(
+                    title=f"The Song {number}", artist=artist, album=album, track_num=track,
+                    tuning=TUNINGS[number % len(TUNINGS)], difficulty=number % 4 + 1,
+                    riffs=number, duration=timedelta(minutes=3, seconds=number),
+                    artist_verified=number % 3 == 0, was_request=number % 5 == 0,
+                    view_count=number, popularity=number,
+                )
+                song.tabber.set(tabbers[: number % 2 + 1])
+                SongChangeLog.objects.create(song=song, change_summary="Tab added")
+            Song.objects.create(title="Interlude", artist=artist, album=album, track_num=5, is_filler=True)
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_PAGES=False, RECORD_SONG_VIEWS=False)
+class CatalogTestCase(TestCase):
+    """
+    Requests against seed_catalog(), with every page rendered by its view
+    and song views left out of the popularity counts.
+    """
+
+    # Inside the test's transaction the router sends reads to default as well
+    databases = {"default"}
+
+    @classmethod
+    def setUpTestData(cls):
+        # As if committed: the receivers' on-commit work runs too
+        with cls.captureOnCommitCallbacks(execute=True):
+            seed_catalog()
+
+    def setUp(self):
+        # Built once per process at start-up, not per request; the loads
+        # are deliberate full reads, kept out of the checks
+        facet_index.build()
+        autocomplete_index.build()
+
+
+class QueryBudgetTests(CatalogTestCase):
+    """Every public view stays within its @query_budget without an N+1."""
+
+    def test_views_within_budget(self):
+        for name, url in sample_urls():
+            with self.subTest(url=url):
+                view = resolve(url.partition("?")[0]).func
+                with QueryRecorder() as recorder:
+                    response = fetch(self.client, url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(budget_problems(view, recorder), [])
+
+
+# The home page, listings, search and detail pages, by url name
+PLANNED_VIEWS = {
+    "tabs:base", "tabs:tabs_list", "tabs:albums_list", "tabs:artists_list", "tabs:search_api",
+    "tabs:song_detail", "tabs:song_panel", "tabs:album_detail", "tabs:artist_detail",
+}
+
+
+class QueryPlanTests(CatalogTestCase):
+    """The listing, search and detail pages read through indexes."""
+
+    def test_no_full_scans_or_temp_sorts(self):
+        for name, url in sample_urls():
+            if name not in PLANNED_VIEWS:
+                continue
+            with QueryRecorder(keep_statements=True) as recorder:
+                response = fetch(self.client, url)
+            self.assertEqual(response.status_code, 200)
+            for sql, params in recorder.statements:
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                plan = query_plan(sql, params)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    self.assertEqual(full_scans(sql, plan), [])
+                    self.assertEqual(unbounded_sorts(sql, plan), [])
+
+
+class CatalogStatsTests(CatalogTestCase):
+    """The on-commit deltas leave CatalogStats where a rebuild() would."""
+
+    FIELDS = ("total_tabs", "total_albums", "total_artists", "verified_tabs", "total_riffs", "total_duration")
+
+    def stored(self):
+        return CatalogStats.objects.filter(pk=CatalogStats.SINGLETON_ID).values(*self.FIELDS).get()
+
+    def assertMatchesRebuild(self):
+        stored = self.stored()
+        CatalogStats.rebuild()
+        self.assertEqual(stored, self.stored())
+
+    def test_add(self):
+        album = Album.objects.select_related("artist").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            artist = Artist.objects.create(name="Polyphia")
+            Album.objects.create(title="New Levels New Devils", artist=artist)
+            Song.objects.create(
+                title="New Song", artist=album.artist, album=album, riffs=7,
+                duration=timedelta(minutes=4), artist_verified=True,
+            )
+            Song.objects.create(title="Outro", artist=album.artist, album=album, is_filler=True, riffs=3)
+        self.assertEqual(self.stored()["total_artists"], Artist.objects.count())
+        self.assertMatchesRebuild()
+
+    def test_edit(self):
+        songs = Song.objects.filter(is_filler=False).order_by("pk")
+        with self.captureOnCommitCallbacks(execute=True):
+            song = songs[0]
+            song.riffs += 10
+            song.duration += timedelta(seconds=30)
+            song.artist_verified = not song.artist_verified
+            song.save()
+            song = songs[1]
+            song.is_filler = True
+            song.save()
+            song = Song.objects.filter(is_filler=True).first()
+            song.is_filler = False
+            song.save()
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Song.objects.filter(is_filler=False).first().delete()
+            Album.objects.last().delete()
+        self.assertMatchesRebuild()
+
+    def test_rollback(self):
+        before = self.stored()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Song.objects.filter(is_filler=False).first().delete()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.stored(), before)
+        self.assertMatchesRebuild()
+
+    def test_savepoint_rollback(self):
+        album = Album.objects.select_related("artist").first()
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            Song.objects.create(title="Kept", artist=album.artist, album=album, riffs=2)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Song.objects.filter(is_filler=False).first().delete()
+                raise RuntimeError
+        self.assertMatchesRebuild()
+
+
+class TabCountsTests(CatalogTestCase):
+    """num_tabs follows songs on commit, and reconcile() repairs drift."""
+
+    def test_moves_follow_songs(self):
+        song = Song.objects.filter(is_filler=False).select_related("album").first()
+        target = Album.objects.exclude(artist=song.artist).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            song.album, song.artist = target, target.artist
+            song.save()
+            Song.objects.create(title="New Song", artist=target.artist, album=target)
+            Song.objects.filter(is_filler=True).first().delete()
+        self.assertEqual(tab_counts.drift(), [])
+
+    def test_savepoint_rollback(self):
+        album = Album.objects.select_related("artist").first()
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            Song.objects.create(title="Kept", artist=album.artist, album=album)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Song.objects.filter(album=album).first().delete()
+                raise RuntimeError
+        self.assertEqual(tab_counts.drift(), [])
+
+    def test_drift_and_reconcile(self):
+        album = Album.objects.order_by("pk").first()
+        artist = album.artist
+        Album.objects.filter(pk=album.pk).update(num_tabs=F("num_tabs") + 3)
+        Artist.objects.filter(pk=artist.pk).update(num_tabs=0)
+        actual_album = album.songs.count()
+        actual_artist = artist.songs.count()
+        expected = [
+            ("album", album.pk, album.title, actual_album + 3, actual_album),
+            ("artist", artist.pk, artist.name, 0, actual_artist),
+        ]
+        self.assertEqual(tab_counts.drift(), expected)
+        # Limited to other rows, the check finds nothing
+        self.assertEqual(tab_counts.drift(album_ids=[album.pk + 1], artist_ids=[artist.pk + 1]), [])
+
+        self.assertEqual(tab_counts.reconcile(), expected)
+        self.assertEqual(tab_counts.drift(), [])
+        album.refresh_from_db()
+        self.assertEqual(album.num_tabs, actual_album)
+
+
+class CursorPaginationTests(CatalogTestCase):
+    """Keyset pages follow the ORM's order, and bad cursors are refused."""
+
+    ORDERINGS = [("title",), ("-date_added",), ("-popularity",), ("difficulty", "-title")]
+
+    def listed(self):
+        return Song.objects.filter(is_filler=False)
+
+    def test_walk_matches_orm(self):
+        for ordering in self.ORDERINGS:
+            with self.subTest(ordering=ordering):
+                paginator = CursorPaginator(self.listed(), ordering, 5)
+                pks, cursor = [], None
+                while True:
+                    page = paginator.page(cursor)
+                    pks.extend(song.pk for song in page)
+                    if not page.has_next():
+                        break
+                    cursor = page.next_cursor
+                expected = list(self.listed().order_by(*with_pk(ordering)).values_list("pk", flat=True))
+                self.assertEqual(pks, expected)
+
+    def test_cursor_round_trip(self):
+        paginator = CursorPaginator(self.listed(), ("-date_added",), 5)
+        song = self.listed().first()
+        self.assertEqual(paginator.decode(paginator.cursor_for(song)), [song.date_added, song.pk])
+
+    def test_bad_cursors(self):
+        paginator = CursorPaginator(self.listed(), ("title",), 5)
+        first = [song.pk for song in paginator.page()]
+        cursor = paginator.page().next_cursor
+        other = CursorPaginator(self.listed(), ("difficulty", "title"), 5).page().next_cursor
+        tampered = cursor[:-1] + ("A" if cursor[-1] != "A" else "B")
+        for bad in (tampered, other, "garbage"):
+            with self.subTest(cursor=bad):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(bad)
+                # Views restart from the top instead
+                self.assertEqual([song.pk for song in paginator.get_page(bad)], first)
+
+    @mock.patch("tabs.views.PAGE_SIZE", 5)
+    def test_listing_walk(self):
+        # tabs_list resumes from the facet index's pre-sorted orders
+        for sort, ordering in SONG_SORTS.items():
+            for params, condition in (({}, {}), ({"tuning": "Drop D"}, {"tuning": "Drop D"})):
+                with self.subTest(sort=sort, params=params):
+                    query = urlencode({"sort": sort, **params})
+                    pks = []
+                    while query:
+                        response = self.client.get(reverse("tabs:tabs_list") + "?" + query)
+                        self.assertEqual(response.status_code, 200)
+                        pks.extend(song.pk for song in response.context["page_obj"])
+                        query = response.context["next_query"]
+                    expected = self.listed().filter(**condition).order_by(*with_pk(ordering))
+                    self.assertEqual(pks, list(expected.values_list("pk", flat=True)))
+
+
+class FacetIndexTests(CatalogTestCase):
+    """The facet index's counts and orders agree with the ORM, before and after edits."""
+
+    # Facet index predicates and the same filters as ORM lookups
+    FILTERS = [
+        {},
+        {"tuning": (lambda value: value == "Drop D", Q(tuning="Drop D"))},
+        {
+            "difficulty": (lambda value: value is not None and value >= 3, Q(difficulty__gte=3)),
+            "artist_verified": (bool, Q(artist_verified=True)),
+        },
+    ]
+
+    def listed(self):
+        return Song.objects.filter(is_filler=False)
+
+    def assertMatchesOrm(self):
+        for filters in self.FILTERS:
+            with self.subTest(filters=list(filters)):
+                predicates = {facet: accepts for facet, (accepts, _) in filters.items()}
+                counts = facet_index.counts(predicates)
+                for facet in FACETS:
+                    # Each facet is counted under the other facets' filters
+                    others = [lookup for other, (_, lookup) in filters.items() if other != facet]
+                    expected = dict(
+                        self.listed().filter(*others).order_by()
+                        .values_list(facet).annotate(n=Count("pk")).values_list(facet, "n")
+                    )
+                    found = {value: n for value, n in counts[facet].items() if n}
+                    self.assertEqual(found, expected, facet)
+
+                matching = self.listed().filter(*(lookup for _, lookup in filters.values()))
+                mask = facet_index.mask(predicates)
+                for ordering in ("title", "-date_added", "-popularity"):
+                    results = facet_index.results(mask, ordering, filtered=bool(filters))
+                    expected = list(matching.order_by(*with_pk((ordering,))).values_list("pk", flat=True))
+                    self.assertEqual(results[:], expected, ordering)
+                    # Resuming after any row gives the rest
+                    middle = Song.objects.get(pk=expected[len(expected) // 2])
+                    value = getattr(middle, ordering.lstrip("-"))
+                    self.assertEqual(list(results.after(value, middle.pk)), expected[len(expected) // 2 + 1:])
+
+    def test_counts_and_orders(self):
+        self.assertMatchesOrm()
+
+    def test_saved_then_deleted_in_a_savepoint(self):
+        # The deletion goes in the savepoint's own buffer, flushed after the save's
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            song = self.listed().order_by("pk").first()
+            song.tuning = "Drop C"
+            song.save()
+            with transaction.atomic():
+                song.delete()
+        self.assertMatchesOrm()
+
+    def test_after_edits(self):
+        album = Album.objects.select_related("artist").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Song.objects.create(
+                title="A New Song", artist=album.artist, album=album, tuning="Drop D",
+                difficulty=4, artist_verified=True,
+            )
+            song = self.listed().order_by("pk").first()
+            song.title, song.tuning, song.difficulty = "Zebra", "Drop D", 3
+            song.save()
+            deleted = self.listed().order_by("pk").last()
+            deleted_pk = deleted.pk
+            deleted.delete()
+            song = Song.objects.filter(is_filler=True).first()
+            song.is_filler = False
+            song.save()
+        self.assertMatchesOrm()
+
+        # A cursor's row needn't still be listed
+        results = facet_index.results(facet_index.mask({}), "title", filtered=False)
+        later = self.listed().filter(
+            Q(title__gt=deleted.title) | Q(title=deleted.title, pk__gt=deleted_pk)
+        ).order_by("title", "pk")
+        self.assertEqual(list(results.after(deleted.title, deleted_pk)), list(later.values_list("pk", flat=True)))
+
+
+# No background flusher thread: the tests flush themselves
+@mock.patch("tabs.popularity._flusher", True)
+class PopularityTests(CatalogTestCase):
+    """Recorded views are written by flush(), decayed, and re-sort the listing."""
+
+    def setUp(self):
+        super().setUp()
+        self.song = Song.objects.filter(is_filler=False).select_related("artist", "album").first()
+        self.slugs = (self.song.artist.name_cleaned, self.song.album.title_cleaned, self.song.title_cleaned)
+        self.landmark = CatalogStats.load().popularity_landmark.timestamp()
+        self.addCleanup(popularity._pending.clear)
+
+    def test_flush(self):
+        popularity.record(*self.slugs, views=3)
+        popularity.record("no-such-artist", "no-such-album", "no-such-song")
+        self.assertEqual(popularity.pending(), 4)
+        facet_index.results(facet_index.mask({}), "-popularity")  # load the order
+        token = caches[page_cache.CACHE_ALIAS].get(page_cache.POPULARITY_KEY)
+
+        # One half-life after the landmark a view weighs 2
+        self.assertEqual(popularity.flush(now=self.landmark + popularity.HALF_LIFE.total_seconds()), 1)
+        self.assertEqual(popularity.pending(), 0)
+        song = Song.objects.get(pk=self.song.pk)
+        self.assertEqual(song.view_count, self.song.view_count + 3)
+        self.assertEqual(song.popularity, self.song.popularity + 6)
+
+        # The listing sort and its validators move with the scores
+        results = facet_index.results(facet_index.mask({}), "-popularity", filtered=False)
+        expected = Song.objects.filter(is_filler=False).order_by("-popularity", "-pk")
+        self.assertEqual(results[:], list(expected.values_list("pk", flat=True)))
+        self.assertNotEqual(caches[page_cache.CACHE_ALIAS].get(page_cache.POPULARITY_KEY), token)
+
+    def test_rescale(self):
+        others = Song.objects.exclude(pk=self.song.pk).order_by("-popularity", "-pk")
+        order = list(others.values_list("pk", flat=True))
+        shift = popularity.RESCALE_AFTER + 1
+        popularity.record(*self.slugs)
+        popularity.flush(now=self.landmark + shift * popularity.HALF_LIFE.total_seconds())
+        # Scores halve as the landmark moves forward, keeping their order,
+        # and a view at the new landmark weighs 1
+        self.assertEqual(
+            CatalogStats.load().popularity_landmark.timestamp(),
+            self.landmark + shift * popularity.HALF_LIFE.total_seconds(),
+        )
+        self.assertEqual(Song.objects.get(pk=self.song.pk).popularity, self.song.popularity * 2.0 ** -shift + 1)
+        self.assertEqual(list(others.values_list("pk", flat=True)), order)
+
+    def test_failed_flush_keeps_views(self):
+        popularity.record(*self.slugs, views=2)
+        with mock.patch("tabs.popularity._write", side_effect=DatabaseError), self.assertLogs("tabs.popularity"):
+            self.assertEqual(popularity.flush(), 0)
+        self.assertEqual(popularity.pending(), 2)
+        popularity.flush()
+        self.assertEqual(Song.objects.get(pk=self.song.pk).view_count, self.song.view_count + 2)
+
+
+class BulkEditTests(CatalogTestCase):
+    """Set-based edits leave the rows, counts and logs that per-song saves would."""
+
+    def setUp(self):
+        super().setUp()
+        albums = Album.objects.select_related("artist").order_by("pk")
+        self.album = albums.first()
+        self.target = albums.exclude(artist=self.album.artist).last()
+
+    def test_set_field(self):
+        songs = Song.objects.filter(album__artist=self.album.artist)
+        unverified = list(songs.filter(artist_verified=False).order_by("pk").values_list("pk", flat=True))
+        logged = SongChangeLog.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bulk_edit.set_field(songs, "artist_verified", True), len(unverified))
+        self.assertFalse(songs.filter(artist_verified=False).exists())
+        self.assertEqual(
+            list(SongChangeLog.objects.order_by("pk")[logged:].values_list("song_id", "change_summary")),
+            [(pk, changelog.describe("artist_verified", False, True)) for pk in unverified],
+        )
+        self.assertEqual(CatalogStats.load().verified_tabs, CatalogStats.rebuild().verified_tabs)
+        # Songs already set are skipped
+        self.assertEqual(bulk_edit.set_field(songs, "artist_verified", True), 0)
+        with self.assertRaises(ValueError):
+            bulk_edit.set_field(songs, "title", "Nope")
+
+    def test_move_to_album(self):
+        songs = self.album.songs.filter(is_filler=False)
+        moved = list(songs.order_by("pk").values_list("pk", flat=True))
+        logged = SongChangeLog.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bulk_edit.move_to_album(songs, self.target), len(moved))
+        for song in Song.objects.filter(pk__in=moved).select_related("artist", "album"):
+            self.assertEqual((song.album_id, song.artist_id), (self.target.pk, self.target.artist_id))
+            # The derived fields are what Song.save() would write
+            stored = (song.path, song.tab_files)
+            song.set_derived_fields()
+            self.assertEqual(stored, (song.path, song.tab_files))
+        self.assertEqual(tab_counts.drift(), [])
+        self.assertEqual(
+            list(SongChangeLog.objects.order_by("pk")[logged:].values_list("song_id", "change_summary")),
+            [(pk, f"Moved from {self.album.title} to {self.target.title}") for pk in moved],
+        )
+
+    def test_move_slug_clash_changes_nothing(self):
+        # Both albums have an Interlude
+        songs = self.album.songs.all()
+        before = list(Song.objects.order_by("pk").values_list("pk", "album_id", "artist_id", "path", "tab_files"))
+        logged = SongChangeLog.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaisesMessage(ValueError, "interlude"):
+                bulk_edit.move_to_album(songs, self.target)
+        self.assertEqual(
+            list(Song.objects.order_by("pk").values_list("pk", "album_id", "artist_id", "path", "tab_files")), before
+        )
+        self.assertEqual(SongChangeLog.objects.count(), logged)
+        self.assertEqual(tab_counts.drift(), [])
+
+
+# Nothing the tests write needs to settle
+@mock.patch("tabs.change_feed.SETTLE_TIME", timedelta(0))
+class ChangeFeedTests(CatalogTestCase):
+    """A sync resumed from each next_cursor sees every change exactly once."""
+
+    def sync(self, cursor=None, limit=None):
+        """Every row from ``cursor`` on, fetched ``limit`` at a time, and the cursor to resume from."""
+        rows = {name: [] for name in change_feed.FEEDS}
+        while True:
+            body = json.loads("".join(change_feed.stream(cursor, limit)))
+            for name in change_feed.FEEDS:
+                rows[name].extend(body[name])
+            cursor = body["next_cursor"]
+            if not body["has_more"]:
+                return rows, cursor
+
+    def ids(self, model):
+        return list(model.objects.order_by("date_last_edited", "pk").values_list("pk", flat=True))
+
+    def test_full_sync_in_pages(self):
+        rows, _ = self.sync(limit=7)
+        self.assertEqual([row["id"] for row in rows["artists"]], self.ids(Artist))
+        self.assertEqual([row["id"] for row in rows["albums"]], self.ids(Album))
+        self.assertEqual([row["id"] for row in rows["songs"]], self.ids(Song))
+        self.assertEqual(rows["deleted"], [])
+
+    def test_resume(self):
+        _, cursor = self.sync(limit=10)
+        song = Song.objects.order_by("pk").first()
+        song.riffs += 1
+        song.save()
+        deleted = Song.objects.order_by("pk").last()
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        rows, cursor = self.sync(cursor, limit=1)
+        self.assertEqual([row["id"] for row in rows["songs"]], [song.pk])
+        self.assertEqual(rows["songs"][0]["riffs"], song.riffs)
+        self.assertEqual(
+            [(row["kind"], row["object_id"]) for row in rows["deleted"]], [("song", deleted_pk)]
+        )
+        self.assertEqual(rows["artists"] + rows["albums"], [])
+        # Up to date: nothing more
+        rows, _ = self.sync(cursor)
+        self.assertEqual(sum(rows.values(), []), [])
+
+    def test_bad_cursor(self):
+        with self.assertRaises(change_feed.InvalidCursor):
+            change_feed.decode_cursor("garbage")
+        response = self.client.get(reverse("tabs:changes_api"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeLogTests(CatalogTestCase):
+    """Editorial edits are logged on commit, one row per song per transaction."""
+
+    def setUp(self):
+        super().setUp()
+        self.last = SongChangeLog.objects.order_by("-pk").values_list("pk", flat=True).first()
+        self.song = Song.objects.filter(is_filler=False).order_by("pk").first()
+
+    def entries(self, song):
+        """Entries logged for ``song`` since setUp()."""
+        return list(song.changelog.filter(pk__gt=self.last).values_list("change_summary", flat=True))
+
+    def test_one_entry_per_transaction(self):
+        tuning, difficulty, description = self.song.tuning, self.song.difficulty, self.song.tab_description
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.song.tuning = "Drop C"
+            self.song.save()
+            self.song.difficulty = 5
+            self.song.tab_description = "Capo on the 2nd fret"
+            self.song.save()
+        self.assertEqual(self.entries(self.song), ["; ".join([
+            changelog.describe("tuning", tuning, "Drop C"),
+            changelog.describe("difficulty", difficulty, 5),
+            changelog.describe("tab_description", description, "Capo on the 2nd fret"),
+        ])])
+
+    def test_unlogged_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.song.title = "Renamed"
+            self.song.save()
+        self.assertEqual(self.entries(self.song), [])
+
+    def test_tabbers(self):
+        tabber = Tabber.objects.create(name="New Tabber")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.song.tabber.add(tabber)
+        self.assertEqual(self.entries(self.song), ["Tabbers added: New Tabber"])
+
+    def test_deleted_in_the_same_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.song.riffs += 1
+            self.song.save()
+            song_pk = self.song.pk
+            self.song.delete()
+        self.assertFalse(SongChangeLog.objects.filter(song_id=song_pk, pk__gt=self.last).exists())
+
+    def test_deleted_in_a_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.song.riffs += 1
+            self.song.save()
+            song_pk = self.song.pk
+            with transaction.atomic():
+                self.song.delete()
+        self.assertFalse(SongChangeLog.objects.filter(song_id=song_pk, pk__gt=self.last).exists())
@@ -23,8 +23,16 @@ urlpatterns = [
     path('artists/', views.artists_list, name='artists_list'),
     path('about/', views.about, name='about'),
     path('api/search/', views.search_api, name='search_api'),
+    path('api/search-index/', views.search_index, name='search_index'),
+    path('api/search-index/<str:version>.json', views.search_index_document, name='search_index_document'),
+    path('api/changes/', views.changes_api, name='changes_api'),
 
     path('tabs/<slug:artist_slug>/<slug:album_slug>/<slug:song_slug>/', views.song_detail, name='song_detail'),
+    path(
+        'tabs/<slug:artist_slug>/<slug:album_slug>/<slug:song_slug>/panels/<slug:panel>/',
+        views.song_panel,
+        name='song_panel',
+    ),
     path('tabs/<slug:artist_slug>/<slug:album_slug>/', views.album_detail, name='album_detail'),
     path('tabs/<slug:artist_slug>/', views.artist_detail, name='artist_detail'),
 ]
@@ -0,0 +1,275 @@
+"""
+Representative requests for every public URL in tabs/urls.py, used by the
+query-plan check and other tooling that needs to exercise each view, and
+randomized request mixes for the benchmark_views command.
+"""
+from datetime import timedelta
+
+from django.db.models import Max, Min
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Album, Artist, Song
+from .pagination import CursorPaginator
+
+LISTING_PARAMS = {
+    "tabs:tabs_list": [
+        {},
+        {"sort": "Z to A"},
+        {"sort": "Recently Added"},
+        {"sort": "Most Popular"},
+        {"tuning": "Drop D", "min_difficulty": "2", "max_difficulty": "3", "sort": "A to Z"},
+        {"verified": "1", "requested": "1", "sort": "Recently Added"},
+        {"search": "the"},
+        {"search": "the", "sort": "Z to A"},
+        {"page": "2"},
+    ],
+    "tabs:albums_list": [
+        {},
+        {"sort": "Z to A"},
+        {"sort": "Recently Added"},
+        {"search": "the"},
+    ],
+    "tabs:artists_list": [
+        {},
+        {"sort": "Z to A"},
+        {"sort": "Recently Added"},
+        {"search": "the"},
+    ],
+}
+
+
+def sample_urls():
+    """
+    Return (url name, url) pairs covering every tabs URL pattern, with the
+    detail pages taken from the current catalog. Detail pages are skipped
+    when the catalog has nothing to show.
+    """
+    from urllib.parse import urlencode
+
+    from .views import SONG_PANELS
+
+    urls = [("tabs:base", reverse("tabs:base")), ("tabs:about", reverse("tabs:about"))]
+    for name, param_sets in LISTING_PARAMS.items():
+        for params in param_sets:
+            query = f"?{urlencode(params)}" if params else ""
+            urls.append((name, reverse(name) + query))
+    urls.extend(cursor_urls())
+    urls.append(("tabs:search_api", reverse("tabs:search_api") + "?q=th"))
+    urls.extend(search_index_urls())
+    urls.extend(changes_urls())
+
+    song = (
+        Song.objects.filter(is_filler=False).select_related("artist", "album")
+        .order_by("pk").first()
+    )
+    if song is not None:
+        urls.append(("tabs:song_detail", song.get_absolute_url()))
+        urls.extend(("tabs:song_panel", song_panel_url(song, panel)) for panel in SONG_PANELS)
+    album = Album.objects.select_related("artist").order_by("pk").first()
+    if album is not None:
+        urls.append(("tabs:album_detail", reverse("tabs:album_detail", kwargs={
+            "artist_slug": album.artist.name_cleaned,
+            "album_slug": album.title_cleaned,
+        })))
+    artist = Artist.objects.order_by("pk").first()
+    if artist is not None:
+        urls.append(("tabs:artist_detail", artist.get_absolute_url()))
+    return urls
+
+
+def song_panel_url(song, panel):
+    return reverse("tabs:song_panel", kwargs={
+        "artist_slug": song.artist.name_cleaned,
+        "album_slug": song.album.title_cleaned,
+        "song_slug": song.title_cleaned,
+        "panel": panel,
+    })
+
+
+def cursor_urls():
+    """Second keyset page of each listing under every sort option."""
+    from urllib.parse import urlencode
+
+    from .views import ALBUM_SORTS, ARTIST_SORTS, SONG_SORTS
+
+    listings = (
+        ("tabs:tabs_list", Song.objects.filter(is_filler=False), SONG_SORTS),
+        ("tabs:albums_list", Album.objects.all(), ALBUM_SORTS),
+        ("tabs:artists_list", Artist.objects.all(), ARTIST_SORTS),
+    )
+    urls = []
+    for name, queryset, sorts in listings:
+        for sort, ordering in sorts.items():
+            cursor = CursorPaginator(queryset, ordering, 1).page().next_cursor
+            if cursor is not None:
+                urls.append((name, reverse(name) + "?" + urlencode({"sort": sort, "cursor": cursor})))
+    return urls
+
+
+def _latest_edit():
+    edits = [
+        model.objects.aggregate(latest=Max("date_last_edited"))["latest"]
+        for model in (Song, Album, Artist)
+    ]
+    return max(filter(None, edits), default=timezone.now())
+
+
+def changes_urls(since=None):
+    """A full sync's first rows, and a sync from ``since`` (default: the last edit)."""
+    from urllib.parse import urlencode
+
+    from .change_feed import cursor_at
+
+    if since is None:
+        since = _latest_edit()
+    url = reverse("tabs:changes_api")
+    return [
+        ("tabs:changes_api", url + "?limit=100"),
+        ("tabs:changes_api", url + "?" + urlencode({"cursor": cursor_at(since)})),
+    ]
+
+
+def search_index_urls():
+    """The downloadable search index: where it is, and its current version."""
+    from .client_index import current_version
+
+    return [
+        ("tabs:search_index", reverse("tabs:search_index")),
+        ("tabs:search_index_document", reverse("tabs:search_index_document", kwargs={
+            "version": current_version(),
+        })),
+    ]
+
+
+def _random_rows(queryset, rng, count):
+    """Up to ``count`` rows of ``queryset`` picked at random pk offsets."""
+    bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return []
+    rows = (
+        queryset.filter(pk__gte=rng.randint(bounds["low"], bounds["high"])).order_by("pk").first()
+        for _ in range(count)
+    )
+    return [row for row in rows if row is not None]
+
+
+def benchmark_urls(rng, per_view):
+    """
+    ``per_view`` (url name, url) pairs for each tabs URL pattern, drawn with
+    ``rng`` from the current catalog: listings under a mix of search terms,
+    tunings, difficulty ranges, sorts and deep numbered or keyset pages,
+    autocomplete prefixes, and random detail pages.
+    """
+    from urllib.parse import urlencode
+
+    from .views import ALBUM_SORTS, ARTIST_SORTS, PAGE_SIZE, SONG_PANELS, SONG_SORTS
+
+    songs = Song.objects.filter(is_filler=False)
+    song_rows = _random_rows(songs.select_related("artist", "album"), rng, per_view)
+    album_rows = _random_rows(Album.objects.select_related("artist"), rng, per_view)
+    artist_rows = _random_rows(Artist.objects.all(), rng, per_view)
+    words = [word for song in song_rows for word in song.title.lower().split()] or ["the"]
+    latest_edit = _latest_edit()
+    tunings = [tuning for tuning in songs.order_by().values_list("tuning", flat=True).distinct() if tuning]
+
+    def listing_params(queryset, sorts, rows, filters):
+        last_page = max(1, queryset.count() // PAGE_SIZE)
+        choices = [
+            lambda: {},
+            lambda: {"sort": rng.choice(list(sorts))},
+            lambda: {"search": rng.choice(words)},
+            lambda: {"search": rng.choice(words), "sort": rng.choice(list(sorts))},
+            lambda: {"page": str(rng.randint(2, max(2, last_page)))},
+        ]
+        if rows:
+            def keyset():
+                sort = rng.choice(list(sorts))
+                cursor = CursorPaginator(queryset, sorts[sort], PAGE_SIZE).cursor_for(rng.choice(rows))
+                return {"sort": sort, "cursor": cursor}
+            choices.append(keyset)
+        return choices + filters
+
+    def difficulty_range():
+        low, high = sorted(rng.randint(1, 4) for _ in range(2))
+        return {"min_difficulty": str(low), "max_difficulty": str(high)}
+
+    song_filters = [
+        lambda: {"tuning": rng.choice(tunings or ["E Standard"])},
+        difficulty_range,
+        lambda: {
+            "tuning": rng.choice(tunings or ["E Standard"]),
+            **difficulty_range(),
+            "sort": rng.choice(list(SONG_SORTS)),
+        },
+    ]
+    listings = {
+        "tabs:tabs_list": listing_params(songs, SONG_SORTS, song_rows, song_filters),
+        "tabs:albums_list": listing_params(Album.objects.all(), ALBUM_SORTS, album_rows, []),
+        "tabs:artists_list": listing_params(Artist.objects.all(), ARTIST_SORTS, artist_rows, []),
+    }
+
+    urls = []
+    for _ in range(per_view):
+        urls.append(("tabs:base", reverse("tabs:base")))
+        urls.append(("tabs:about", reverse("tabs:about")))
+        for name, choices in listings.items():
+            params = rng.choice(choices)()
+            urls.append((name, reverse(name) + (f"?{urlencode(params)}" if params else "")))
+        urls.append(("tabs:search_api", autocomplete_url(rng, words)))
+        # Feed clients: up to date, or a few hours behind
+        behind = timedelta(hours=rng.choice([0, 0, 1, 6, 24]))
+        urls.append(rng.choice(changes_urls(latest_edit - behind)))
+
+    urls.extend(("tabs:song_detail", song.get_absolute_url()) for song in song_rows)
+    urls.extend(("tabs:song_panel", song_panel_url(song, rng.choice(SONG_PANELS))) for song in song_rows)
+    urls.extend(
+        ("tabs:album_detail", reverse("tabs:album_detail", kwargs={
+            "artist_slug": album.artist.name_cleaned,
+            "album_slug": album.title_cleaned,
+        }))
+        for album in album_rows
+    )
+    urls.extend(("tabs:artist_detail", artist.get_absolute_url()) for artist in artist_rows)
+    return urls
+
+
+def autocomplete_url(rng, words):
+    """A search_api URL for a prefix of one of ``words``, as typed into the dropdown."""
+    from urllib.parse import urlencode
+
+    word = rng.choice(words)
+    prefix = word[:rng.randint(2, max(2, len(word)))]
+    return reverse("tabs:search_api") + "?" + urlencode({"q": prefix})
+
+
+def autocomplete_urls(rng, count):
+    """``count`` search_api URLs for prefixes of words in random song titles."""
+    rows = _random_rows(Song.objects.filter(is_filler=False), rng, min(count, 200))
+    words = [word for song in rows for word in song.title.lower().split()] or ["the"]
+    return [autocomplete_url(rng, words) for _ in range(count)]
+
+
+def fetch(client, url):
+    """client.get(url), reading a streamed body so the queries behind it run too."""
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def without_view_counts():
+    """override_settings() that keeps song_detail requests out of the popularity counts."""
+    return override_settings(RECORD_SONG_VIEWS=False)
+
+
+def bypass_page_cache():
+    """
+    override_settings() that stops serving and storing cached pages, so
+    every request really runs its view (cached pages never reach the
+    database). Generation tokens are still read from the shared cache, so
+    the process-local indexes keep recognizing the catalog version.
+    """
+    return override_settings(CACHE_PAGES=False)
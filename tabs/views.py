@@ -1,25 +1,260 @@
 # type: ignore
+from functools import wraps
+from itertools import islice
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
-from django.http import JsonResponse
-from .models import Artist, Album, Song, Tabber  # type: ignore
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+from .models import Artist, Album, Song, CatalogStats  # type: ignore
+from .search_index import autocomplete_index
+from .page_cache import cache_page_by_path
+from .popularity import count_views
+from .pagination import CursorPage, CursorPaginator, InvalidCursor, with_pk
+from .facets import bitmap, facet_index
+from .query_stats import full_scan, query_budget
+from . import change_feed, client_index, fulltext, page_cache
+
+
+PAGE_SIZE = 20
+
+# How long browsers may keep using a search index version after an edit (seconds)
+SEARCH_INDEX_MAX_AGE = 60
+
+# song_detail's secondary panels, each fetched from song_panel when first opened
+SONG_PANELS = ('changelog', 'tabbers', 'related')
+
+# Changelog entries a song's panel shows, newest first
+CHANGELOG_LIMIT = 20
+
+# Listing sort options -> ordering (a pk tiebreaker is added when paginating)
+SONG_SORTS = {
+    'A to Z': ('title',),
+    'Z to A': ('-title',),
+    'Recently Added': ('-date_added',),
+    'Most Popular': ('-popularity',),
+}
+ALBUM_SORTS = {
+    'A to Z': ('title',),
+    'Z to A': ('-title',),
+    'Recently Added': ('-id',),
+}
+ARTIST_SORTS = {
+    'A to Z': ('name',),
+    'Z to A': ('-name',),
+    'Recently Added': ('-id',),
+}
+
+
+# Conditional GET: 304s are answered from the page-cache generations, before any query
+_catalog_condition = condition(
+    etag_func=page_cache.catalog_etag, last_modified_func=page_cache.catalog_last_modified
+)
+
+
+def catalog_conditional(view):
+    """_catalog_condition for the async listing views, with the tokens read off the event loop"""
+    conditional = _catalog_condition(view)
+
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        await page_cache.aload_catalog_tokens(request)
+        return await conditional(request, *args, **kwargs)
+    return wrapped
+
+
+page_conditional = condition(
+    etag_func=page_cache.page_etag, last_modified_func=page_cache.page_last_modified
+)
+
+
+async def apaginate(request, queryset, ordering):
+    """
+    Page through a listing. Requests carrying a ``cursor`` parameter use
+    keyset pagination (no COUNT, no OFFSET); others get a numbered page.
+    Either way the page exposes ``next_cursor`` for "load more" links.
+    ``ordering`` is None when the queryset is already ranked by search
+    relevance, which only numbered pages support. The page's rows are
+    read before it is returned, so templates never query.
+    """
+    cursor_paginator = None
+    if ordering is not None:
+        cursor_paginator = CursorPaginator(queryset, ordering, PAGE_SIZE)
+        if 'cursor' in request.GET:
+            return await cursor_paginator.aget_page(request.GET['cursor'])
+        queryset = queryset.order_by(*with_pk(ordering))
+    
+    paginator = Paginator(queryset, PAGE_SIZE)
+    # Counted here so get_page() doesn't run the COUNT synchronously
+    paginator.count = await queryset.acount()
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = [row async for row in page_obj.object_list]
+    page_obj.next_cursor = (
+        cursor_paginator.cursor_for(page_obj[-1])
+        if cursor_paginator and page_obj.has_next() else None
+    )
+    return page_obj
+
+
+async def apaginate_results(request, queryset, results, ordering):
+    """
+    apaginate() for pks picked by the facet index: the same numbered and
+    keyset pages, but only the page's rows are read from ``queryset``.
+    """
+    cursor_paginator = CursorPaginator(queryset, ordering, PAGE_SIZE) if ordering else None
+    if cursor_paginator and 'cursor' in request.GET:
+        try:
+            # The cursor holds the sort value and pk of the last row shown
+            value, last_pk = cursor_paginator.decode(request.GET['cursor'])
+            pks = list(islice(results.after(value, last_pk), PAGE_SIZE + 1))
+        except (InvalidCursor, ValueError):
+            # A tampered or stale cursor restarts from the top, as in CursorPaginator
+            pks = results[:PAGE_SIZE + 1]
+        rows = await arows_in_order(queryset, pks[:PAGE_SIZE])
+        has_next = len(pks) > PAGE_SIZE and rows
+        return CursorPage(rows, cursor_paginator.cursor_for(rows[-1]) if has_next else None)
+    
+    page_obj = Paginator(results, PAGE_SIZE).get_page(request.GET.get('page'))
+    page_obj.object_list = await arows_in_order(queryset, page_obj.object_list)
+    page_obj.next_cursor = (
+        cursor_paginator.cursor_for(page_obj[-1])
+        if cursor_paginator and page_obj.has_next() and page_obj.object_list else None
+    )
+    return page_obj
+
+
+async def arows_in_order(queryset, pks):
+    """The rows of ``queryset`` with ``pks``, in the order of ``pks``"""
+    rows = {row.pk: row async for row in queryset.filter(pk__in=pks).order_by()}
+    return [rows[pk] for pk in pks if pk in rows]
+
+
+def next_page_query(request, page_obj):
+    """Query string for the keyset page after ``page_obj``, or None"""
+    if not page_obj.next_cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('page', None)
+    params['cursor'] = page_obj.next_cursor
+    return params.urlencode()
+
+
+def is_ajax(request):
+    """True for requests made by the in-page filter scripts"""
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+async def acatalog_counts():
+    """Sidebar category counts, read from the CatalogStats row"""
+    stats = await CatalogStats.aload()
+    return {
+        'songs': stats.total_tabs,
+        'albums': stats.total_albums,
+        'artists': stats.total_artists,
+    }
+
+
+def search_catalog(queryset, kind, query, by_relevance):
+    """Full-text filter a song/album/artist queryset, optionally ranked"""
+    if by_relevance:
+        return fulltext.rank_queryset(queryset, kind, query)
+    return fulltext.filter_queryset(queryset, kind, query)
+
+
+# Ranking runs its FTS5 query on a raw cursor, which the async ORM can't
+asearch_catalog = sync_to_async(search_catalog)
+
+
+def song_facet_filters(params):
+    """The tabs_list filters in ``params`` as facet index predicates"""
+    filters = {}
+    tuning = params.get('tuning')
+    if tuning and tuning != 'All Tunings':
+        filters['tuning'] = lambda value: value == tuning
+    min_difficulty = int(params['min_difficulty']) if params.get('min_difficulty') else None
+    max_difficulty = int(params['max_difficulty']) if params.get('max_difficulty') else None
+    if min_difficulty is not None or max_difficulty is not None:
+        filters['difficulty'] = lambda value: value is not None and (
+            min_difficulty is None or value >= min_difficulty
+        ) and (max_difficulty is None or value <= max_difficulty)
+    if params.get('verified'):
+        filters['artist_verified'] = bool
+    if params.get('requested'):
+        filters['was_request'] = bool
+    return filters
+
+
+def song_facet_counts(counts):
+    """Facet index counts shaped for the tuning dropdown, slider and checkboxes"""
+    tunings = sorted(
+        ((tuning, n) for tuning, n in counts['tuning'].items() if tuning),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return {
+        'all_tunings': sum(counts['tuning'].values()),
+        'tunings': [{'value': tuning, 'count': n} for tuning, n in tunings],
+        'difficulties': [
+            {'value': level, 'count': counts['difficulty'].get(level, 0)} for level in range(1, 5)
+        ],
+        'verified': counts['artist_verified'].get(True, 0),
+        'requested': counts['was_request'].get(True, 0),
+    }
+
+
+def select_songs(ids, filters, ordering, filtered):
+    """
+    Facet index results and counts for tabs_list. ``ids`` are the search
+    matches (None without a search), in relevance order if ``ordering``
+    is None.
+    """
+    facet_index.ensure_built()
+    within = bitmap(ids) if ids is not None else None
+    mask = facet_index.mask(filters, within)
+    results = facet_index.results(mask, ids if ordering is None else ordering[0], filtered)
+    return results, facet_index.counts(filters, within)
+
+
+def album_song_count():
+    """
+    Non-filler songs per album as a correlated subquery rather than a
+    Count() join, so paginator counts and sorted slices stay index-only.
+    """
+    return Subquery(
+        Song.objects.filter(album=OuterRef('pk'), is_filler=False)
+        .order_by().values('album').annotate(n=Count('id')).values('n'),
+        output_field=IntegerField(),
+    )
+
+
+def artist_song_count():
+    """Non-filler songs per artist, like album_song_count()"""
+    return Subquery(
+        Song.objects.filter(artist=OuterRef('pk'), is_filler=False)
+        .order_by().values('artist').annotate(n=Count('id')).values('n'),
+        output_field=IntegerField(),
+    )
 
 
-def index(request):
+@query_budget(3)
+@catalog_conditional
+async def index(request):
     """Home page view with latest tabs and statistics"""
-    # Get latest 4 songs for the home page
-    latest_songs = Song.objects.filter(is_filler=False).select_related('artist', 'album').order_by('-date_added')[:4]
+    # Get latest 4 songs for the home page. Picking the ids in a subquery
+    # keeps SQLite walking song_recent_idx instead of reordering the joins.
+    latest_ids = Song.objects.filter(is_filler=False).order_by('-date_added').values('pk')[:4]
+    latest_songs = [
+        song async for song in
+        Song.objects.filter(pk__in=latest_ids).select_related('artist', 'album').order_by('-date_added')
+    ]
     
-    # Get statistics
-    stats = {
-        'total_tabs': Song.objects.filter(is_filler=False).count(),
-        'total_albums': Album.objects.count(),
-        'total_artists': Artist.objects.count(),
-        'verified_tabs': Song.objects.filter(artist_verified=True, is_filler=False).count(),
-        'total_riffs': Song.objects.aggregate(total_riffs=Count('riffs'))['total_riffs'] or 0,
-        'total_hours': 200,  # You can calculate this based on song durations if needed
-    }
+    # Get statistics (maintained incrementally by tabs/signals.py)
+    stats = await CatalogStats.aload()
     
     context = {
         'latest_songs': latest_songs,
@@ -28,105 +263,99 @@ def index(request):
     return render(request, 'tabs/index.html', context)
 
 
-def tabs_list(request):
+@query_budget(5)
+@catalog_conditional
+async def tabs_list(request):
     """Songs/tabs listing page with filtering"""
-    songs = Song.objects.filter(is_filler=False).select_related('artist', 'album').order_by('-date_added')
+    songs = Song.objects.filter(is_filler=False).select_related('artist', 'album')
     
-    # Apply search filter
+    # Apply search filter (ranked by relevance unless a sort was picked)
     search_query = request.GET.get('search')
+    by_relevance = bool(search_query) and 'sort' not in request.GET
+    ids = None
     if search_query:
-        songs = songs.filter(
-            Q(title__icontains=search_query) |
-            Q(artist__name__icontains=search_query) |
-            Q(album__title__icontains=search_query)
-        )
-    
-    # Apply tuning filter
+        matches = await asearch_catalog(songs.order_by('-date_added'), 'song', search_query, by_relevance)
+        if not by_relevance:
+            # The facet index sorts the matches; sorting them here too is wasted work
+            matches = matches.order_by()
+        ids = [pk async for pk in matches.values_list('pk', flat=True)]
+    
+    # Tuning, difficulty, verified and requested filters, the sort, and the
+    # dropdown/slider counts are answered by the in-memory facet index
     tuning_filter = request.GET.get('tuning')
-    if tuning_filter and tuning_filter != 'All Tunings':
-        songs = songs.filter(tuning=tuning_filter)
-    
-    # Apply difficulty filter
     min_difficulty = request.GET.get('min_difficulty')
     max_difficulty = request.GET.get('max_difficulty')
-    if min_difficulty:
-        songs = songs.filter(difficulty__gte=int(min_difficulty))
-    if max_difficulty:
-        songs = songs.filter(difficulty__lte=int(max_difficulty))
+    filters = song_facet_filters(request.GET)
     
-    # Apply sorting
+    # Apply sorting (search results are already ordered by rank)
     sort_by = request.GET.get('sort', 'A to Z')
-    if sort_by == 'Z to A':
-        songs = songs.order_by('-title')
-    elif sort_by == 'Recently Added':
-        songs = songs.order_by('-date_added')
-    elif sort_by == 'Most Popular':
-        # You can implement popularity logic here
-        songs = songs.order_by('-date_added')
-    else:  # A to Z
-        songs = songs.order_by('title')
+    ordering = None if by_relevance else SONG_SORTS.get(sort_by, SONG_SORTS['A to Z'])
+    results, counts = await sync_to_async(select_songs)(
+        ids, filters, ordering, bool(filters) or ids is not None
+    )
+    facet_counts = song_facet_counts(counts)
     
     # Pagination
-    paginator = Paginator(songs, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate_results(request, songs, results, ordering)
+    
+    # AJAX filter requests only need the song grid, not the page chrome
+    if is_ajax(request):
+        response = render(request, 'tabs/partials/song_grid.html', {
+            'page_obj': page_obj,
+            'next_query': next_page_query(request, page_obj),
+            'facet_counts': facet_counts,
+        })
+        patch_vary_headers(response, ('X-Requested-With',))
+        return response
     
     # Get counts for categories
-    counts = {
-        'songs': Song.objects.filter(is_filler=False).count(),
-        'albums': Album.objects.count(),
-        'artists': Artist.objects.count(),
-    }
+    counts = await acatalog_counts()
     
     context = {
         'page_obj': page_obj,
+        'next_query': next_page_query(request, page_obj),
         'counts': counts,
         'search_query': search_query,
         'tuning_filter': tuning_filter,
         'sort_by': sort_by,
         'min_difficulty': min_difficulty,
         'max_difficulty': max_difficulty,
+        'verified_filter': bool(request.GET.get('verified')),
+        'requested_filter': bool(request.GET.get('requested')),
+        'facet_counts': facet_counts,
     }
-    return render(request, 'tabs/tabs_list.html', context)
+    response = render(request, 'tabs/tabs_list.html', context)
+    patch_vary_headers(response, ('X-Requested-With',))
+    return response
 
 
-def albums_list(request):
+@query_budget(4)
+@catalog_conditional
+async def albums_list(request):
     """Albums listing page"""
     albums = Album.objects.select_related('artist').annotate(
-        song_count=Count('songs', filter=Q(songs__is_filler=False))
+        song_count=album_song_count()
     ).order_by('title')
     
-    # Apply search filter
+    # Apply search filter (ranked by relevance unless a sort was picked)
     search_query = request.GET.get('search')
+    by_relevance = bool(search_query) and 'sort' not in request.GET
     if search_query:
-        albums = albums.filter(
-            Q(title__icontains=search_query) |
-            Q(artist__name__icontains=search_query)
-        )
+        albums = await asearch_catalog(albums, 'album', search_query, by_relevance)
     
-    # Apply sorting
+    # Apply sorting (search results are already ordered by rank)
     sort_by = request.GET.get('sort', 'A to Z')
-    if sort_by == 'Z to A':
-        albums = albums.order_by('-title')
-    elif sort_by == 'Recently Added':
-        albums = albums.order_by('-id')  # or by a date field if you add one
-    else:  # A to Z
-        albums = albums.order_by('title')
+    ordering = None if by_relevance else ALBUM_SORTS.get(sort_by, ALBUM_SORTS['A to Z'])
     
     # Pagination
-    paginator = Paginator(albums, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, albums, ordering)
     
     # Get counts for categories
-    counts = {
-        'songs': Song.objects.filter(is_filler=False).count(),
-        'albums': Album.objects.count(),
-        'artists': Artist.objects.count(),
-    }
+    counts = await acatalog_counts()
     
     context = {
         'page_obj': page_obj,
+        'next_query': next_page_query(request, page_obj),
         'counts': counts,
         'search_query': search_query,
         'sort_by': sort_by,
@@ -134,40 +363,33 @@ def albums_list(request):
     return render(request, 'tabs/albums_list.html', context)
 
 
-def artists_list(request):
+@query_budget(4)
+@catalog_conditional
+async def artists_list(request):
     """Artists listing page"""
     artists = Artist.objects.annotate(
-        song_count=Count('songs', filter=Q(songs__is_filler=False))
+        song_count=artist_song_count()
     ).order_by('name')
     
-    # Apply search filter
+    # Apply search filter (ranked by relevance unless a sort was picked)
     search_query = request.GET.get('search')
+    by_relevance = bool(search_query) and 'sort' not in request.GET
     if search_query:
-        artists = artists.filter(name__icontains=search_query)
+        artists = await asearch_catalog(artists, 'artist', search_query, by_relevance)
     
-    # Apply sorting
+    # Apply sorting (search results are already ordered by rank)
     sort_by = request.GET.get('sort', 'A to Z')
-    if sort_by == 'Z to A':
-        artists = artists.order_by('-name')
-    elif sort_by == 'Recently Added':
-        artists = artists.order_by('-id')
-    else:  # A to Z
-        artists = artists.order_by('name')
+    ordering = None if by_relevance else ARTIST_SORTS.get(sort_by, ARTIST_SORTS['A to Z'])
     
     # Pagination
-    paginator = Paginator(artists, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, artists, ordering)
     
     # Get counts for categories
-    counts = {
-        'songs': Song.objects.filter(is_filler=False).count(),
-        'albums': Album.objects.count(),
-        'artists': Artist.objects.count(),
-    }
+    counts = await acatalog_counts()
     
     context = {
         'page_obj': page_obj,
+        'next_query': next_page_query(request, page_obj),
         'counts': counts,
         'search_query': search_query,
         'sort_by': sort_by,
@@ -175,6 +397,7 @@ def artists_list(request):
     return render(request, 'tabs/artists_list.html', context)
 
 
+@query_budget(0)
 def about(request):
     """About page view"""
     donation_amounts = [10, 20, 30, 40, 50]
@@ -182,43 +405,73 @@ def about(request):
     return render(request, 'tabs/about.html', context)
 
 
+@query_budget(1)
+@count_views
+@page_conditional
+@cache_page_by_path
 def song_detail(request, artist_slug, album_slug, song_slug):
-    """Individual song detail page"""
+    """Individual song detail page; the secondary panels come from song_panel"""
     song = get_object_or_404(
-        Song.objects.select_related('artist', 'album').prefetch_related('tabber'),
+        Song.objects.select_related('artist', 'album'),
         artist__name_cleaned=artist_slug,
         album__title_cleaned=album_slug,
         title_cleaned=song_slug,
         is_filler=False
     )
     
-    # Get related songs from the same album
-    related_songs = Song.objects.filter(
-        album=song.album,
-        is_filler=False
-    ).exclude(id=song.id).select_related('artist', 'album')[:4]
-    
     context = {
         'song': song,
-        'related_songs': related_songs,
     }
     return render(request, 'tabs/song_detail.html', context)
 
 
+@query_budget(2)
+@page_conditional
+@cache_page_by_path
+def song_panel(request, artist_slug, album_slug, song_slug, panel):
+    """One of song_detail's panels, as an HTML fragment"""
+    if panel not in SONG_PANELS:
+        raise Http404('No such panel')
+    song = get_object_or_404(
+        Song.objects.only('pk', 'album_id'),
+        artist__name_cleaned=artist_slug,
+        album__title_cleaned=album_slug,
+        title_cleaned=song_slug,
+        is_filler=False
+    )
+
+    if panel == 'changelog':
+        items = song.changelog.order_by('-change_date', '-pk')[:CHANGELOG_LIMIT]
+    elif panel == 'tabbers':
+        # A song has a tabber or two: sorting them here spares SQLite a temp B-tree
+        items = sorted(song.tabber.order_by(), key=attrgetter('name'))
+    else:
+        # Other songs from the same album
+        items = Song.objects.filter(
+            album_id=song.album_id,
+            is_filler=False
+        ).exclude(id=song.id).select_related('artist', 'album').order_by('track_num', 'title')[:4]
+    return render(request, f'tabs/partials/song_{panel}.html', {'items': items})
+
+
+@query_budget(4)
+@page_conditional
+@cache_page_by_path
 def artist_detail(request, artist_slug):
     """Individual artist detail page"""
     artist = get_object_or_404(Artist, name_cleaned=artist_slug)
     
-    # Get artist's albums and songs
-    albums = Album.objects.filter(artist=artist).annotate(
-        song_count=Count('songs', filter=Q(songs__is_filler=False))
+    # Get artist's albums (through the relation, so each album.artist is this
+    # artist without another query) and songs
+    albums = artist.albums.annotate(
+        song_count=album_song_count()
     ).order_by('release_year')
     
     # Get all of the artist's songs, not just recent ones
     songs = Song.objects.filter(
         artist=artist,
         is_filler=False
-    ).select_related('album').order_by('-date_added')
+    ).select_related('artist', 'album').order_by('-date_added')
     
     context = {
         'artist': artist,
@@ -228,6 +481,9 @@ def artist_detail(request, artist_slug):
     return render(request, 'tabs/artist_detail.html', context)
 
 
+@query_budget(3)
+@page_conditional
+@cache_page_by_path
 def album_detail(request, artist_slug, album_slug):
     """Individual album detail page"""
     album = get_object_or_404(
@@ -239,7 +495,7 @@ def album_detail(request, artist_slug, album_slug):
     # Get all songs in the album
     songs = Song.objects.filter(
         album=album
-    ).select_related('artist').order_by('track_num', 'title')
+    ).select_related('artist', 'album').order_by('track_num', 'title')
     
     context = {
         'album': album,
@@ -248,56 +504,66 @@ def album_detail(request, artist_slug, album_slug):
     return render(request, 'tabs/album_detail.html', context)
 
 
-def search_api(request):
-    """API endpoint for search dropdown"""
+@query_budget(0)
+async def search_api(request):
+    """API endpoint for search dropdown, answered from the in-memory index"""
     query = request.GET.get('q', '').strip()
     
     if len(query) < 2:
         return JsonResponse({'results': []})
     
-    results = []
-    
-    # Search songs (limit to 2)
-    songs = Song.objects.filter(
-        Q(title__icontains=query),
-        is_filler=False
-    ).select_related('artist', 'album')[:2]
-    
-    for song in songs:
-        results.append({
-            'type': 'song',
-            'title': song.title,
-            'subtitle': f"{song.artist.name} - {song.album.title}",
-            'url': song.get_absolute_url(),
-            'verified': song.artist_verified
-        })
-    
-    # Search albums (limit to 2)
-    albums = Album.objects.filter(
-        Q(title__icontains=query)
-    ).select_related('artist')[:2]
-    
-    for album in albums:
-        results.append({
-            'type': 'album',
-            'title': album.title,
-            'subtitle': f"{album.artist.name} ({album.release_year})",
-            'url': f"/tabs/artist/{album.artist.name_cleaned}/album/{album.title_cleaned}/",
-            'verified': False
-        })
-    
-    # Search artists (limit to 1)
-    artists = Artist.objects.filter(
-        Q(name__icontains=query)
-    )[:1]
-    
-    for artist in artists:
-        results.append({
-            'type': 'artist',
-            'title': artist.name,
-            'subtitle': f"{artist.num_tabs} tab{'s' if artist.num_tabs != 1 else ''}",
-            'url': artist.get_absolute_url(),
-            'verified': False
-        })
-    
-    return JsonResponse({'results': results[:5]})
\ No newline at end of file
+    # Up to 2 songs, 2 albums and 1 artist, looked up concurrently
+    return JsonResponse({'results': await autocomplete_index.asearch(query)})
+
+
+@query_budget(0)
+def search_index(request):
+    """
+    Where the current downloadable search index is (see
+    tabs/client_index.py). Cached briefly, so edits reach browsers soon.
+    """
+    version = client_index.current_version()
+    response = JsonResponse({
+        'version': version,
+        'url': reverse('tabs:search_index_document', kwargs={'version': version}),
+    })
+    patch_cache_control(response, public=True, max_age=SEARCH_INDEX_MAX_AGE)
+    return response
+
+
+@query_budget(3)
+@full_scan
+def search_index_document(request, version):
+    """One version of the downloadable search index, cacheable forever"""
+    current, body = client_index.document()
+    response = page_cache.gzipped_response(request, body, 'application/json')
+    if version == current:
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        # Superseded by an edit: the current index, but only briefly cacheable
+        patch_cache_control(response, public=True, max_age=SEARCH_INDEX_MAX_AGE)
+    return response
+
+
+@query_budget(5)
+def changes_api(request):
+    """
+    Catalog changes since ``cursor`` as streamed JSON, for mirrors and apps
+    (see tabs/change_feed.py). The queries run while the body streams.
+    """
+    cursor = request.GET.get('cursor') or None
+    try:
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        if limit is not None and limit < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a positive integer'}, status=400)
+    if cursor:
+        try:
+            change_feed.decode_cursor(cursor)
+        except change_feed.InvalidCursor:
+            return JsonResponse({'error': 'invalid cursor'}, status=400)
+    
+    # ASGI servers need an async iterator to stream rather than buffer
+    stream = change_feed.astream if isinstance(request, ASGIRequest) else change_feed.stream
+    return StreamingHttpResponse(stream(cursor, limit), content_type='application/json')
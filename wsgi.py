@@ -6,4 +6,10 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Load the autocomplete and facet indexes before the first search/listing request arrives
+from tabs.facets import facet_index  # noqa: E402
+from tabs.search_index import autocomplete_index  # noqa: E402
+autocomplete_index.warm()
+facet_index.warm()